@@ -9,24 +9,43 @@ Author: Senior Full-Stack Python Developer
 """
 
 import streamlit as st
-import asyncio
+import json
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-import polars as pl
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 from datetime import datetime
 
-# Local imports
-from config.settings import AppConfig, load_config
-from processing.document_processor import DocumentProcessor
-from crawling.crawler import WebCrawler
+# Local imports (document processing, crawling and Polars are imported on
+# first use so the first page renders without loading them)
+from utils.resources import (
+    configure_logging,
+    create_web_crawler,
+    get_app_config,
+    get_document_processor,
+    get_robots_cache,
+    init_logging,
+    start_model_preload
+)
 from utils.session_manager import SessionManager
-from utils.ui_helpers import apply_custom_css, create_sidebar_navigation
-from utils.validators import validate_urls, validate_file_types
+from utils.ui_helpers import (
+    apply_custom_css,
+    create_sidebar_navigation,
+    create_metric_cards,
+    create_progress_card,
+    create_results_table,
+    create_search_box
+)
+from utils.validators import validate_urls
 
-# Configure logging
+# Logging
 from loguru import logger
-logger.add("logs/kontext_{time}.log", rotation="10 MB", retention="7 days")
+
+if TYPE_CHECKING:
+    import polars as pl
+    from crawling.crawler import WebCrawler
+    from processing.document_processor import DocumentProcessor
+    from storage.results_store import ResultSet
+    from utils.job_runner import JobHandle
 
 class KontextApp:
     """
@@ -37,26 +56,23 @@ class KontextApp:
     """
     
     def __init__(self):
-        """Initialize the Kontext application with configuration and session management."""
-        self.config = load_config()
+        """
+        Initialize the Kontext application with configuration and session management.
+        
+        Runs on every Streamlit rerun, so it only looks up the process-wide
+        shared resources; they are built once per server process.
+        """
+        init_logging()
+        self.config = get_app_config()
+        # Initializes session state, including the handles on the stored results
         self.session_manager = SessionManager()
-        self.document_processor = DocumentProcessor(self.config)
-        self.web_crawler = WebCrawler(self.config)
-        
-        # Initialize session state
-        self._initialize_session_state()
-        
-    def _initialize_session_state(self) -> None:
-        """Initialize Streamlit session state variables."""
-        if 'processing_results' not in st.session_state:
-            st.session_state.processing_results = []
-        if 'crawl_results' not in st.session_state:
-            st.session_state.crawl_results = []
-        if 'current_job' not in st.session_state:
-            st.session_state.current_job = None
-        if 'job_progress' not in st.session_state:
-            st.session_state.job_progress = 0
-            
+        start_model_preload()
+        
+    @property
+    def document_processor(self) -> 'DocumentProcessor':
+        """Shared document processor, imported and built on first use."""
+        return get_document_processor()
+        
     def run(self) -> None:
         """Main application entry point."""
         # Apply custom styling
@@ -74,6 +90,10 @@ class KontextApp:
         st.title("🌐 Kontext")
         st.markdown("*Professional Document Processing & Web Crawling Platform*")
         
+        # Pick up results of background jobs and report finished ones
+        self.session_manager.sync_jobs()
+        self._show_job_messages()
+        
         # Create sidebar navigation
         selected_tab = create_sidebar_navigation()
         
@@ -107,7 +127,26 @@ class KontextApp:
             st.markdown("### Processing Options")
             extract_tables = st.checkbox("Extract tables", value=True)
             extract_images = st.checkbox("Extract image descriptions", value=False)
-            chunk_size = st.slider("Chunk size (tokens)", 100, 2000, 512)
+            ocr_modes = ['auto', 'always', 'never']
+            ocr_mode = st.selectbox(
+                "OCR", ocr_modes,
+                index=ocr_modes.index(self.config.document_processing.ocr_mode),
+                help="'auto' skips OCR for PDFs that already have a usable text layer"
+            )
+            chunk_size = st.slider(
+                "Chunk size (tokens)", 100, 2000, self.config.document_processing.default_chunk_size,
+                help=f"Measured with the '{self.document_processor.tokenizer.name}' tokenizer"
+            )
+            chunk_overlap = st.slider(
+                "Chunk overlap (tokens)", 0, chunk_size // 2,
+                min(self.config.document_processing.default_chunk_overlap, chunk_size // 2)
+            )
+            chunking_strategies = ['structure', 'window']
+            chunking_strategy = st.selectbox(
+                "Chunking", chunking_strategies,
+                index=chunking_strategies.index(self.config.document_processing.chunking_strategy),
+                help="'structure' keeps headings, paragraphs, lists and tables together; 'window' cuts fixed token windows"
+            )
             
         # Processing controls
         if uploaded_files:
@@ -117,12 +156,31 @@ class KontextApp:
                 self._process_documents(uploaded_files, {
                     'extract_tables': extract_tables,
                     'extract_images': extract_images,
-                    'chunk_size': chunk_size
+                    'ocr_mode': ocr_mode,
+                    'chunk_size': chunk_size,
+                    'chunk_overlap': chunk_overlap,
+                    'chunking_strategy': chunking_strategy
                 })
+        
+        # Chunking-only pass over documents that were already parsed
+        # (decided by one query over the summary rows, without loading the documents)
+        chunk_settings = (chunk_size, chunk_overlap, chunking_strategy, self.document_processor.tokenizer.name)
+        stale_count = st.session_state.processing_results.count_stale_chunks(*chunk_settings)
+        if stale_count:
+            st.markdown(f"**{stale_count} processed documents use different chunk settings**")
+            
+            if st.button("♻️ Re-chunk Processed Documents"):
+                count = 0
+                stale_ids = st.session_state.processing_results.stale_chunk_ids(*chunk_settings)
+                for batch in st.session_state.processing_results.iter_batches(stale_ids):
+                    count += self.document_processor.rechunk_results(
+                        batch, chunk_size, chunk_overlap, chunking_strategy
+                    )
+                    st.session_state.processing_results.update(batch)
+                st.success(f"✅ Re-chunked {count} documents without re-parsing")
                 
         # Show current processing status
-        if st.session_state.current_job == 'document_processing':
-            self._show_processing_progress()
+        self._render_job_progress('document_processing', "🔄 Processing documents")
             
     def _render_web_crawling(self) -> None:
         """Render the web crawling interface."""
@@ -150,8 +208,23 @@ class KontextApp:
         # Advanced settings
         with st.expander("🔧 Advanced Settings"):
             crawl_strategy = st.selectbox("Crawl Strategy", ["BFS", "DFS"], index=0)
-            concurrent_requests = st.slider("Concurrent requests", 1, 20, 5)
-            delay_between_requests = st.slider("Delay between requests (ms)", 0, 5000, 1000)
+            concurrent_requests = st.slider(
+                "Concurrent requests", 1, 20, self.config.web_crawling.default_concurrent_requests,
+                help="Requests in flight across all hosts; each host gets at most "
+                     f"{self.config.web_crawling.max_requests_per_host}"
+            )
+            delay_between_requests = st.slider(
+                "Delay between requests (ms)", 0, 5000, self.config.web_crawling.default_delay_ms,
+                help="Minimum interval between requests to the same host (longer if its robots.txt asks)"
+            )
+            rendering_modes = ["auto", "http", "browser"]
+            rendering = st.selectbox(
+                "Page rendering",
+                rendering_modes,
+                index=rendering_modes.index(self.config.web_crawling.rendering_mode),
+                help="auto: fetch over HTTP and render in a headless browser only pages that need "
+                     "JavaScript; http: never render; browser: render every page"
+            )
             
         # Crawling controls
         if start_urls.strip():
@@ -169,61 +242,81 @@ class KontextApp:
                         'domain_restriction': domain_restriction,
                         'crawl_strategy': crawl_strategy,
                         'concurrent_requests': concurrent_requests,
-                        'delay_between_requests': delay_between_requests
+                        'delay_between_requests': delay_between_requests,
+                        'rendering': rendering
                     })
             else:
                 st.error("❌ No valid URLs found. Please check your input.")
                 
         # Show current crawling status
-        if st.session_state.current_job == 'web_crawling':
-            self._show_crawling_progress()
+        self._render_job_progress('web_crawling', "🕸️ Crawling websites")
             
     def _render_results_export(self) -> None:
         """Render the results and export interface."""
         st.header("📊 Results & Export")
         
+        processing_results = st.session_state.processing_results
+        crawl_results = st.session_state.crawl_results
+        processing_count = len(processing_results)
+        crawl_count = len(crawl_results)
+        
+        # Full-text search over both result sets
+        if processing_count or crawl_count:
+            create_search_box(
+                self.session_manager.search_results,
+                {processing_results.kind: processing_results, crawl_results.kind: crawl_results}
+            )
+            
         # Processing results
-        if st.session_state.processing_results:
+        if processing_count:
             st.subheader("📄 Document Processing Results")
-            
-            # Create results dataframe
-            results_df = pl.DataFrame(st.session_state.processing_results)
-            st.dataframe(results_df, use_container_width=True)
+            create_results_table(
+                processing_results, "Processed Documents", self.config.ui.results_per_page, key="processing_results"
+            )
             
             # Export options
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if st.button("📥 Export as CSV"):
-                    self._export_results(results_df, 'csv')
-            with col2:
-                if st.button("📥 Export as JSON"):
-                    self._export_results(results_df, 'json')
-            with col3:
-                if st.button("📥 Export as Parquet"):
-                    self._export_results(results_df, 'parquet')
+            self._render_export_controls(processing_results, 'kontext_processing_results', key='processing')
                     
         # Crawling results
-        if st.session_state.crawl_results:
+        if crawl_count:
             st.subheader("🕷️ Web Crawling Results")
-            
-            crawl_df = pl.DataFrame(st.session_state.crawl_results)
-            st.dataframe(crawl_df, use_container_width=True)
+            create_results_table(
+                crawl_results, "Crawled Pages", self.config.ui.results_per_page, key="crawl_results"
+            )
             
             # Export options for crawl results
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                if st.button("📥 Export Crawl CSV"):
-                    self._export_results(crawl_df, 'csv', prefix='crawl_')
-            with col2:
-                if st.button("📥 Export Crawl JSON"):
-                    self._export_results(crawl_df, 'json', prefix='crawl_')
-            with col3:
-                if st.button("📥 Export Crawl Parquet"):
-                    self._export_results(crawl_df, 'parquet', prefix='crawl_')
+            self._render_export_controls(crawl_results, 'kontext_crawl_results', key='crawl')
                     
-        if not st.session_state.processing_results and not st.session_state.crawl_results:
+        if not processing_count and not crawl_count:
             st.info("🔍 No results available yet. Process some documents or crawl websites first!")
             
+        # Show running exports
+        self._render_job_progress('export', "📦 Exporting results")
+            
+    def _render_export_controls(self, results: 'ResultSet', prefix: str, key: str) -> None:
+        """Render format/layout selection and the export button for a result set."""
+        from storage.exporters import EXPORT_FORMATS, EXPORT_LAYOUTS
+        
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col1:
+            format = st.selectbox(
+                "Export format",
+                list(EXPORT_FORMATS) + ['dataset'],
+                format_func=lambda value: "dataset (partitioned parquet)" if value == 'dataset' else value,
+                key=f"{key}_export_format"
+            )
+        with col2:
+            layout = st.selectbox(
+                "Layout",
+                EXPORT_LAYOUTS,
+                format_func=lambda value: "One row per chunk" if value == 'chunks' else "One row per result",
+                key=f"{key}_export_layout"
+            )
+        with col3:
+            st.markdown("&nbsp;")
+            if st.button("📥 Export", key=f"{key}_export"):
+                self._export_results(results, format, layout, prefix)
+            
     def _render_settings(self) -> None:
         """Render the application settings interface."""
         st.header("⚙️ Settings")
@@ -241,104 +334,190 @@ class KontextApp:
         )
         
         if st.button("Update Log Level"):
-            logger.remove()
-            logger.add("logs/kontext_{time}.log", level=log_level, rotation="10 MB")
+            configure_logging(log_level)
             st.success(f"Log level updated to {log_level}")
             
+        # Conversion cache statistics
+        if self.document_processor.cache is not None:
+            st.subheader("Conversion Cache")
+            create_metric_cards(self.document_processor.cache.stats())
+            
+            if st.button("🗑️ Clear Conversion Cache"):
+                self.document_processor.cache.clear()
+                st.success("Conversion cache cleared")
+            
+        # robots.txt cache shared by crawl jobs
+        st.subheader("robots.txt Cache")
+        robots_cache = get_robots_cache()
+        create_metric_cards(robots_cache.stats())
+        if st.button("🗑️ Clear robots.txt Cache"):
+            robots_cache.clear()
+            st.success("robots.txt cache cleared")
+            
+        # Partitioned datasets
+        st.subheader("Datasets")
+        st.caption(f"Partitioned Parquet datasets in {self.config.storage.dataset_dir}")
+        if st.button("🗜️ Compact Datasets", disabled=self.session_manager.is_job_running('compaction')):
+            self.session_manager.start_job(
+                'compaction',
+                self._compaction_job,
+                self.config.storage.dataset_dir,
+                self.config.storage.compaction_min_files,
+                self.config.storage.compaction_target_mb,
+                description=self.config.storage.dataset_dir
+            )
+            st.rerun()
+        self._render_job_progress('compaction', "🗜️ Compacting datasets")
+            
         # Clear session data
         st.subheader("Session Management")
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("🗑️ Clear Processing Results"):
-                st.session_state.processing_results = []
+                st.session_state.processing_results.clear()
                 st.success("Processing results cleared")
                 
         with col2:
             if st.button("🗑️ Clear Crawling Results"):
-                st.session_state.crawl_results = []
+                st.session_state.crawl_results.clear()
                 st.success("Crawling results cleared")
                 
     def _process_documents(self, files: List, options: Dict[str, Any]) -> None:
-        """Process uploaded documents asynchronously."""
-        st.session_state.current_job = 'document_processing'
-        st.session_state.job_progress = 0
+        """Submit a background job that processes uploaded documents."""
+        self.session_manager.start_job(
+            'document_processing',
+            self._document_processing_job,
+            self.document_processor, list(files), options,
+            job_data=options,
+            description=f"{len(files)} files"
+        )
+        st.rerun()
         
-        # Create progress placeholder
-        progress_placeholder = st.empty()
+    def _start_crawling(self, urls: List[str], options: Dict[str, Any]) -> None:
+        """Submit a background job that crawls the given URLs."""
+        # Each crawl job gets its own crawler on the shared infrastructure
+        self.session_manager.start_job(
+            'web_crawling',
+            self._web_crawling_job,
+            create_web_crawler(), urls, options,
+            job_data=options,
+            description=f"{len(urls)} start URLs"
+        )
+        st.rerun()
         
-        try:
-            # Run async processing
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            results = loop.run_until_complete(
-                self.document_processor.process_files_async(files, options, progress_placeholder)
-            )
-            
-            # Store results
-            st.session_state.processing_results.extend(results)
-            st.session_state.current_job = None
-            st.success(f"✅ Successfully processed {len(results)} documents!")
+    @staticmethod
+    async def _document_processing_job(
+        job: 'JobHandle', processor: 'DocumentProcessor', files: List, options: Dict[str, Any]
+    ) -> None:
+        """Background job: process files, publishing each result as soon as it is ready."""
+        async for result in processor.iter_process_files_async(files, options, job):
+            job.add_result(result)
             
-        except Exception as e:
-            logger.error(f"Document processing error: {e}")
-            st.error(f"❌ Processing failed: {str(e)}")
-            st.session_state.current_job = None
-            
-    def _start_crawling(self, urls: List[str], options: Dict[str, Any]) -> None:
-        """Start web crawling asynchronously."""
-        st.session_state.current_job = 'web_crawling'
-        st.session_state.job_progress = 0
+    @staticmethod
+    async def _web_crawling_job(
+        job: 'JobHandle', web_crawler: 'WebCrawler', urls: List[str], options: Dict[str, Any]
+    ) -> None:
+        """Background job: crawl the start URLs, publishing each page as soon as it is done."""
+        async for result in web_crawler.iter_crawl_urls_async(urls, options, job):
+            job.add_result(result)
         
-        # Create progress placeholder
-        progress_placeholder = st.empty()
+    def _render_job_progress(self, job_type: str, title: str) -> None:
+        """Show this session's jobs of one type, polling them while they run."""
+        if not self.session_manager.is_job_running(job_type):
+            return
         
-        try:
-            # Run async crawling
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            results = loop.run_until_complete(
-                self.web_crawler.crawl_urls_async(urls, options, progress_placeholder)
+        @st.fragment(run_every=self.config.jobs.poll_interval_seconds)
+        def job_progress() -> None:
+            jobs = [job for job in self.session_manager.sync_jobs() if job['job_type'] == job_type]
+            if not jobs:
+                # Everything finished: rerun the whole page to show the results
+                st.rerun()
+                
+            for job in jobs:
+                create_progress_card(f"{title} ({job['description']})", job['progress'], {
+                    'status': job['message'] or job['status'],
+                    'results': job['result_count'],
+                    'running_for': str(job['duration']).split('.')[0] if job['duration'] else 'queued'
+                })
+                if st.button("⏹️ Cancel", key=f"cancel_job_{job['job_id']}"):
+                    self.session_manager.cancel_job(job['job_id'])
+                    
+        job_progress()
+        
+    def _show_job_messages(self) -> None:
+        """Show the outcome of jobs that finished since the last run."""
+        for message in self.session_manager.get_recent_messages():
+            if message['type'] == 'success':
+                st.success(f"✅ {message['message']}")
+            else:
+                st.error(f"❌ {message['message']}")
+        self.session_manager.clear_messages()
+        
+    def _export_results(self, results: 'ResultSet', format: str, layout: str, prefix: str) -> None:
+        """Submit a background job that streams results into an export file or dataset."""
+        from storage.exporters import default_export_path
+        
+        if format == 'dataset':
+            storage_config = self.config.storage
+            self.session_manager.start_job(
+                'export',
+                self._dataset_job,
+                results, storage_config.dataset_dir, layout, list(storage_config.dataset_partitions),
+                storage_config.compaction_min_files, storage_config.compaction_target_mb,
+                description=f"dataset in {storage_config.dataset_dir}"
             )
+            st.rerun()
             
-            # Store results
-            st.session_state.crawl_results.extend(results)
-            st.session_state.current_job = None
-            st.success(f"✅ Successfully crawled {len(results)} pages!")
-            
-        except Exception as e:
-            logger.error(f"Web crawling error: {e}")
-            st.error(f"❌ Crawling failed: {str(e)}")
-            st.session_state.current_job = None
-            
-    def _show_processing_progress(self) -> None:
-        """Show document processing progress."""
-        st.info("🔄 Processing documents...")
-        progress_bar = st.progress(st.session_state.job_progress)
+        output_path = default_export_path(prefix, format, layout)
+        self.session_manager.start_job(
+            'export',
+            self._export_job,
+            results, output_path, format, layout,
+            description=output_path
+        )
+        st.rerun()
+        
+    @staticmethod
+    def _export_job(job: 'JobHandle', results: 'ResultSet', output_path: str, format: str, layout: str) -> None:
+        """Background job: stream a result set into an export file."""
+        from storage.exporters import ExportCancelled, export_results
         
-    def _show_crawling_progress(self) -> None:
-        """Show web crawling progress."""
-        st.info("🕸️ Crawling websites...")
-        progress_bar = st.progress(st.session_state.job_progress)
+        try:
+            rows = export_results(results, output_path, format, layout, progress_placeholder=job)
+        except ExportCancelled:
+            # The runner records the job as cancelled
+            return
+        job.progress(1.0, f"Exported {rows:,} rows to {output_path}")
         
-    def _export_results(self, df: pl.DataFrame, format: str, prefix: str = '') -> None:
-        """Export results in the specified format."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{prefix}kontext_results_{timestamp}.{format}"
+    @staticmethod
+    def _dataset_job(
+        job: 'JobHandle', results: 'ResultSet', dataset_dir: str, layout: str, partition_by: List[str],
+        min_files: int, target_file_mb: int
+    ) -> None:
+        """Background job: append a result set to its partitioned dataset, then compact it."""
+        from storage.dataset import append_to_dataset, compact_dataset, dataset_path
+        from storage.exporters import ExportCancelled
         
         try:
-            if format == 'csv':
-                df.write_csv(filename)
-            elif format == 'json':
-                df.write_json(filename)
-            elif format == 'parquet':
-                df.write_parquet(filename)
-                
-            st.success(f"✅ Results exported to {filename}")
-            
-        except Exception as e:
-            logger.error(f"Export error: {e}")
-            st.error(f"❌ Export failed: {str(e)}")
+            rows = append_to_dataset(results, dataset_dir, layout, partition_by=partition_by, progress_placeholder=job)
+        except ExportCancelled:
+            # The runner records the job as cancelled
+            return
+        target = dataset_path(dataset_dir, results.kind, layout)
+        stats = compact_dataset(str(target), min_files, target_file_mb)
+        message = f"Appended {rows:,} rows to {target}"
+        if stats['files_merged']:
+            message += f" (compacted {stats['files_merged']} small files)"
+        job.progress(1.0, message)
+        
+    @staticmethod
+    def _compaction_job(job: 'JobHandle', dataset_dir: str, min_files: int, target_file_mb: int) -> None:
+        """Background job: merge the small files of every dataset."""
+        from storage.dataset import compact_datasets
+        
+        stats = compact_datasets(dataset_dir, min_files, target_file_mb)
+        job.progress(1.0, f"Merged {stats['files_merged']} small files into {stats['files_written']}")
 
 
 def main():
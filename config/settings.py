@@ -30,6 +30,22 @@ class DocumentProcessingConfig(BaseModel):
         default=512,
         description="Default chunk size for text splitting"
     )
+    default_chunk_overlap: int = Field(
+        default=0,
+        description="Default overlap between consecutive chunks"
+    )
+    chunking_strategy: str = Field(
+        default="structure",
+        description="Chunking strategy: 'structure' packs headings, paragraphs, lists and tables; 'window' uses fixed token windows"
+    )
+    tokenizer: str = Field(
+        default="regex",
+        description="Tokenizer that measures chunk sizes: 'words', 'regex' (BPE approximation), 'huggingface' or 'tiktoken'"
+    )
+    tokenizer_path: Optional[str] = Field(
+        default=None,
+        description="Local vocabulary file for the tokenizer (tokenizer.json or .tiktoken rank file)"
+    )
     extract_tables: bool = Field(
         default=True,
         description="Extract tables by default"
@@ -44,7 +60,59 @@ class DocumentProcessingConfig(BaseModel):
     )
     max_workers: int = Field(
         default=4,
-        description="Maximum number of worker threads"
+        description="Maximum number of document conversion worker processes"
+    )
+    spool_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for spooled uploads (system temp directory if unset)"
+    )
+    result_queue_size: int = Field(
+        default=16,
+        description="Finished results buffered before processing waits for the consumer"
+    )
+    ocr_mode: str = Field(
+        default="auto",
+        description="OCR mode for PDFs: 'auto' (triage text layer), 'always' or 'never'"
+    )
+    ocr_triage_sample_pages: int = Field(
+        default=8,
+        description="Pages sampled when measuring a PDF's text layer"
+    )
+    ocr_min_chars_per_page: int = Field(
+        default=100,
+        description="Characters a sampled page needs for its text layer to count as usable"
+    )
+    ocr_text_coverage_threshold: float = Field(
+        default=0.9,
+        description="Share of sampled pages with usable text above which OCR is skipped"
+    )
+    fallback_time_budget_seconds: float = Field(
+        default=60.0,
+        description="Time budget for text-layer-only extraction of damaged PDFs"
+    )
+    shard_threshold_pages: int = Field(
+        default=100,
+        description="PDFs with more pages than this are converted as parallel page-range shards (0 disables)"
+    )
+    shard_size_pages: int = Field(
+        default=50,
+        description="Pages per shard when converting large PDFs"
+    )
+    cache_enabled: bool = Field(
+        default=True,
+        description="Cache extraction results keyed by file content and options"
+    )
+    cache_dir: str = Field(
+        default=".cache/conversions",
+        description="Directory for cached extraction results"
+    )
+    cache_max_size_mb: int = Field(
+        default=2048,
+        description="Maximum size of the conversion cache in MB"
+    )
+    cache_max_age_days: int = Field(
+        default=30,
+        description="Days before a cached extraction result expires"
     )
 
 class WebCrawlingConfig(BaseModel):
@@ -82,6 +150,58 @@ class WebCrawlingConfig(BaseModel):
         default=3,
         description="Maximum number of retries for failed requests"
     )
+    max_requests_per_host: int = Field(
+        default=2,
+        description="Maximum concurrent requests to a single host"
+    )
+    retry_backoff_seconds: float = Field(
+        default=1.0,
+        description="Base delay of the jittered exponential backoff between retries"
+    )
+    rendering_mode: str = Field(
+        default="auto",
+        description="Page rendering: 'auto' (HTTP first, browser when needed), 'http' or 'browser'"
+    )
+    render_domains: List[str] = Field(
+        default=[],
+        description="Host patterns (e.g. '*.example.com') always rendered in the browser"
+    )
+    static_domains: List[str] = Field(
+        default=[],
+        description="Host patterns never rendered in the browser"
+    )
+    min_text_words: int = Field(
+        default=30,
+        description="Pages with scripts and fewer words of text are rendered in the browser"
+    )
+    max_page_bytes: int = Field(
+        default=5 * 1024 * 1024,
+        description="Maximum size of a fetched page in bytes"
+    )
+    max_browser_pages: int = Field(
+        default=2,
+        description="Maximum number of pages rendered in the browser at once"
+    )
+    robots_cache_path: str = Field(
+        default=".cache/robots.json",
+        description="File the robots.txt cache is persisted to"
+    )
+    robots_cache_ttl_hours: float = Field(
+        default=24,
+        description="Hours a fetched robots.txt is reused"
+    )
+    robots_error_ttl_minutes: float = Field(
+        default=30,
+        description="Minutes before an unreachable robots.txt is fetched again"
+    )
+    max_crawl_delay_seconds: float = Field(
+        default=30,
+        description="Upper bound on a site's robots.txt Crawl-delay"
+    )
+    sitemap_concurrency: int = Field(
+        default=4,
+        description="Maximum number of sitemaps read at once"
+    )
 
 class LoggingConfig(BaseModel):
     """Configuration for logging."""
@@ -127,6 +247,48 @@ class UIConfig(BaseModel):
         description="Number of results to show per page"
     )
 
+class JobsConfig(BaseModel):
+    """Configuration for background jobs."""
+    
+    max_concurrent_jobs: int = Field(
+        default=2,
+        description="Maximum number of processing/crawling jobs running at once"
+    )
+    poll_interval_seconds: float = Field(
+        default=1.0,
+        description="How often the UI polls running jobs for progress"
+    )
+    retention_minutes: int = Field(
+        default=60,
+        description="How long finished jobs are kept for their session to collect"
+    )
+
+class StorageConfig(BaseModel):
+    """Configuration for result storage."""
+    
+    results_path: str = Field(
+        default="data/results.sqlite3",
+        description="SQLite database holding processing and crawling results"
+    )
+    dataset_dir: str = Field(
+        default="data/datasets",
+        description="Root directory of the partitioned Parquet datasets"
+    )
+    dataset_partitions: List[str] = Field(
+        default=["source", "date"],
+        description="Dataset partition keys, outermost first ('job', 'source', 'date')"
+    )
+    compaction_min_files: int = Field(
+        default=8,
+        ge=2,
+        description="Small files a dataset partition needs before it is compacted"
+    )
+    compaction_target_mb: int = Field(
+        default=128,
+        ge=1,
+        description="Target size of compacted dataset files in MB"
+    )
+
 class AppConfig(BaseModel):
     """Main application configuration."""
     
@@ -156,6 +318,12 @@ class AppConfig(BaseModel):
     ui: UIConfig = Field(
         default_factory=UIConfig
     )
+    jobs: JobsConfig = Field(
+        default_factory=JobsConfig
+    )
+    storage: StorageConfig = Field(
+        default_factory=StorageConfig
+    )
     
     @validator('debug', pre=True)
     def parse_debug(cls, v):
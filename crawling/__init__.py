@@ -1,10 +1,36 @@
 """
 Web Crawling package for Kontext.
 
-This package handles web crawling functionality using Crawlee
-with domain restrictions, robots.txt compliance, and sitemap discovery.
+This package handles web crawling: HTTP-first fetching with a headless
+browser fallback, domain restrictions, robots.txt compliance, and sitemap
+discovery.
+
+Submodules are imported on first attribute access (PEP 562) so that
+importing the package does not load aiohttp and Playwright.
 """
 
-from .crawler import WebCrawler
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .crawler import WebCrawler
+
+# Public name -> submodule that defines it
+_LAZY_EXPORTS = {
+    'WebCrawler': '.crawler'
+}
+
+__all__ = ['WebCrawler']
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining ``name`` on first access."""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ['WebCrawler']
\ No newline at end of file
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
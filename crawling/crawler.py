@@ -1,98 +1,115 @@
 """
 Web Crawling Module for Kontext.
 
-Advanced web crawler using Crawlee with domain restrictions, robots.txt compliance,
-sitemap discovery, and configurable crawling strategies.
+Web crawler with domain restrictions, robots.txt compliance, sitemap
+discovery, and configurable crawling strategies.
+
+Pages are fetched over plain HTTP with a pooled client and parsed off the
+event loop (see crawling.fetcher); only pages that need JavaScript to show
+their content are rendered in a headless browser (see crawling.renderer).
 """
 
 import asyncio
-import aiohttp
-from pathlib import Path
-from typing import List, Dict, Any, Optional, Set, Union
-from urllib.parse import urljoin, urlparse, robots
-from urllib.robotparser import RobotFileParser
-import polars as pl
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Set
+from urllib.parse import urljoin, urlparse
 from datetime import datetime
-import xml.etree.ElementTree as ET
-from collections import deque
-import re
-
-# Crawlee and async libraries
-from crawlee.playwright_crawler import PlaywrightCrawler, PlaywrightCrawlingContext
-from crawlee.router import Router
-from crawlee import Request
-import streamlit as st
-
-# Progress and logging
-from tqdm.asyncio import tqdm
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+
 from loguru import logger
 
 # Local imports
 from config.settings import AppConfig
 from utils.validators import validate_url, is_same_domain
+from .fetcher import HttpFetcher, page_links, parse_html, rendering_reason
+from .renderer import BrowserRenderer, RendererUnavailable
+from .robots import RobotsCache, RobotsRules, site_root
+from .scheduler import CrawlRequest, CrawlScheduler
+from .sitemaps import SitemapReader, SitemapUrl
 
-console = Console()
+# Extracts everything a page result needs in one page.evaluate round trip.
+# Links are resolved by the browser (a.href) against the document base URL;
+# the text is read last, after script and style elements are removed.
+_EXTRACT_PAGE_SCRIPT = """
+() => {
+    const meta = document.querySelector('meta[name="description" i]');
+    const headings = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6'), el => ({
+        level: parseInt(el.tagName.substring(1)),
+        text: el.textContent.trim()
+    }));
+    const links = [];
+    document.querySelectorAll('a[href]').forEach(el => {
+        const href = el.href;
+        if (href) {
+            links.push({
+                url: href.split('#')[0],
+                text: el.textContent.trim(),
+                title: el.getAttribute('title') || ''
+            });
+        }
+    });
+    document.querySelectorAll('script, style').forEach(el => el.remove());
+    const body = document.body;
+    return {
+        title: document.title || '',
+        meta_description: meta ? meta.getAttribute('content') || '' : '',
+        headings: headings,
+        links: links,
+        text_content: body ? body.innerText || body.textContent || '' : ''
+    };
+}
+"""
+
+# HTTP statuses worth retrying after a backoff
+_RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
 
 class WebCrawler:
     """
-    Advanced web crawler with Crawlee integration and comprehensive configuration.
-    
+    Advanced web crawler with HTTP-first fetching and comprehensive configuration.
+
     Features:
+    - HTTP-first fetching with headless-browser rendering only where needed
     - Domain restriction and robots.txt compliance
     - Sitemap discovery and parsing
     - Configurable crawling strategies (BFS/DFS)
     - URL filtering and validation
     - Live progress tracking
     """
-    
-    def __init__(self, config: AppConfig):
+
+    def __init__(self, config: AppConfig, robots_cache: Optional[RobotsCache] = None):
         """
         Initialize the web crawler.
-        
+
         Args:
             config: Application configuration
+            robots_cache: Shared robots.txt cache (a private one if None)
         """
         self.config = config
         self.crawl_config = config.web_crawling
-        
+
         # Crawler state
         self.visited_urls: Set[str] = set()
         self.failed_urls: Set[str] = set()
-        self.robots_cache: Dict[str, RobotFileParser] = {}
+        self.robots_cache = robots_cache if robots_cache is not None else RobotsCache()
         self.sitemap_urls: Set[str] = set()
-        
-        # Results storage
-        self.crawl_results: List[Dict[str, Any]] = []
-        
-        # Initialize router for Crawlee
-        self.router = Router[PlaywrightCrawlingContext]()
-        self._setup_crawler_routes()
-        
-        logger.info("WebCrawler initialized with Crawlee")
-    
-    def _setup_crawler_routes(self) -> None:
-        """Setup Crawlee router with request handlers."""
-        
-        @self.router.default_handler
-        async def default_handler(context: PlaywrightCrawlingContext) -> None:
-            """Default handler for crawled pages."""
-            try:
-                # Extract page content
-                page_content = await self._extract_page_content(context)
-                
-                # Store result
-                self.crawl_results.append(page_content)
-                
-                # Find and enqueue new URLs
-                if len(self.visited_urls) < self.current_max_urls:
-                    await self._enqueue_new_urls(context)
-                    
-            except Exception as e:
-                logger.error(f"Error processing {context.request.url}: {e}")
-                self.failed_urls.add(context.request.url)
-    
+
+        # Pages produced by the running crawl (results are streamed, not kept)
+        self.pages_crawled = 0
+
+        # Frontier of the running crawl and its clients
+        self._frontier: Optional[CrawlScheduler] = None
+        self._start_urls: List[str] = []
+        self._fetcher: Optional[HttpFetcher] = None
+        self._renderer: Optional[BrowserRenderer] = None
+
+        # Per-host Crawl-delay from robots.txt, and Retry-After of failed requests
+        self._crawl_delays: Dict[str, float] = {}
+        self._retry_after: Dict[str, float] = {}
+
+        # Sitemap entries (lastmod, priority) of frontier URLs, and a signal for new frontier URLs
+        self._sitemap_entries: Dict[str, SitemapUrl] = {}
+        self._frontier_ready: Optional[asyncio.Event] = None
+
+        logger.info("WebCrawler initialized")
+
     async def crawl_urls_async(
         self,
         start_urls: List[str],
@@ -101,233 +118,358 @@ class WebCrawler:
     ) -> List[Dict[str, Any]]:
         """
         Crawl URLs asynchronously with progress tracking.
-        
+
+        Collects everything yielded by iter_crawl_urls_async; prefer the
+        generator for large crawls.
+
         Args:
             start_urls: List of starting URLs
             options: Crawling options
-            progress_placeholder: Streamlit placeholder for progress updates
-            
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
+
         Returns:
             List of crawled page data
         """
+        return [
+            result async for result in self.iter_crawl_urls_async(start_urls, options, progress_placeholder)
+        ]
+
+    async def iter_crawl_urls_async(
+        self,
+        start_urls: List[str],
+        options: Dict[str, Any],
+        progress_placeholder: Optional[Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Crawl URLs, yielding each page as soon as it is done.
+
+        Up to ``concurrent_requests`` pages are crawled at once, taken from
+        the frontier in breadth-first or depth-first order. Pages are not
+        kept by the crawler, so memory use does not grow with the crawl.
+
+        Args:
+            start_urls: List of starting URLs
+            options: Crawling options
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
+
+        Yields:
+            Crawled page data, in completion order
+        """
         logger.info(f"Starting crawl of {len(start_urls)} URLs")
-        
+
         # Store current options for use in handlers
-        self.current_max_urls = options.get('max_urls', 100)
-        self.current_max_depth = options.get('max_depth', 3)
+        self.current_max_urls = options.get('max_urls', self.crawl_config.default_max_urls)
+        self.current_max_depth = options.get('max_depth', self.crawl_config.default_max_depth)
         self.domain_restriction = options.get('domain_restriction', True)
-        self.respect_robots = options.get('respect_robots', True)
-        
+        self.respect_robots = options.get('respect_robots', self.crawl_config.respect_robots_txt)
+        self.rendering_mode = options.get('rendering', self.crawl_config.rendering_mode)
+        concurrency = max(1, options.get('concurrent_requests', self.crawl_config.default_concurrent_requests))
+        delay_ms = options.get('delay_between_requests', self.crawl_config.default_delay_ms)
+
         # Reset state
         self.visited_urls.clear()
         self.failed_urls.clear()
-        self.crawl_results.clear()
-        
-        # Discover sitemaps if enabled
-        if options.get('discover_sitemaps', True):
-            await self._discover_sitemaps(start_urls)
-        
-        # Initialize Crawlee crawler
-        crawler = PlaywrightCrawler(
-            router=self.router,
-            max_requests_per_crawl=self.current_max_urls,
-            request_handler_timeout=self.crawl_config.timeout_seconds * 1000,  # Convert to ms
-            headless=True,
-            browser_type='chromium'
+        self.pages_crawled = 0
+        rendered = 0
+        self._frontier = CrawlScheduler(
+            delay_seconds=delay_ms / 1000,
+            max_per_host=min(concurrency, self.crawl_config.max_requests_per_host),
+            max_retries=self.crawl_config.max_retries,
+            backoff_seconds=self.crawl_config.retry_backoff_seconds,
+            depth_first=options.get('crawl_strategy', 'BFS') == 'DFS'
         )
-        
-        # Create initial requests
-        initial_requests = []
-        for url in start_urls:
-            if await self._should_crawl_url(url, 0):
-                initial_requests.append(Request.from_url(url, user_data={'depth': 0}))
-        
-        # Add sitemap URLs if discovered
-        for sitemap_url in list(self.sitemap_urls)[:50]:  # Limit sitemap URLs
-            if await self._should_crawl_url(sitemap_url, 0):
-                initial_requests.append(Request.from_url(sitemap_url, user_data={'depth': 0}))
-        
+        self._crawl_delays.clear()
+        self._retry_after.clear()
+        self.sitemap_urls.clear()
+        self._sitemap_entries.clear()
+        self._frontier_ready = asyncio.Event()
+        self._start_urls = list(start_urls)
+
+        self._fetcher = HttpFetcher(
+            self.crawl_config.user_agent,
+            timeout_seconds=self.crawl_config.timeout_seconds,
+            max_connections=max(concurrency, 10),
+            max_connections_per_host=self._frontier.max_per_host,
+            max_page_bytes=self.crawl_config.max_page_bytes
+        )
+        self._renderer = BrowserRenderer(
+            self.crawl_config.user_agent,
+            timeout_seconds=self.crawl_config.timeout_seconds,
+            max_pages=min(concurrency, self.crawl_config.max_browser_pages)
+        )
+
+        pending: Dict[asyncio.Task, CrawlRequest] = {}
+        discovery: Optional[asyncio.Task] = None
+        wakeup: Optional[asyncio.Task] = None
         try:
-            # Run the crawler
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TaskProgressColumn(),
-                console=console
-            ) as progress:
-                
-                task = progress.add_task("Crawling websites...", total=len(initial_requests))
-                
-                # Start crawling
-                await crawler.run(initial_requests)
-                
-                # Update progress
-                if progress_placeholder:
-                    progress_placeholder.progress(1.0)
-        
+            # Seed the frontier
+            for url in start_urls:
+                if await self._should_crawl_url(url, 0):
+                    self._frontier.add(url, 0)
+
+            # Sitemap URLs stream into the frontier while the crawl runs
+            if options.get('discover_sitemaps', True):
+                discovery = asyncio.create_task(self._discover_sitemaps(start_urls))
+
+            while len(self._frontier) or pending or (discovery is not None and not discovery.done()):
+                # Dispatch requests up to the global ceiling, hosts in turn, within their rate limits
+                self._frontier_ready.clear()
+                while len(pending) < concurrency:
+                    request = self._frontier.pop_ready()
+                    if request is None:
+                        break
+                    pending[asyncio.create_task(self._crawl_page(request.url, request.depth))] = request
+
+                # Also wake up when discovery adds URLs or finishes, or a rate-limited host is due
+                waiters = set(pending)
+                if discovery is not None and not discovery.done():
+                    if wakeup is None or wakeup.done():
+                        wakeup = asyncio.create_task(self._frontier_ready.wait())
+                    waiters |= {wakeup, discovery}
+                timeout = self._frontier.next_ready_in() if len(pending) < concurrency else None
+                if not waiters:
+                    await asyncio.sleep(timeout or 0)
+                    continue
+
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    request = pending.pop(task, None)
+                    if request is None:
+                        continue
+                    self._frontier.done(request)
+                    result = task.result()
+                    retry_after = self._retry_after.pop(request.url, None)
+                    if result is not None and self._is_retryable(result) and self._frontier.retry(request, retry_after):
+                        logger.debug(f"Retrying {request.url} ({result.get('error')}), attempt {request.attempt + 2}")
+                        continue
+                    if result is None:
+                        continue
+
+                    if request.attempt:
+                        result['attempts'] = request.attempt + 1
+                        if not result.get('error'):
+                            self.failed_urls.discard(request.url)
+                    entry = self._sitemap_entries.get(result['url'])
+                    if entry is not None:
+                        result.update({'sitemap_lastmod': entry.lastmod, 'sitemap_priority': entry.priority})
+                    self.pages_crawled += 1
+                    rendered += result.get('fetched_with') == 'browser'
+                    if progress_placeholder is not None:
+                        progress_placeholder.progress(
+                            min(1.0, self.pages_crawled / max(1, self.current_max_urls))
+                        )
+                    yield result
+
+            if progress_placeholder:
+                progress_placeholder.progress(1.0)
+
         except Exception as e:
             logger.error(f"Crawling error: {e}")
             raise
-        
+
         finally:
-            await crawler.tear_down()
-        
-        logger.info(f"Crawling completed. Processed {len(self.crawl_results)} pages")
-        return self.crawl_results
-    
-    async def _extract_page_content(self, context: PlaywrightCrawlingContext) -> Dict[str, Any]:
-        """Extract content from a crawled page."""
-        page = context.page
-        request = context.request
-        
+            for task in [*pending, discovery, wakeup]:
+                if task is not None:
+                    task.cancel()
+            await self._fetcher.close()
+            await self._renderer.close()
+            await asyncio.to_thread(self.robots_cache.save)
+
+        logger.info(
+            f"Crawling completed. Processed {self.pages_crawled} pages "
+            f"({rendered} rendered in the browser, {self._frontier.retries} retries)"
+        )
+
+    async def _crawl_page(self, url: str, depth: int) -> Optional[Dict[str, Any]]:
+        """
+        Crawl one page: fetch it over HTTP and render it only if needed.
+
+        Args:
+            url: Page URL
+            depth: Crawl depth of the page
+
+        Returns:
+            Page data, or None for responses that are not pages (e.g. images)
+        """
         try:
-            # Basic page information
-            title = await page.title()
-            url = request.url
-            
-            # Extract text content
-            text_content = await page.evaluate("""
-                () => {
-                    // Remove script and style elements
-                    const scripts = document.querySelectorAll('script, style');
-                    scripts.forEach(el => el.remove());
-                    
-                    // Get text content
-                    return document.body.innerText || document.body.textContent || '';
-                }
-            """)
-            
-            # Extract metadata
-            meta_description = await page.evaluate("""
-                () => {
-                    const meta = document.querySelector('meta[name="description"]');
-                    return meta ? meta.getAttribute('content') : '';
-                }
-            """)
-            
-            # Extract headings
-            headings = await page.evaluate("""
-                () => {
-                    const headings = [];
-                    const elements = document.querySelectorAll('h1, h2, h3, h4, h5, h6');
-                    elements.forEach(el => {
-                        headings.push({
-                            level: parseInt(el.tagName.substring(1)),
-                            text: el.textContent.trim()
-                        });
-                    });
-                    return headings;
-                }
-            """)
-            
-            # Extract links
-            links = await page.evaluate("""
-                () => {
-                    const links = [];
-                    const elements = document.querySelectorAll('a[href]');
-                    elements.forEach(el => {
-                        const href = el.getAttribute('href');
-                        const text = el.textContent.trim();
-                        if (href && text) {
-                            links.push({
-                                url: href,
-                                text: text,
-                                title: el.getAttribute('title') || ''
-                            });
-                        }
-                    });
-                    return links;
-                }
-            """)
-            
-            # Get response status
-            response = await page.evaluate("() => ({ status: window.performance?.navigation?.type || 0 })")
-            
-            # Calculate content metrics
-            word_count = len(text_content.split())
-            char_count = len(text_content)
-            
-            return {
-                'url': url,
-                'title': title,
-                'meta_description': meta_description,
-                'text_content': text_content,
-                'headings': headings,
-                'links': links,
-                'word_count': word_count,
-                'char_count': char_count,
-                'status_code': 200,  # Playwright successful load
-                'crawled_at': datetime.now().isoformat(),
-                'depth': request.user_data.get('depth', 0)
+            rules = {
+                'mode': self.rendering_mode,
+                'render_domains': self.crawl_config.render_domains,
+                'static_domains': self.crawl_config.static_domains,
+                'min_text_words': self.crawl_config.min_text_words
             }
-            
+
+            # Domain rules and the browser mode skip the HTTP fetch altogether
+            reason = rendering_reason(url, None, **rules)
+            page = None
+            status_code = 0
+            if reason is None:
+                fetched = await self._fetcher.fetch(url)
+                if fetched.retry_after is not None:
+                    self._retry_after[url] = fetched.retry_after
+                if fetched.error:
+                    self.failed_urls.add(url)
+                    return self._error_result(url, depth, fetched.error)
+                status_code = fetched.status
+                if fetched.html is None:
+                    if status_code >= 400:
+                        self.failed_urls.add(url)
+                        return self._error_result(url, depth, f"HTTP {status_code}", status_code)
+                    logger.debug(f"Skipping {url}: {fetched.content_type or 'unknown'} content")
+                    return None
+
+                # Parsing is CPU-bound; keep the event loop free for other fetches
+                page = await asyncio.to_thread(parse_html, fetched.html, fetched.final_url)
+                if status_code < 400:
+                    reason = rendering_reason(url, page, **rules)
+
+            if reason is not None:
+                try:
+                    result = await self._renderer.render(
+                        url, lambda browser_page, response: self._render_page(browser_page, response, url, depth)
+                    )
+                    result['render_reason'] = reason
+                    return result
+                except RendererUnavailable as e:
+                    if page is None:
+                        # Forced rendering without a browser: fall back to HTTP
+                        fetched = await self._fetcher.fetch(url)
+                        if fetched.error or fetched.html is None:
+                            self.failed_urls.add(url)
+                            return self._error_result(url, depth, fetched.error or str(e), fetched.status)
+                        status_code = fetched.status
+                        page = await asyncio.to_thread(parse_html, fetched.html, fetched.final_url)
+                    result = self._page_result(url, depth, page, status_code)
+                    result.update({'render_reason': reason, 'render_error': str(e)})
+                    await self._enqueue_new_urls(page_links(page), depth)
+                    return result
+
+            result = self._page_result(url, depth, page, status_code)
+            if status_code >= 400:
+                self.failed_urls.add(url)
+                result['error'] = f"HTTP {status_code}"
+            else:
+                await self._enqueue_new_urls(page_links(page), depth)
+            return result
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Content extraction error for {request.url}: {e}")
-            return {
-                'url': request.url,
-                'title': '',
-                'meta_description': '',
-                'text_content': '',
-                'headings': [],
-                'links': [],
-                'word_count': 0,
-                'char_count': 0,
-                'status_code': 0,
-                'error': str(e),
-                'crawled_at': datetime.now().isoformat(),
-                'depth': request.user_data.get('depth', 0)
-            }
-    
-    async def _enqueue_new_urls(self, context: PlaywrightCrawlingContext) -> None:
-        """Find and enqueue new URLs from the current page."""
-        current_depth = context.request.user_data.get('depth', 0)
-        
+            logger.error(f"Error processing {url}: {e}")
+            self.failed_urls.add(url)
+            return self._error_result(url, depth, str(e))
+
+    @staticmethod
+    def _is_retryable(result: Dict[str, Any]) -> bool:
+        """Whether a failed page may succeed on a later attempt (network errors, 408, 429, 5xx)."""
+        if not result.get('error'):
+            return False
+        status_code = result.get('status_code') or 0
+        return status_code == 0 or status_code in _RETRY_STATUSES
+
+    def _page_result(self, url: str, depth: int, page: Dict[str, Any], status_code: int) -> Dict[str, Any]:
+        """Build the result of a page fetched over HTTP."""
+        text_content = page['text_content']
+        return {
+            'url': url,
+            'title': page['title'],
+            'meta_description': page['meta_description'],
+            'text_content': text_content,
+            'headings': page['headings'],
+            'links': [link for link in page['links'] if link['text']],
+            'word_count': len(text_content.split()),
+            'char_count': len(text_content),
+            'status_code': status_code,
+            'crawled_at': datetime.now().isoformat(),
+            'depth': depth,
+            'fetched_with': 'http'
+        }
+
+    def _error_result(self, url: str, depth: int, error: str, status_code: int = 0) -> Dict[str, Any]:
+        """Build the result of a page that could not be crawled."""
+        return {
+            'url': url,
+            'title': '',
+            'meta_description': '',
+            'text_content': '',
+            'headings': [],
+            'links': [],
+            'word_count': 0,
+            'char_count': 0,
+            'status_code': status_code,
+            'error': error,
+            'crawled_at': datetime.now().isoformat(),
+            'depth': depth
+        }
+
+    async def _render_page(self, page: Any, response: Any, url: str, depth: int) -> Dict[str, Any]:
+        """
+        Extract a page loaded in the browser and enqueue its links.
+
+        Args:
+            page: Playwright page
+            response: Navigation response (None if the page was not navigated to a new document)
+            url: Page URL
+            depth: Crawl depth of the page
+
+        Returns:
+            Page data
+        """
+        status_code = response.status if response is not None else 0
+        try:
+            # One round trip to the browser for everything the result needs
+            extracted = await page.evaluate(_EXTRACT_PAGE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Content extraction error for {url}: {e}")
+            self.failed_urls.add(url)
+            return self._error_result(url, depth, str(e), status_code)
+
+        links = [link for link in extracted['links'] if link['url'].startswith(('http://', 'https://'))]
+        text_content = extracted['text_content']
+        result = {
+            'url': url,
+            'title': extracted['title'],
+            'meta_description': extracted['meta_description'],
+            'text_content': text_content,
+            'headings': extracted['headings'],
+            'links': [link for link in links if link['text']],
+            'word_count': len(text_content.split()),
+            'char_count': len(text_content),
+            'status_code': status_code,
+            'crawled_at': datetime.now().isoformat(),
+            'depth': depth,
+            'fetched_with': 'browser'
+        }
+
+        if status_code >= 400:
+            self.failed_urls.add(url)
+            result['error'] = f"HTTP {status_code}"
+        else:
+            await self._enqueue_new_urls(list(dict.fromkeys(link['url'] for link in links)), depth)
+        return result
+
+    async def _enqueue_new_urls(self, links: List[str], current_depth: int) -> None:
+        """
+        Add new URLs linked from a page to the frontier.
+
+        Args:
+            links: Absolute URLs linked from the page
+            current_depth: Crawl depth of the page
+        """
         if current_depth >= self.current_max_depth:
             return
-        
-        # Extract all links from the page
-        links = await context.page.evaluate("""
-            () => {
-                const links = [];
-                const elements = document.querySelectorAll('a[href]');
-                elements.forEach(el => {
-                    const href = el.getAttribute('href');
-                    if (href) {
-                        links.push(href);
-                    }
-                });
-                return links;
-            }
-        """)
-        
-        # Process and filter links
-        base_url = context.request.url
-        new_requests = []
-        
+
+        new_urls = 0
         for link in links:
-            try:
-                # Resolve relative URLs
-                absolute_url = urljoin(base_url, link)
-                
-                # Check if we should crawl this URL
-                if await self._should_crawl_url(absolute_url, current_depth + 1):
-                    new_requests.append(
-                        Request.from_url(absolute_url, user_data={'depth': current_depth + 1})
-                    )
-                    
-                    # Limit the number of new requests
-                    if len(new_requests) >= 10:
-                        break
-                        
-            except Exception as e:
-                logger.debug(f"Error processing link {link}: {e}")
-                continue
-        
-        # Enqueue new requests
-        if new_requests:
-            await context.add_requests(new_requests)
-    
+            # Check if we should crawl this URL
+            if await self._should_crawl_url(link, current_depth + 1):
+                self._frontier.add(link, current_depth + 1)
+
+                # Limit the number of new requests
+                new_urls += 1
+                if new_urls >= 10:
+                    break
+
     async def _should_crawl_url(self, url: str, depth: int) -> bool:
         """
         Determine if a URL should be crawled based on various criteria.
@@ -359,8 +501,8 @@ class WebCrawler:
         parsed_url = urlparse(url)
         
         # Domain restriction check
-        if self.domain_restriction and hasattr(self, '_start_domains'):
-            if not any(is_same_domain(url, domain) for domain in self._start_domains):
+        if self.domain_restriction and self._start_urls:
+            if not any(is_same_domain(url, start_url) for start_url in self._start_urls):
                 return False
         
         # Robots.txt check
@@ -377,6 +519,23 @@ class WebCrawler:
         self.visited_urls.add(url)
         return True
     
+    async def _robots_rules(self, url: str) -> RobotsRules:
+        """
+        robots.txt rules for the site of a URL.
+
+        The first lookup of a site also records its Crawl-delay for the
+        page scheduler.
+        """
+        rules = await self.robots_cache.get(url, self._fetcher.session, min(10, self.crawl_config.timeout_seconds))
+        host = urlparse(url).netloc.lower()
+        if host not in self._crawl_delays:
+            delay = rules.crawl_delay(self.crawl_config.user_agent)
+            self._crawl_delays[host] = min(delay, self.crawl_config.max_crawl_delay_seconds) if delay else 0.0
+            if delay and self.respect_robots:
+                logger.info(f"{host} asks for a crawl delay of {delay}s")
+                self._frontier.set_crawl_delay(url, self._crawl_delays[host])
+        return rules
+
     async def _check_robots_txt(self, url: str) -> bool:
         """
         Check if URL is allowed by robots.txt.
@@ -388,30 +547,8 @@ class WebCrawler:
             True if URL is allowed
         """
         try:
-            parsed_url = urlparse(url)
-            base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            
-            # Check cache first
-            if base_url in self.robots_cache:
-                rp = self.robots_cache[base_url]
-            else:
-                # Fetch and parse robots.txt
-                robots_url = urljoin(base_url, '/robots.txt')
-                rp = RobotFileParser()
-                rp.set_url(robots_url)
-                
-                try:
-                    rp.read()
-                    self.robots_cache[base_url] = rp
-                except Exception as e:
-                    logger.debug(f"Could not fetch robots.txt for {base_url}: {e}")
-                    # If robots.txt is not accessible, allow crawling
-                    return True
-            
-            # Check if URL is allowed
-            user_agent = self.crawl_config.user_agent
-            return rp.can_fetch(user_agent, url)
-            
+            rules = await self._robots_rules(url)
+            return rules.can_fetch(self.crawl_config.user_agent, url)
         except Exception as e:
             logger.debug(f"Robots.txt check error for {url}: {e}")
             # If there's an error, allow crawling
@@ -419,105 +556,83 @@ class WebCrawler:
     
     async def _discover_sitemaps(self, start_urls: List[str]) -> None:
         """
-        Discover and parse sitemaps from starting URLs.
+        Discover sitemaps of the starting sites and add their URLs to the frontier.
+
+        Sitemaps listed in robots.txt and the common sitemap locations of
+        each site are read concurrently; URLs are added as they are parsed
+        until the URL limit is reached.
         
         Args:
             start_urls: List of starting URLs
         """
         logger.info("Discovering sitemaps...")
         
-        # Store start domains for domain restriction
-        self._start_domains = [urlparse(url).netloc for url in start_urls]
-        
-        for url in start_urls:
+        sitemap_urls: List[str] = []
+        for base_url in dict.fromkeys(site_root(url) for url in start_urls):
             try:
-                parsed_url = urlparse(url)
-                base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-                
-                # Try common sitemap locations
-                sitemap_urls = [
+                # Sitemaps listed in robots.txt, then the common locations
+                rules = await self._robots_rules(base_url)
+                sitemap_urls.extend(rules.sitemaps + [
                     urljoin(base_url, '/sitemap.xml'),
                     urljoin(base_url, '/sitemap_index.xml'),
                     urljoin(base_url, '/sitemaps.xml')
-                ]
-                
-                for sitemap_url in sitemap_urls:
-                    await self._parse_sitemap(sitemap_url)
-                    
+                ])
             except Exception as e:
-                logger.debug(f"Sitemap discovery error for {url}: {e}")
+                logger.debug(f"Sitemap discovery error for {base_url}: {e}")
         
-        logger.info(f"Discovered {len(self.sitemap_urls)} URLs from sitemaps")
-    
-    async def _parse_sitemap(self, sitemap_url: str) -> None:
-        """
-        Parse a sitemap XML file.
-        
-        Args:
-            sitemap_url: URL of the sitemap
-        """
+        reader = SitemapReader(
+            self._fetcher.session,
+            max_concurrency=self.crawl_config.sitemap_concurrency,
+            timeout_seconds=self.crawl_config.timeout_seconds
+        )
+        entries = reader.iter_urls(dict.fromkeys(sitemap_urls))
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(sitemap_url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        
-                        # Parse XML
-                        root = ET.fromstring(content)
-                        
-                        # Handle sitemap index
-                        if 'sitemapindex' in root.tag:
-                            for sitemap in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap'):
-                                loc = sitemap.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                                if loc is not None:
-                                    await self._parse_sitemap(loc.text)
-                        
-                        # Handle regular sitemap
-                        elif 'urlset' in root.tag:
-                            for url in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url'):
-                                loc = url.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                                if loc is not None:
-                                    self.sitemap_urls.add(loc.text)
-                                    
-                                    # Limit sitemap URLs
-                                    if len(self.sitemap_urls) >= 1000:
-                                        return
-                        
+            async for entry in entries:
+                if len(self.visited_urls) >= self.current_max_urls:
+                    break
+                if await self._should_crawl_url(entry.url, 0):
+                    self.sitemap_urls.add(entry.url)
+                    self._sitemap_entries[entry.url] = entry
+                    self._frontier.add(entry.url, 0)
+                    self._frontier_ready.set()
         except Exception as e:
-            logger.debug(f"Sitemap parsing error for {sitemap_url}: {e}")
+            logger.warning(f"Sitemap discovery failed: {e}")
+        finally:
+            await entries.aclose()
+        
+        logger.info(f"Discovered {len(self.sitemap_urls)} URLs from {reader.sitemaps_read} sitemaps")
     
     def export_results(
         self,
-        results: List[Dict[str, Any]],
+        results: Iterable[Dict[str, Any]],
         format: str = 'json',
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        layout: str = 'results',
+        progress_placeholder: Optional[Any] = None
     ) -> str:
         """
         Export crawling results to specified format.
         
+        Results are streamed batch by batch (see storage.exporters), so a
+        ResultSet of any size can be exported with bounded memory.
+        
         Args:
-            results: Crawling results to export
-            format: Export format ('json', 'csv', 'parquet')
+            results: Crawling results to export (a ResultSet or any iterable)
+            format: Export format ('parquet', 'arrow', 'jsonl', 'csv', 'json', 'sqlite')
             output_path: Output file path
+            layout: 'results' (one row per page) or 'chunks' (one row per page text)
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
             
         Returns:
             Path to exported file
         """
-        if not output_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = f"kontext_crawl_results_{timestamp}.{format}"
+        from storage.exporters import default_export_path, export_results
+        from storage.results_store import PAGES
         
-        # Convert to Polars DataFrame for consistent export
-        df = pl.DataFrame(results)
+        if not output_path:
+            output_path = default_export_path('kontext_crawl_results', format, layout)
         
-        if format == 'json':
-            df.write_json(output_path)
-        elif format == 'csv':
-            df.write_csv(output_path)
-        elif format == 'parquet':
-            df.write_parquet(output_path)
-        else:
-            raise ValueError(f"Unsupported export format: {format}")
+        export_results(results, output_path, format, layout, PAGES, progress_placeholder=progress_placeholder)
         
         logger.info(f"Crawl results exported to {output_path}")
         return output_path
\ No newline at end of file
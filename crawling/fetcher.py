@@ -0,0 +1,334 @@
+"""
+HTTP Fetching and Parsing for Kontext.
+
+Most crawled sites serve their content as static HTML, so pages are fetched
+with a pooled async HTTP client and parsed with BeautifulSoup in a worker
+thread, keeping the event loop free for other fetches. Only pages that need
+JavaScript to show their content are escalated to a headless browser (see
+crawling.renderer); ``rendering_reason`` decides which, from the parsed page
+and per-domain rules.
+"""
+
+import asyncio
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatch
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from loguru import logger
+
+# Rendering modes
+RENDER_AUTO = 'auto'
+RENDER_HTTP = 'http'
+RENDER_BROWSER = 'browser'
+RENDERING_MODES = (RENDER_AUTO, RENDER_HTTP, RENDER_BROWSER)
+
+_HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Elements whose end starts a new line of text, like innerText
+_BLOCK_TAGS = [
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p',
+    'pre', 'section', 'table', 'td', 'th', 'tr', 'ul'
+]
+
+# Ids and attributes of single-page-app mount points
+_SPA_ROOT_IDS = {'root', 'app', '__next', '__nuxt', '___gatsby', 'svelte', 'main-app'}
+_SPA_ROOT_ATTRIBUTES = ('ng-app', 'data-reactroot', 'data-v-app', 'ng-version')
+
+_NOSCRIPT_WALL = re.compile(
+    r'(enable|turn on|requires?|need)\s+javascript|javascript\s+(is\s+)?(disabled|required)',
+    re.IGNORECASE
+)
+
+_WHITESPACE = re.compile(r'[ \t\r\f\v\xa0]+')
+
+
+class FetchResult:
+    """Outcome of one HTTP fetch."""
+
+    __slots__ = ('url', 'final_url', 'status', 'content_type', 'html', 'error', 'retry_after')
+
+    def __init__(
+        self,
+        url: str,
+        final_url: Optional[str] = None,
+        status: int = 0,
+        content_type: str = '',
+        html: Optional[str] = None,
+        error: Optional[str] = None,
+        retry_after: Optional[float] = None
+    ):
+        self.url = url
+        self.final_url = final_url or url
+        self.status = status
+        self.content_type = content_type
+        self.html = html
+        self.error = error
+        self.retry_after = retry_after
+
+    @property
+    def is_html(self) -> bool:
+        return self.content_type in _HTML_CONTENT_TYPES
+
+
+class HttpFetcher:
+    """
+    Pooled async HTTP client for page fetches.
+
+    One session (and connection pool) is shared by all fetches of a crawl,
+    so connections and DNS lookups are reused across pages of a host.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        timeout_seconds: float = 30,
+        max_connections: int = 20,
+        max_connections_per_host: int = 5,
+        max_page_bytes: int = 5 * 1024 * 1024
+    ):
+        """
+        Initialize the fetcher; the session is opened on first use.
+
+        Args:
+            user_agent: User agent sent with every request
+            timeout_seconds: Total timeout of one fetch
+            max_connections: Size of the connection pool
+            max_connections_per_host: Connections kept per host
+            max_page_bytes: Bodies larger than this are truncated
+        """
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_page_bytes = max_page_bytes
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Shared client session, created in the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers={
+                    'User-Agent': self.user_agent,
+                    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.5'
+                }
+            )
+        return self._session
+
+    async def fetch(self, url: str) -> FetchResult:
+        """
+        Fetch a page.
+
+        Non-HTML responses are returned without a body. Network errors are
+        reported in the result rather than raised.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Fetch result
+        """
+        try:
+            async with self.session.get(url, allow_redirects=True) as response:
+                content_type = response.content_type or ''
+                result = FetchResult(
+                    url, str(response.url), response.status, content_type,
+                    retry_after=parse_retry_after(response.headers.get('Retry-After'))
+                )
+                if content_type not in _HTML_CONTENT_TYPES:
+                    return result
+
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > self.max_page_bytes:
+                        logger.debug(f"Truncated {url} at {self.max_page_bytes} bytes")
+                        del body[self.max_page_bytes:]
+                        break
+
+                try:
+                    encoding = response.get_encoding()
+                except Exception:
+                    encoding = 'utf-8'
+                result.html = body.decode(encoding, errors='replace')
+                return result
+
+        except asyncio.TimeoutError:
+            return FetchResult(url, error=f"Timed out after {self.timeout_seconds}s")
+        except aiohttp.ClientError as e:
+            return FetchResult(url, error=f"{type(e).__name__}: {e}")
+
+    async def close(self) -> None:
+        """Close the session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value: Header value, in seconds or as an HTTP date
+
+    Returns:
+        Seconds to wait, or None if absent or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _visible_text(body: Any) -> str:
+    """Approximate the rendered innerText of an element."""
+    for tag in body.find_all(_BLOCK_TAGS):
+        tag.append('\n')
+    lines = (_WHITESPACE.sub(' ', line).strip() for line in body.get_text().splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def parse_html(html: str, url: str) -> Dict[str, Any]:
+    """
+    Extract the content of an HTML page.
+
+    CPU-bound: call it through ``asyncio.to_thread`` from the crawl loop.
+
+    Args:
+        html: Page HTML
+        url: Page URL, for resolving links
+
+    Returns:
+        Dictionary with title, meta_description, text_content, headings,
+        links (absolute URLs) and render_hints for rendering_reason
+    """
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(html, 'lxml')
+    except Exception:
+        soup = BeautifulSoup(html, 'html.parser')
+
+    base = soup.find('base', href=True)
+    base_url = urljoin(url, base['href']) if base else url
+
+    title = soup.title.get_text(strip=True) if soup.title else ''
+    meta = soup.find('meta', attrs={'name': re.compile('^description$', re.IGNORECASE)})
+    meta_description = meta.get('content', '') if meta else ''
+
+    # Signals for rendering_reason, gathered before scripts are stripped
+    script_count = len(soup.find_all('script'))
+    noscript_text = ' '.join(tag.get_text(' ', strip=True) for tag in soup.find_all('noscript'))
+    spa_roots = [
+        tag for tag in soup.find_all(True, id=True) if tag.get('id') in _SPA_ROOT_IDS
+    ] + [
+        tag for tag in soup.find_all(True) if any(tag.has_attr(attribute) for attribute in _SPA_ROOT_ATTRIBUTES)
+    ]
+    empty_spa_root = any(len(tag.get_text(' ', strip=True).split()) < 5 for tag in spa_roots)
+
+    links = []
+    for anchor in soup.find_all('a', href=True):
+        href = anchor['href'].strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+        links.append({
+            'url': urljoin(base_url, href).split('#', 1)[0],
+            'text': anchor.get_text(' ', strip=True),
+            'title': anchor.get('title', '')
+        })
+
+    for tag in soup.find_all(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+
+    headings = [
+        {'level': int(tag.name[1]), 'text': tag.get_text(' ', strip=True)}
+        for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    ]
+    body = soup.body or soup
+    text_content = _visible_text(body)
+
+    return {
+        'title': title,
+        'meta_description': meta_description,
+        'text_content': text_content,
+        'headings': headings,
+        'links': links,
+        'render_hints': {
+            'script_count': script_count,
+            'empty_spa_root': empty_spa_root,
+            'noscript_wall': bool(_NOSCRIPT_WALL.search(noscript_text))
+        }
+    }
+
+
+def _host_matches(url: str, patterns: Sequence[str]) -> bool:
+    host = (urlparse(url).hostname or '').lower()
+    return any(fnmatch(host, pattern.lower()) for pattern in patterns)
+
+
+def rendering_reason(
+    url: str,
+    page: Optional[Dict[str, Any]],
+    mode: str = RENDER_AUTO,
+    render_domains: Sequence[str] = (),
+    static_domains: Sequence[str] = (),
+    min_text_words: int = 30
+) -> Optional[str]:
+    """
+    Decide whether a page must be rendered in a browser.
+
+    Args:
+        url: Page URL
+        page: Result of parse_html for the HTTP response (None to decide before fetching)
+        mode: RENDER_AUTO, RENDER_HTTP (never render) or RENDER_BROWSER (always render)
+        render_domains: Host patterns (fnmatch) that are always rendered
+        static_domains: Host patterns that are never rendered
+        min_text_words: Pages with scripts and fewer words are considered empty
+
+    Returns:
+        Why the page needs rendering, or None if the HTTP response suffices
+    """
+    if mode == RENDER_HTTP or _host_matches(url, static_domains):
+        return None
+    if mode == RENDER_BROWSER:
+        return 'rendering mode'
+    if _host_matches(url, render_domains):
+        return 'domain rule'
+    if page is None:
+        return None
+
+    hints = page['render_hints']
+    words = len(page['text_content'].split())
+    if hints['empty_spa_root'] and words < 4 * min_text_words:
+        return 'single-page app'
+    if hints['noscript_wall'] and words < 4 * min_text_words:
+        return 'noscript wall'
+    if hints['script_count'] and words < min_text_words:
+        return 'empty body'
+    return None
+
+
+def page_links(page: Dict[str, Any]) -> List[str]:
+    """URLs linked from a parsed page, in document order without duplicates."""
+    return list(dict.fromkeys(link['url'] for link in page['links']))
@@ -0,0 +1,95 @@
+"""
+Browser Rendering for Kontext.
+
+Headless Chromium (via Playwright) for the pages that the HTTP fetcher
+cannot read, such as single-page apps that build their content in
+JavaScript. The browser is only launched when the first page is escalated,
+so crawls of static sites never start one.
+"""
+
+import asyncio
+from typing import Any, Optional
+
+from loguru import logger
+
+
+class RendererUnavailable(RuntimeError):
+    """Raised when Playwright or its browser is not installed."""
+
+
+class BrowserRenderer:
+    """Lazily launched headless browser shared by the pages of a crawl."""
+
+    def __init__(self, user_agent: str, timeout_seconds: float = 30, max_pages: int = 2):
+        """
+        Initialize the renderer; the browser is launched on first use.
+
+        Args:
+            user_agent: User agent of the browser context
+            timeout_seconds: Navigation timeout
+            max_pages: Maximum number of pages rendered at once
+        """
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self._semaphore = asyncio.Semaphore(max(1, max_pages))
+        self._launch_lock = asyncio.Lock()
+        self._playwright: Optional[Any] = None
+        self._browser: Optional[Any] = None
+        self._context: Optional[Any] = None
+        self._unavailable: Optional[str] = None
+
+    async def _ensure_browser(self) -> Any:
+        """Launch the browser on first use."""
+        async with self._launch_lock:
+            if self._unavailable:
+                raise RendererUnavailable(self._unavailable)
+            if self._context is not None:
+                return self._context
+            try:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                self._context = await self._browser.new_context(user_agent=self.user_agent)
+                logger.info("Launched headless browser for page rendering")
+                return self._context
+            except Exception as e:
+                self._unavailable = f"Browser rendering unavailable: {e}"
+                logger.warning(f"{self._unavailable}; keeping HTTP results")
+                await self.close()
+                raise RendererUnavailable(self._unavailable) from e
+
+    async def render(self, url: str, handler: Any) -> Any:
+        """
+        Open a page in the browser and pass it to a handler.
+
+        Args:
+            url: Page URL
+            handler: Coroutine function called with (page, response) once the page has loaded
+
+        Returns:
+            Value returned by the handler
+        """
+        context = await self._ensure_browser()
+        async with self._semaphore:
+            page = await context.new_page()
+            try:
+                response = await page.goto(url, wait_until='load', timeout=self.timeout_seconds * 1000)
+                try:
+                    # Give client-side rendering a moment to settle, without waiting on long polls
+                    await page.wait_for_load_state('networkidle', timeout=min(5000, self.timeout_seconds * 1000))
+                except Exception:
+                    pass
+                return await handler(page, response)
+            finally:
+                await page.close()
+
+    async def close(self) -> None:
+        """Close the browser if it was launched."""
+        for resource, method in ((self._context, 'close'), (self._browser, 'close'), (self._playwright, 'stop')):
+            if resource is not None:
+                try:
+                    await getattr(resource, method)()
+                except Exception as e:
+                    logger.debug(f"Error closing browser: {e}")
+        self._context = self._browser = self._playwright = None
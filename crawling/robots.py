@@ -0,0 +1,271 @@
+"""
+robots.txt Cache for Kontext.
+
+Fetches robots.txt files asynchronously over the crawl's pooled HTTP
+session and caches the outcome per site, so checking a URL never blocks the
+event loop:
+
+- Concurrent checks for one site share a single fetch (request coalescing)
+- Rules are cached for ``ttl_seconds`` and persisted to disk across runs
+- Failed fetches are cached too (for ``error_ttl_seconds``), so an
+  unreachable robots.txt is not requested again for every URL of its site
+- ``Crawl-delay`` and ``Sitemap:`` directives are exposed for the scheduler
+  and sitemap discovery
+
+As before, a missing (4xx) robots.txt allows everything, and so does one
+that cannot be fetched, until the error entry expires.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from loguru import logger
+
+# Outcomes of a robots.txt fetch
+ROBOTS_OK = 'ok'
+ROBOTS_MISSING = 'missing'
+ROBOTS_ERROR = 'error'
+
+# Bodies beyond this size are truncated (RFC 9309 requires parsing at least 500 KiB)
+MAX_ROBOTS_BYTES = 512 * 1024
+
+
+def site_root(url: str) -> str:
+    """Scheme and host of a URL, the key robots.txt rules apply to."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+class RobotsRules:
+    """Parsed robots.txt of one site."""
+
+    __slots__ = ('status', 'body', 'fetched_at', '_parser')
+
+    def __init__(self, status: str, body: str = '', fetched_at: Optional[float] = None):
+        self.status = status
+        self.body = body
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+        self._parser = RobotFileParser()
+        if status == ROBOTS_OK:
+            self._parser.parse(body.splitlines())
+        else:
+            self._parser.allow_all = True
+            self._parser.modified()
+
+    def can_fetch(self, user_agent: str, url: str) -> bool:
+        return self._parser.can_fetch(user_agent, url)
+
+    def crawl_delay(self, user_agent: str) -> Optional[float]:
+        """
+        Crawl-delay in seconds for a user agent, if the site sets one.
+
+        Parsed here rather than by RobotFileParser, which ignores fractional
+        delays such as ``Crawl-delay: 0.5``.
+        """
+        if self.status != ROBOTS_OK:
+            return None
+        product = user_agent.split('/')[0].lower()
+        delays: Dict[str, float] = {}
+        agents: List[str] = []
+        in_rules = False
+        for line in self.body.splitlines():
+            key, _, value = line.split('#', 1)[0].partition(':')
+            key, value = key.strip().lower(), value.strip()
+            if key == 'user-agent':
+                # A user-agent line after rules starts a new group
+                if in_rules:
+                    agents, in_rules = [], False
+                agents.append(value.lower())
+            elif key in ('allow', 'disallow', 'crawl-delay', 'request-rate'):
+                in_rules = True
+                if key == 'crawl-delay':
+                    try:
+                        delay = float(value)
+                    except ValueError:
+                        continue
+                    for agent in agents:
+                        delays.setdefault(agent, delay)
+
+        for agent, delay in delays.items():
+            if agent != '*' and agent in product:
+                return delay
+        return delays.get('*')
+
+    @property
+    def sitemaps(self) -> List[str]:
+        """Sitemap URLs listed in the robots.txt."""
+        return list(self._parser.site_maps() or [])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'status': self.status, 'body': self.body, 'fetched_at': self.fetched_at}
+
+
+class RobotsCache:
+    """
+    Process-wide robots.txt cache shared by all crawl jobs.
+
+    Crawl jobs run on separate event loops in worker threads, so the cached
+    entries are guarded by a thread lock, while in-flight fetches are
+    coalesced per event loop.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        ttl_seconds: float = 24 * 3600,
+        error_ttl_seconds: float = 1800
+    ):
+        """
+        Initialize the cache, loading persisted entries.
+
+        Args:
+            cache_path: JSON file the cache is persisted to (in memory only if None)
+            ttl_seconds: How long fetched (or missing) robots.txt rules are used
+            error_ttl_seconds: How long a failed fetch is remembered
+        """
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl_seconds = ttl_seconds
+        self.error_ttl_seconds = error_ttl_seconds
+
+        self._entries: Dict[str, RobotsRules] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.hits = 0
+        self.fetches = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Load persisted entries that have not expired."""
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for root, entry in data.items():
+                rules = RobotsRules(entry['status'], entry.get('body', ''), entry['fetched_at'])
+                if not self._expired(rules):
+                    self._entries[root] = rules
+            logger.debug(f"Loaded {len(self._entries)} robots.txt entries from {self.cache_path}")
+        except Exception as e:
+            logger.warning(f"Could not load robots.txt cache {self.cache_path}: {e}")
+
+    def save(self) -> None:
+        """Persist unexpired entries if any changed since the last save."""
+        if self.cache_path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {root: rules.to_dict() for root, rules in self._entries.items() if not self._expired(rules)}
+            self._dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f".{self.cache_path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not save robots.txt cache {self.cache_path}: {e}")
+
+    def _expired(self, rules: RobotsRules) -> bool:
+        ttl = self.error_ttl_seconds if rules.status == ROBOTS_ERROR else self.ttl_seconds
+        return time.time() - rules.fetched_at > ttl
+
+    def cached(self, url: str) -> Optional[RobotsRules]:
+        """Unexpired rules for the site of a URL, without fetching."""
+        with self._lock:
+            rules = self._entries.get(site_root(url))
+        return rules if rules is not None and not self._expired(rules) else None
+
+    async def get(self, url: str, session: Any, timeout_seconds: float = 10) -> RobotsRules:
+        """
+        Rules for the site of a URL, fetching robots.txt if not cached.
+
+        Args:
+            url: Any URL of the site
+            session: aiohttp ClientSession used for the fetch
+            timeout_seconds: Timeout of the robots.txt fetch
+
+        Returns:
+            Rules of the site
+        """
+        rules = self.cached(url)
+        if rules is not None:
+            self.hits += 1
+            return rules
+
+        root = site_root(url)
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(root)
+        if task is None or task.get_loop() is not loop or task.done():
+            task = loop.create_task(self._fetch(root, session, timeout_seconds))
+            self._inflight[root] = task
+            task.add_done_callback(lambda done: self._forget_fetch(root, done))
+        # Shield the shared fetch from the cancellation of any one waiter
+        return await asyncio.shield(task)
+
+    def _forget_fetch(self, root: str, task: asyncio.Task) -> None:
+        if self._inflight.get(root) is task:
+            del self._inflight[root]
+
+    async def _fetch(self, root: str, session: Any, timeout_seconds: float) -> RobotsRules:
+        """Fetch and cache the robots.txt of a site."""
+        import aiohttp
+
+        self.fetches += 1
+        try:
+            async with session.get(
+                f"{root}/robots.txt", timeout=aiohttp.ClientTimeout(total=timeout_seconds), allow_redirects=True
+            ) as response:
+                if response.status >= 500:
+                    rules = RobotsRules(ROBOTS_ERROR)
+                    logger.debug(f"robots.txt for {root} returned {response.status}")
+                elif response.status >= 400:
+                    rules = RobotsRules(ROBOTS_MISSING)
+                else:
+                    body = await response.content.read(MAX_ROBOTS_BYTES)
+                    rules = RobotsRules(ROBOTS_OK, body.decode('utf-8', errors='replace'))
+        except Exception as e:
+            logger.debug(f"Could not fetch robots.txt for {root}: {e}")
+            rules = RobotsRules(ROBOTS_ERROR)
+
+        with self._lock:
+            self._entries[root] = rules
+            self._dirty = True
+        return rules
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, fetches and the number of sites cached
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'sites': len(entries),
+            'unreachable': sum(1 for rules in entries if rules.status == ROBOTS_ERROR)
+        }
+
+    def clear(self) -> None:
+        """Drop all cached entries, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
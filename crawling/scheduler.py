@@ -0,0 +1,234 @@
+"""
+Crawl Scheduling for Kontext.
+
+The frontier of a crawl, organised for politeness towards each host:
+
+- One queue per host; hosts take turns (round robin), so a slow or
+  heavily linked site cannot starve the others in a multi-domain crawl
+- A token bucket per host spaces its requests by the configured delay or
+  the host's robots.txt Crawl-delay, whichever is longer
+- At most ``max_per_host`` requests per host are in flight; the crawl loop
+  applies the global concurrency ceiling
+- Failed requests come back after a jittered exponential backoff (or the
+  server's Retry-After), which also pauses their host
+
+The scheduler is not thread-safe; it belongs to the event loop of one crawl.
+"""
+
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+# Upper bound on a single retry delay in seconds
+MAX_RETRY_DELAY = 120.0
+
+
+class CrawlRequest(NamedTuple):
+    """A URL waiting in the frontier."""
+
+    url: str
+    depth: int
+    attempt: int = 0
+
+
+def host_of(url: str) -> str:
+    """Host (with port) a URL is scheduled under."""
+    return urlparse(url).netloc.lower()
+
+
+class _HostState:
+    """Queue, token bucket and in-flight count of one host."""
+
+    __slots__ = ('queue', 'delay', 'tokens', 'updated_at', 'paused_until', 'in_flight')
+
+    def __init__(self, delay: float, now: float):
+        self.queue: Deque[CrawlRequest] = deque()
+        self.delay = delay
+        # Start with a full bucket so the first request goes out at once
+        self.tokens = 1.0
+        self.updated_at = now
+        self.paused_until = 0.0
+        self.in_flight = 0
+
+    def refill(self, now: float, burst: float) -> None:
+        if self.delay <= 0:
+            self.tokens = burst
+        else:
+            self.tokens = min(burst, self.tokens + (now - self.updated_at) / self.delay)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until the host may send its next request."""
+        token_wait = 0.0 if self.tokens >= 1 or self.delay <= 0 else (1 - self.tokens) * self.delay
+        return max(token_wait, self.paused_until - now, 0.0)
+
+
+class CrawlScheduler:
+    """Per-host frontier with rate limits, host interleaving and retries."""
+
+    def __init__(
+        self,
+        delay_seconds: float = 1.0,
+        max_per_host: int = 2,
+        burst: int = 1,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        depth_first: bool = False
+    ):
+        """
+        Initialize an empty frontier.
+
+        Args:
+            delay_seconds: Minimum average interval between requests to one host
+            max_per_host: Maximum requests in flight per host
+            burst: Requests a host may receive back to back after being idle
+            max_retries: Retries of a failed request before giving up
+            backoff_seconds: Base of the exponential retry backoff
+            depth_first: Take the newest URL of a host first (DFS) instead of the oldest (BFS)
+        """
+        self.delay_seconds = max(0.0, delay_seconds)
+        self.max_per_host = max(1, max_per_host)
+        self.burst = max(1, burst)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.depth_first = depth_first
+
+        self._hosts: Dict[str, _HostState] = {}
+        # Hosts with queued requests, in round-robin order
+        self._ring: Deque[str] = deque()
+        # Retries waiting for their backoff: (ready_at, sequence, request)
+        self._delayed: List[Tuple[float, int, CrawlRequest]] = []
+        self._sequence = itertools.count()
+        self._queued = 0
+
+        self.retries = 0
+
+    def _host(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.delay_seconds, time.monotonic())
+        return state
+
+    def add(self, url: str, depth: int, attempt: int = 0) -> None:
+        """Queue a URL under its host."""
+        host = host_of(url)
+        state = self._host(host)
+        if not state.queue:
+            self._ring.append(host)
+        state.queue.append(CrawlRequest(url, depth, attempt))
+        self._queued += 1
+
+    def set_crawl_delay(self, url: str, delay: float) -> None:
+        """Slow a host down to a robots.txt Crawl-delay (never speeds it up)."""
+        state = self._host(host_of(url))
+        state.delay = max(state.delay, delay)
+
+    def pause_host(self, url: str, seconds: float) -> None:
+        """Send no requests to the host of a URL for a while (e.g. after HTTP 429)."""
+        state = self._host(host_of(url))
+        state.paused_until = max(state.paused_until, time.monotonic() + min(seconds, MAX_RETRY_DELAY))
+
+    def _release_delayed(self, now: float) -> None:
+        """Move retries whose backoff has passed back into their host queues."""
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, request = heapq.heappop(self._delayed)
+            host = host_of(request.url)
+            state = self._host(host)
+            if not state.queue:
+                self._ring.append(host)
+            # Retries go first, so their host's other URLs do not push them back further
+            if self.depth_first:
+                state.queue.append(request)
+            else:
+                state.queue.appendleft(request)
+            self._queued += 1
+
+    def pop_ready(self) -> Optional[CrawlRequest]:
+        """
+        Take the next request that may be sent now.
+
+        Hosts are visited in round-robin order; a host is skipped while it
+        has ``max_per_host`` requests in flight, is out of tokens or is
+        paused.
+
+        Returns:
+            Next request, or None if no host may be contacted right now
+        """
+        now = time.monotonic()
+        self._release_delayed(now)
+        for _ in range(len(self._ring)):
+            host = self._ring[0]
+            self._ring.rotate(-1)
+            state = self._hosts[host]
+            if state.in_flight >= self.max_per_host:
+                continue
+            state.refill(now, self.burst)
+            if state.wait_time(now) > 0:
+                continue
+
+            request = state.queue.pop() if self.depth_first else state.queue.popleft()
+            self._queued -= 1
+            if not state.queue:
+                self._ring.remove(host)
+            state.tokens -= 1
+            state.in_flight += 1
+            return request
+        return None
+
+    def next_ready_in(self) -> Optional[float]:
+        """
+        Seconds until pop_ready may return a request again.
+
+        Returns:
+            Wait time, or None if every queued host is waiting on in-flight
+            requests (or nothing is queued)
+        """
+        now = time.monotonic()
+        waits = [self._delayed[0][0] - now] if self._delayed else []
+        for host in self._ring:
+            state = self._hosts[host]
+            if state.in_flight < self.max_per_host:
+                state.refill(now, self.burst)
+                waits.append(state.wait_time(now))
+        return max(0.0, min(waits)) if waits else None
+
+    def done(self, request: CrawlRequest) -> None:
+        """Mark a request returned by pop_ready as finished."""
+        state = self._hosts[host_of(request.url)]
+        state.in_flight = max(0, state.in_flight - 1)
+
+    def retry(self, request: CrawlRequest, retry_after: Optional[float] = None) -> bool:
+        """
+        Queue a failed request again after a backoff.
+
+        The delay is drawn uniformly from [0, backoff * 2^attempt] ("full
+        jitter"), so retries of many URLs do not arrive in waves; a server's
+        Retry-After is honoured as a lower bound and pauses the whole host.
+
+        Args:
+            request: Request that failed (already marked done)
+            retry_after: Seconds the server asked to wait, if any
+
+        Returns:
+            True if the request was queued again, False if it is out of retries
+        """
+        if request.attempt >= self.max_retries:
+            return False
+        delay = random.uniform(0, min(MAX_RETRY_DELAY, self.backoff_seconds * 2 ** request.attempt))
+        if retry_after:
+            delay = max(delay, min(retry_after, MAX_RETRY_DELAY))
+            self.pause_host(request.url, retry_after)
+        heapq.heappush(
+            self._delayed,
+            (time.monotonic() + delay, next(self._sequence), request._replace(attempt=request.attempt + 1))
+        )
+        self.retries += 1
+        return True
+
+    def __len__(self) -> int:
+        """Number of requests queued or waiting for a retry."""
+        return self._queued + len(self._delayed)
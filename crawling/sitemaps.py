@@ -0,0 +1,203 @@
+"""
+Sitemap Discovery for Kontext.
+
+Reads sitemaps and sitemap indexes over the crawl's pooled HTTP session and
+streams the page URLs they list as they are parsed:
+
+- Sitemap indexes are followed concurrently, with a bound on the number of
+  sitemaps read at once
+- Documents are parsed incrementally (``XMLPullParser``) as chunks arrive,
+  so memory use does not grow with the size of a sitemap
+- Gzip-compressed sitemaps (``.xml.gz``) are decompressed on the fly
+- Each URL carries its ``lastmod`` and ``priority``
+
+Consumers stop reading whenever they have enough URLs; the remaining
+fetches are cancelled.
+"""
+
+import asyncio
+import xml.etree.ElementTree as ET
+import zlib
+from typing import Any, AsyncIterator, Iterable, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+MB = 1024 * 1024
+
+# The sitemap protocol caps uncompressed sitemaps at 50 MB
+MAX_SITEMAP_BYTES = 50 * MB
+
+
+class SitemapUrl(NamedTuple):
+    """A URL listed in a sitemap or sitemap index."""
+
+    url: str
+    lastmod: Optional[str] = None
+    priority: Optional[float] = None
+
+
+def _local_name(tag: str) -> str:
+    """Tag name without its XML namespace."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _priority(value: Optional[str]) -> Optional[float]:
+    try:
+        return min(1.0, max(0.0, float(value))) if value else None
+    except ValueError:
+        return None
+
+
+class SitemapReader:
+    """Concurrent, streaming reader of sitemaps and sitemap indexes."""
+
+    def __init__(
+        self,
+        session: Any,
+        max_concurrency: int = 4,
+        timeout_seconds: float = 30,
+        max_sitemaps: int = 1000
+    ):
+        """
+        Initialize the reader.
+
+        Args:
+            session: aiohttp ClientSession shared with the crawl
+            max_concurrency: Maximum number of sitemaps read at once
+            timeout_seconds: Connect and read timeout of a sitemap fetch
+            max_sitemaps: Maximum number of sitemap documents read in total
+        """
+        self.session = session
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.max_sitemaps = max_sitemaps
+
+        self.sitemaps_read = 0
+
+    async def iter_urls(self, sitemap_urls: Iterable[str]) -> AsyncIterator[SitemapUrl]:
+        """
+        Stream the page URLs of sitemaps, following sitemap indexes.
+
+        Args:
+            sitemap_urls: Sitemap or sitemap index URLs to start from
+
+        Yields:
+            Page URLs in the order they are parsed
+        """
+        # Bounded, so readers pause while the consumer catches up
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        seen: Set[str] = set()
+        tasks: Set[asyncio.Task] = set()
+        # Referenced until done, so the event loop cannot drop them
+        sentinel_tasks: Set[asyncio.Task] = set()
+        finished = object()
+        closing = False
+
+        def start(url: str) -> None:
+            if url in seen or len(seen) >= self.max_sitemaps:
+                return
+            seen.add(url)
+            task = asyncio.create_task(read(url))
+            tasks.add(task)
+            task.add_done_callback(task_done)
+
+        def task_done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            if not tasks and not closing:
+                # Queued behind every URL already produced
+                sentinel = asyncio.create_task(queue.put(finished))
+                sentinel_tasks.add(sentinel)
+                sentinel.add_done_callback(sentinel_tasks.discard)
+
+        async def read(url: str) -> None:
+            async with semaphore:
+                try:
+                    async for kind, entry in self._read_sitemap(url):
+                        if kind == 'sitemap':
+                            start(entry.url)
+                        else:
+                            await queue.put(entry)
+                except Exception as e:
+                    logger.warning(f"Could not read sitemap {url}: {e}")
+
+        for url in sitemap_urls:
+            start(url)
+        if not tasks:
+            return
+
+        try:
+            while True:
+                entry = await queue.get()
+                if entry is finished:
+                    break
+                yield entry
+        finally:
+            closing = True
+            for task in list(tasks) + list(sentinel_tasks):
+                task.cancel()
+
+    async def _read_sitemap(self, url: str) -> AsyncIterator[Tuple[str, SitemapUrl]]:
+        """
+        Fetch and parse one sitemap document incrementally.
+
+        Args:
+            url: Sitemap URL
+
+        Yields:
+            ('sitemap', entry) for entries of a sitemap index and ('url', entry) for pages
+        """
+        import aiohttp
+
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.timeout_seconds, sock_read=self.timeout_seconds
+        )
+        entries = 0
+        try:
+            async with self.session.get(url, timeout=timeout, allow_redirects=True) as response:
+                if response.status != 200:
+                    logger.debug(f"Sitemap {url} returned {response.status}")
+                    return
+                self.sitemaps_read += 1
+
+                parser = ET.XMLPullParser(events=('start', 'end'))
+                decompressor = None
+                root = None
+                size = 0
+                first_chunk = True
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    # .xml.gz files are served as gzip data rather than with a gzip content encoding
+                    if first_chunk:
+                        first_chunk = False
+                        if chunk[:2] == b'\x1f\x8b':
+                            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    data = decompressor.decompress(chunk) if decompressor else chunk
+                    size += len(data)
+                    if size > MAX_SITEMAP_BYTES:
+                        logger.warning(f"Sitemap {url} exceeds {MAX_SITEMAP_BYTES // MB} MB; truncated")
+                        break
+
+                    parser.feed(data)
+                    for event, element in parser.read_events():
+                        if root is None:
+                            root = element
+                        if event != 'end':
+                            continue
+                        kind = _local_name(element.tag)
+                        if kind not in ('url', 'sitemap'):
+                            continue
+
+                        fields = {_local_name(child.tag): (child.text or '').strip() for child in element}
+                        if fields.get('loc'):
+                            entries += 1
+                            yield kind, SitemapUrl(
+                                fields['loc'], fields.get('lastmod') or None, _priority(fields.get('priority'))
+                            )
+                        # Drop parsed entries so memory stays flat
+                        root.clear()
+
+        except (asyncio.TimeoutError, aiohttp.ClientError, ET.ParseError, zlib.error) as e:
+            logger.debug(f"Sitemap parsing error for {url}: {e}")
+
+        if entries:
+            logger.debug(f"Read {entries} entries from sitemap {url}")
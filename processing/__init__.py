@@ -3,8 +3,33 @@ Document Processing package for Kontext.
 
 This package handles document ingestion, processing, and extraction
 using the docling library and other document processing tools.
+
+Submodules are imported on first attribute access (PEP 562) so that
+importing the package does not load the document processing stack.
 """
 
-from .document_processor import DocumentProcessor
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .document_processor import DocumentProcessor
+
+# Public name -> submodule that defines it
+_LAZY_EXPORTS = {
+    'DocumentProcessor': '.document_processor'
+}
+
+__all__ = ['DocumentProcessor']
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining ``name`` on first access."""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ['DocumentProcessor']
\ No newline at end of file
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,473 @@
+"""
+Text Chunking for Kontext.
+
+Chunks are represented as character offsets into the source text rather than
+as copied strings. Word boundaries are found in a single vectorized pass over
+the text's code points, chunk offsets live in compact integer arrays, and a
+chunk's text is only sliced out of the source when it is accessed.
+
+Chunk sizes are measured in tokens, given as the character spans of a
+tokenizer's tokens (whitespace-separated words by default, see
+processing.tokenization). Two strategies are available: fixed token windows,
+and structure-aware packing of a document's elements (headings, paragraphs,
+list items, tables) into size-bounded chunks that never cross a section
+boundary and carry the heading path of their section.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .structure import HEADING, PARAGRAPH, heading_text
+
+# Chunking strategies
+CHUNK_BY_STRUCTURE = 'structure'
+CHUNK_BY_WINDOW = 'window'
+
+# Preferred split points inside an element that exceeds the chunk size
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*(?=\s)|\n')
+_LINE_END = re.compile(r'\n')
+
+# Offset arrays of TextChunks, in constructor order
+_OFFSET_FIELDS = ('start_chars', 'end_chars', 'start_tokens', 'end_tokens', 'start_words', 'end_words')
+
+# Every code point for which str.isspace() is true lies at or below U+3000
+_MAX_SPACE_CODEPOINT = 0x3000
+_IS_SPACE = np.array([chr(cp).isspace() for cp in range(_MAX_SPACE_CODEPOINT + 1)], dtype=bool)
+
+
+def word_boundaries(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the character offsets of all whitespace-separated words.
+
+    Equivalent to the spans of ``text.split()``, computed without creating a
+    Python object per word.
+
+    Args:
+        text: Source text
+
+    Returns:
+        Tuple of (word start offsets, word end offsets) as int64 arrays
+    """
+    if not text:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    codepoints = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    is_space = np.zeros(len(codepoints) + 2, dtype=bool)
+    is_space[0] = is_space[-1] = True
+    in_table = codepoints <= _MAX_SPACE_CODEPOINT
+    is_space[1:-1][in_table] = _IS_SPACE[codepoints[in_table]]
+
+    # A word starts where whitespace is followed by non-whitespace and ends
+    # where non-whitespace is followed by whitespace
+    transitions = np.diff(is_space.view(np.int8))
+    starts = np.flatnonzero(transitions == -1).astype(np.int64)
+    ends = np.flatnonzero(transitions == 1).astype(np.int64)
+    return starts, ends
+
+
+class TextChunks(Sequence):
+    """
+    Chunks of a text stored as offsets, materialized lazily.
+
+    Behaves like a list of chunk dictionaries: indexing or iterating yields
+    dictionaries with the chunk text sliced from the source on demand, with
+    its original whitespace and layout intact.
+    """
+
+    __slots__ = (
+        'text', 'start_chars', 'end_chars', 'start_tokens', 'end_tokens',
+        'start_words', 'end_words', 'heading_paths'
+    )
+
+    def __init__(
+        self,
+        text: str,
+        start_chars: np.ndarray,
+        end_chars: np.ndarray,
+        start_tokens: np.ndarray,
+        end_tokens: np.ndarray,
+        start_words: np.ndarray,
+        end_words: np.ndarray,
+        heading_paths: Optional[List[Tuple[str, ...]]] = None
+    ):
+        """
+        Initialize the chunk set.
+
+        Args:
+            text: Source text the offsets refer to (shared, not copied)
+            start_chars: Character offset where each chunk starts
+            end_chars: Character offset where each chunk ends (exclusive)
+            start_tokens: Index of each chunk's first token
+            end_tokens: Index after each chunk's last token
+            start_words: Index of each chunk's first word
+            end_words: Index after each chunk's last word
+            heading_paths: Optional heading path of each chunk's section
+        """
+        self.text = text
+        self.start_chars = start_chars
+        self.end_chars = end_chars
+        self.start_tokens = start_tokens
+        self.end_tokens = end_tokens
+        self.start_words = start_words
+        self.end_words = end_words
+        self.heading_paths = heading_paths
+
+    def __len__(self) -> int:
+        return len(self.start_chars)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('chunk index out of range')
+
+        start, end = int(self.start_chars[index]), int(self.end_chars[index])
+        return {
+            'chunk_id': index,
+            'text': self.text[start:end],
+            'token_count': int(self.end_tokens[index] - self.start_tokens[index]),
+            'word_count': int(self.end_words[index] - self.start_words[index]),
+            'char_count': end - start,
+            'start_char': start,
+            'end_char': end,
+            'start_word': int(self.start_words[index]),
+            'end_word': int(self.end_words[index]),
+            'start_token': int(self.start_tokens[index]),
+            'end_token': int(self.end_tokens[index]),
+            'heading_path': list(self.heading_paths[index]) if self.heading_paths is not None else []
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"TextChunks({len(self)} chunks over {len(self.text)} chars)"
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materialize every chunk as a dictionary."""
+        return list(self)
+
+    @property
+    def token_count(self) -> int:
+        """Number of tokens covered by the chunks."""
+        return int(self.end_tokens[-1]) if len(self) else 0
+
+    def to_offsets(self) -> Dict[str, Any]:
+        """
+        Export the chunk offsets as plain lists, without the source text.
+
+        Returns:
+            Dictionary that from_offsets turns back into TextChunks
+        """
+        data: Dict[str, Any] = {name: getattr(self, name).tolist() for name in _OFFSET_FIELDS}
+        data['heading_paths'] = (
+            [list(path) for path in self.heading_paths] if self.heading_paths is not None else None
+        )
+        return data
+
+    @classmethod
+    def from_offsets(cls, text: str, data: Dict[str, Any]) -> 'TextChunks':
+        """
+        Rebuild chunks from exported offsets.
+
+        Args:
+            text: Source text the offsets refer to
+            data: Dictionary produced by to_offsets
+
+        Returns:
+            Chunks over the text
+        """
+        arrays = [np.asarray(data[name], dtype=np.int64) for name in _OFFSET_FIELDS]
+        heading_paths = data.get('heading_paths')
+        return cls(
+            text, *arrays,
+            heading_paths=[tuple(path) for path in heading_paths] if heading_paths is not None else None
+        )
+
+
+def _build_chunks(
+    text: str,
+    token_starts: np.ndarray,
+    token_ends: np.ndarray,
+    start_tokens: np.ndarray,
+    end_tokens: np.ndarray,
+    heading_paths: Optional[List[Tuple[str, ...]]] = None
+) -> TextChunks:
+    """
+    Build chunks from token ranges.
+
+    Chunk offsets are trimmed to exclude surrounding whitespace (subword
+    tokens often carry a leading space), and word indices are derived from
+    the trimmed offsets.
+    """
+    start_chars = token_starts[start_tokens]
+    end_chars = token_ends[end_tokens - 1]
+
+    for index in range(len(start_chars)):
+        start, end = start_chars[index], end_chars[index]
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        start_chars[index], end_chars[index] = start, end
+
+    word_starts, _ = word_boundaries(text)
+    return TextChunks(
+        text,
+        start_chars,
+        end_chars,
+        start_tokens,
+        end_tokens,
+        np.searchsorted(word_starts, start_chars).astype(np.int64),
+        np.searchsorted(word_starts, end_chars).astype(np.int64),
+        heading_paths
+    )
+
+
+def chunk_by_tokens(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    token_spans: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> TextChunks:
+    """
+    Split text into windows of ``chunk_size`` tokens.
+
+    Consecutive windows share ``chunk_overlap`` tokens; the last window ends
+    at the last token.
+
+    Args:
+        text: Text to chunk
+        chunk_size: Tokens per chunk
+        chunk_overlap: Tokens shared between consecutive chunks
+        token_spans: Character spans of the text's tokens (words if None)
+
+    Returns:
+        Offset-based chunks over the text
+    """
+    token_starts, token_ends = token_spans if token_spans is not None else word_boundaries(text)
+    token_count = len(token_starts)
+    chunk_size = max(1, chunk_size)
+    step = max(1, chunk_size - max(0, chunk_overlap))
+
+    if token_count == 0:
+        chunk_count = 0
+    else:
+        chunk_count = 1 + max(0, -(-(token_count - chunk_size) // step))
+
+    start_tokens = np.arange(chunk_count, dtype=np.int64) * step
+    end_tokens = np.minimum(start_tokens + chunk_size, token_count)
+
+    return _build_chunks(text, token_starts, token_ends, start_tokens, end_tokens)
+
+
+def _split_element(
+    text: str,
+    start: int,
+    end: int,
+    first_token: int,
+    last_token: int,
+    kind: str,
+    token_starts: np.ndarray,
+    chunk_size: int
+) -> List[Tuple[int, int]]:
+    """
+    Split an element larger than the chunk size into token ranges.
+
+    Paragraphs are split into sentences, other elements (tables, lists, code)
+    into lines, so that packing and overlap can align to those boundaries.
+    A sentence or line that is still too large is cut at the size limit.
+    """
+    pattern = _SENTENCE_END if kind == PARAGRAPH else _LINE_END
+    break_chars = [match.end() for match in pattern.finditer(text, start, end)]
+    breaks = np.searchsorted(token_starts, np.asarray(break_chars, dtype=np.int64)).tolist()
+
+    pieces = []
+    position = first_token
+    for cut in breaks + [last_token]:
+        if cut <= position:
+            continue
+        while cut - position > chunk_size:
+            pieces.append((position, position + chunk_size))
+            position += chunk_size
+        pieces.append((position, cut))
+        position = cut
+    return pieces
+
+
+def chunk_by_structure(
+    text: str,
+    elements: Dict[str, List[Any]],
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    token_spans: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> TextChunks:
+    """
+    Pack a document's structural elements into chunks of at most ``chunk_size`` tokens.
+
+    Elements are added to the current chunk in reading order until the next
+    one would not fit. A heading always starts a new chunk, so chunks never
+    span two sections and a heading stays with the content below it. An
+    element that is larger than a chunk on its own is split into sentences
+    or lines, which are then packed like elements. Consecutive chunks of the same section share up to
+    ``chunk_overlap`` tokens, aligned to an element boundary where possible.
+
+    Runs in a single pass over the elements; token counts for all elements are
+    computed with one vectorized search over the token boundaries.
+
+    Args:
+        text: Source text the element spans refer to
+        elements: Column-wise element spans (kind, level, start, end)
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Tokens shared between consecutive chunks of a section
+        token_spans: Character spans of the text's tokens (words if None)
+
+    Returns:
+        Offset-based chunks over the text, with the heading path of each chunk
+    """
+    token_starts, token_ends = token_spans if token_spans is not None else word_boundaries(text)
+    chunk_size = max(1, chunk_size)
+    chunk_overlap = max(0, min(chunk_overlap, chunk_size // 2))
+
+    element_starts = np.asarray(elements['start'], dtype=np.int64)
+    element_ends = np.asarray(elements['end'], dtype=np.int64)
+    first_tokens = np.searchsorted(token_starts, element_starts).tolist()
+    last_tokens = np.searchsorted(token_starts, element_ends).tolist()
+
+    chunk_starts: List[int] = []
+    chunk_ends: List[int] = []
+    chunk_sections: List[int] = []
+    section_paths: List[Tuple[str, ...]] = [()]
+    headings: List[Tuple[int, str]] = []
+
+    current_start = current_end = -1
+    current_section = 0
+    current_has_content = False
+    # (start token, is heading) of each unit in the current chunk
+    chunk_units: List[Tuple[int, bool]] = []
+
+    def flush() -> None:
+        chunk_starts.append(current_start)
+        chunk_ends.append(current_end)
+        chunk_sections.append(current_section)
+
+    for kind, level, start, end, first_token, last_token in zip(
+        elements['kind'], elements['level'], elements['start'], elements['end'], first_tokens, last_tokens
+    ):
+        if last_token <= first_token:
+            continue
+
+        section = current_section
+        if kind == HEADING:
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, heading_text(text, start, end)))
+            section_paths.append(tuple(title for _, title in headings))
+            section = len(section_paths) - 1
+
+        if last_token - first_token > chunk_size:
+            units = _split_element(text, start, end, first_token, last_token, kind, token_starts, chunk_size)
+        else:
+            units = [(first_token, last_token)]
+
+        for unit_start, unit_end in units:
+            new_section = section != current_section and current_has_content
+            if current_start >= 0 and (new_section or unit_end - current_start > chunk_size):
+                flush()
+                overlap_start = -1
+                if chunk_overlap and not new_section:
+                    # Start the overlap at the first unit boundary inside the
+                    # overlap window, or mid-unit if that unit is not a heading
+                    budget = min(chunk_overlap, chunk_size - (unit_end - unit_start))
+                    if budget > 0:
+                        target = current_end - budget
+                        for s, is_heading in reversed(chunk_units):
+                            if s >= target:
+                                overlap_start = s
+                            else:
+                                if overlap_start < 0 and not is_heading:
+                                    overlap_start = target
+                                break
+                if overlap_start >= 0:
+                    current_start = overlap_start
+                    chunk_units = [unit for unit in chunk_units if unit[0] >= overlap_start]
+                else:
+                    current_start = -1
+                    current_has_content = False
+                    chunk_units = []
+
+            if current_start < 0:
+                current_start = unit_start
+            current_end = unit_end
+            current_section = section
+            current_has_content = current_has_content or kind != HEADING
+            chunk_units.append((unit_start, kind == HEADING))
+
+    if current_start >= 0:
+        flush()
+
+    return _build_chunks(
+        text,
+        token_starts,
+        token_ends,
+        np.asarray(chunk_starts, dtype=np.int64),
+        np.asarray(chunk_ends, dtype=np.int64),
+        [section_paths[section] for section in chunk_sections]
+    )
+
+
+def chunk_document(
+    text: str,
+    elements: Optional[Dict[str, List[Any]]],
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    strategy: str = CHUNK_BY_STRUCTURE,
+    token_spans: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> TextChunks:
+    """
+    Chunk a parsed document with the requested strategy.
+
+    Structure-aware chunking needs the document's element spans; without
+    them (e.g. results parsed before structure was recorded) it falls back
+    to token windows.
+
+    Args:
+        text: Extracted text
+        elements: Column-wise element spans, or None
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Tokens shared between consecutive chunks
+        strategy: 'structure' or 'window'
+        token_spans: Character spans of the text's tokens (words if None)
+
+    Returns:
+        Offset-based chunks over the text
+    """
+    if strategy == CHUNK_BY_STRUCTURE and elements and elements.get('kind'):
+        return chunk_by_structure(text, elements, chunk_size, chunk_overlap, token_spans)
+    return chunk_by_tokens(text, chunk_size, chunk_overlap, token_spans)
+
+
+def materialize_chunks(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of a processing result with its chunks as plain dictionaries.
+
+    Use before handing results to serializers (JSON, Polars) that do not
+    understand TextChunks.
+
+    Args:
+        result: Processing result
+
+    Returns:
+        Shallow copy of the result with 'chunks' as a list of dictionaries
+    """
+    chunks = result.get('chunks')
+    if isinstance(chunks, TextChunks):
+        return {**result, 'chunks': chunks.to_records()}
+    return result
@@ -0,0 +1,273 @@
+"""
+Conversion Cache for Kontext.
+
+Content-addressed on-disk cache for document extraction results. Entries are
+keyed by the SHA-256 of the file bytes plus every option that changes the
+extraction output, so re-uploading an unchanged file skips the docling/OCR
+pipeline entirely.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+# Bump when the shape of cached extraction results changes
+CACHE_SCHEMA_VERSION = 6
+
+# Options that influence extraction output and therefore the cache key.
+# Chunking options are deliberately absent: entries hold the parsed
+# artifact, and chunks are recomputed from it on every read.
+KEYED_OPTIONS = ('extract_tables', 'extract_images', 'ocr_mode')
+
+# PDF options that decide the page-range shards and which of them get OCR
+PDF_KEYED_OPTIONS = ('shard_threshold_pages', 'shard_size_pages')
+# Options of the text-layer triage, which only decides OCR in 'auto' mode
+OCR_TRIAGE_OPTIONS = ('ocr_triage_sample_pages', 'ocr_min_chars_per_page', 'ocr_text_coverage_threshold')
+
+MB = 1024 * 1024
+
+
+def _parser_version() -> str:
+    """Return the installed docling version, part of every cache key."""
+    try:
+        return metadata.version('docling')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+class ConversionCache:
+    """
+    On-disk LRU cache of extraction results.
+
+    Entries expire after ``max_age_days`` and the least recently used ones
+    are evicted once the cache grows beyond ``max_size_mb``.
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 2048, max_age_days: int = 30):
+        """
+        Initialize the conversion cache.
+
+        Args:
+            cache_dir: Directory holding cache entries
+            max_size_mb: Maximum total size of all entries in MB
+            max_age_days: Maximum age of an entry before it expires
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = max_size_mb * MB
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.parser_version = _parser_version()
+
+        # key -> (size_bytes, created_at), ordered from least to most recently used
+        self._index: Optional[OrderedDict] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, content: Any, file_type: str, options: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a file and its extraction options.
+
+        Args:
+            content: Raw file bytes or any buffer over them (e.g. a memory map)
+            file_type: File extension without dot
+            options: Processing options
+
+        Returns:
+            Hex digest identifying the extraction result
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        keyed_options = KEYED_OPTIONS
+        if file_type == 'pdf':
+            keyed_options += PDF_KEYED_OPTIONS
+            if options.get('ocr_mode') == 'auto':
+                keyed_options += OCR_TRIAGE_OPTIONS
+        keyed = {
+            'file_type': file_type,
+            'options': {name: options.get(name) for name in keyed_options},
+            'parser_version': self.parser_version,
+            'schema': CACHE_SCHEMA_VERSION
+        }
+        options_digest = hashlib.sha256(json.dumps(keyed, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"{digest}-{options_digest[:16]}"
+
+    def _entry_path(self, key: str) -> Path:
+        """Return the file path of a cache entry, sharded by key prefix."""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> OrderedDict:
+        """Scan the cache directory once and build the LRU index."""
+        if self._index is not None:
+            return self._index
+
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*/*.json'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, path.stem, stat.st_size, stat.st_mtime))
+
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        for _, key, size, created_at in sorted(entries):
+            self._index[key] = (size, created_at)
+            self._total_bytes += size
+
+        logger.debug(f"Conversion cache index loaded: {len(self._index)} entries")
+        return self._index
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached extraction result.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached result or None on a miss
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry[1] > self.max_age_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            index.move_to_end(key)
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Record the access time so LRU order survives restarts
+            os.utime(path, (time.time(), entry[1]))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Store an extraction result.
+
+        Args:
+            key: Cache key from make_key
+            result: Extraction result (must be JSON-serializable)
+        """
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write atomically so concurrent readers never see a partial entry
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write cache entry {key}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            index = self._load_index()
+            if key in index:
+                self._total_bytes -= index[key][0]
+            index[key] = (size, time.time())
+            index.move_to_end(key)
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones over the size limit."""
+        index = self._index
+        now = time.time()
+
+        for key in [k for k, (_, created_at) in index.items() if now - created_at > self.max_age_seconds]:
+            self._remove(key)
+            self.evictions += 1
+
+        while self._total_bytes > self.max_size_bytes and index:
+            key = next(iter(index))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry from disk and the index (caller holds the lock)."""
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_bytes -= size
+        self._entry_path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions and disk usage
+        """
+        with self._lock:
+            index = self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(index),
+                'size_mb': round(self._total_bytes / MB, 2),
+                'max_size_mb': self.max_size_bytes // MB
+            }
+
+
+# The index is built by scanning the cache directory, so share one per process
+_caches: Dict[Tuple[str, int, int], ConversionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_conversion_cache(cache_dir: str, max_size_mb: int, max_age_days: int) -> ConversionCache:
+    """
+    Get the process-wide conversion cache for a directory.
+
+    Args:
+        cache_dir: Directory holding cache entries
+        max_size_mb: Maximum total size of all entries in MB
+        max_age_days: Maximum age of an entry before it expires
+
+    Returns:
+        Shared ConversionCache instance
+    """
+    key = (str(Path(cache_dir).resolve()), max_size_mb, max_age_days)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ConversionCache(cache_dir, max_size_mb, max_age_days)
+        return _caches[key]
@@ -0,0 +1,431 @@
+"""
+Conversion Pool for Kontext.
+
+Runs docling conversions in a pool of worker processes so that PDF parsing,
+layout analysis and OCR use every core instead of blocking the event loop.
+Each worker builds its DocumentConverters (one with OCR, one without) the
+first time it needs them and keeps them warm for the lifetime of the
+process; a worker whose converters fail to load still serves the PyPDF2
+tasks (pre-flight, text-layer fallback). Documents are passed by path to
+their spooled file and memory-mapped in the worker, so the bytes are never
+pickled across the process boundary.
+"""
+
+import asyncio
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .pdf_preflight import as_stream, inspect_pdf
+from .spool import Buffer, map_file
+from .structure import docling_elements, shift_elements
+
+# Per-process converters keyed by do_ocr, built on first use
+_worker_converters: Dict[bool, Any] = {}
+# Per-process converter build failures keyed by do_ocr, so loading is not retried for every document
+_worker_converter_errors: Dict[bool, str] = {}
+# Table structure setting of the pool, set by the pool initializer
+_worker_extract_tables = True
+
+
+class ConverterUnavailable(RuntimeError):
+    """Raised in a worker when the docling converter cannot be built (e.g. models missing offline)."""
+
+
+def _build_converter(extract_tables: bool, do_ocr: bool = True) -> Any:
+    """Build a docling DocumentConverter with Kontext's PDF pipeline settings."""
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=PdfPipelineOptions(
+                    do_ocr=do_ocr,
+                    do_table_structure=extract_tables,
+                    table_structure_options={
+                        "do_cell_matching": True,
+                    }
+                )
+            )
+        }
+    )
+
+
+def _init_worker(extract_tables: bool, threads_per_worker: int) -> None:
+    """
+    Pool initializer: limit intra-op threading and record the pipeline settings.
+
+    Converters are not built here: a docling failure in the initializer
+    would break the whole pool, including its PyPDF2-only tasks.
+
+    Args:
+        extract_tables: Whether table structure recognition is enabled
+        threads_per_worker: Number of native threads each worker may use
+    """
+    global _worker_extract_tables
+
+    # Avoid N processes x M cores oversubscription from torch/OpenMP
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ.setdefault(var, str(threads_per_worker))
+    _worker_extract_tables = extract_tables
+
+
+def _get_converter(do_ocr: bool) -> Any:
+    """
+    Get the worker's converter for an OCR setting, building it on first use.
+
+    Raises:
+        ConverterUnavailable: If docling or its models cannot be loaded
+    """
+    converter = _worker_converters.get(do_ocr)
+    if converter is not None:
+        return converter
+    if do_ocr in _worker_converter_errors:
+        raise ConverterUnavailable(_worker_converter_errors[do_ocr])
+
+    try:
+        converter = _build_converter(_worker_extract_tables, do_ocr)
+        # Load the PDF pipeline's models now rather than during the first conversion
+        if hasattr(converter, 'initialize_pipeline'):
+            from docling.datamodel.base_models import InputFormat
+            converter.initialize_pipeline(InputFormat.PDF)
+    except Exception as e:
+        error = _worker_converter_errors[do_ocr] = f"{type(e).__name__}: {e}"
+        logger.error(f"Could not load docling converter (do_ocr={do_ocr}) in worker {os.getpid()}: {error}")
+        raise ConverterUnavailable(error) from None
+
+    _worker_converters[do_ocr] = converter
+    return converter
+
+
+def _load_converters(ocr_settings: Tuple[bool, ...]) -> int:
+    """Warm-up task: build the converters for the given OCR settings; returns the worker PID."""
+    for do_ocr in ocr_settings:
+        try:
+            _get_converter(do_ocr)
+        except ConverterUnavailable:
+            pass
+    return os.getpid()
+
+
+def _item_page(item: Any, page_offset: int = 0) -> int:
+    """Return the 1-based page number of a docling item, or 0 if unknown."""
+    prov = getattr(item, 'prov', None)
+    page = getattr(prov[0], 'page_no', 0) if prov else getattr(item, 'page', 0)
+    return page + page_offset if page else 0
+
+
+def _extract_page_range(content: Buffer, start_page: int, end_page: int) -> bytes:
+    """Copy pages [start_page, end_page] (1-based, inclusive) into a standalone PDF."""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(as_stream(content))
+    writer = PyPDF2.PdfWriter()
+    for index in range(start_page - 1, min(end_page, len(reader.pages))):
+        writer.add_page(reader.pages[index])
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def convert_pdf(
+    path: str,
+    filename: str,
+    options: Dict[str, Any],
+    do_ocr: bool = True,
+    page_range: Optional[Tuple[int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Convert a PDF, or one page-range shard of it, with the worker's docling converter.
+
+    Runs inside a pool worker and returns only plain, picklable data. Page
+    numbers in the result always refer to the original document.
+
+    Args:
+        path: Path of the spooled PDF
+        filename: Original filename (used for logging only)
+        options: Processing options
+        do_ocr: Whether to run the OCR pipeline or read the text layer only
+        page_range: Optional 1-based inclusive (start_page, end_page) to convert
+
+    Returns:
+        Extracted text, element spans, tables, images and page count
+
+    Raises:
+        ConverterUnavailable: If the worker cannot load docling
+    """
+    converter = _get_converter(do_ocr)
+
+    from docling.datamodel.base_models import DocumentStream
+
+    page_offset = 0
+    if page_range is not None:
+        # Only the shard's pages are materialized, as a new standalone PDF
+        with map_file(path) as content:
+            shard = _extract_page_range(content, *page_range)
+        page_offset = page_range[0] - 1
+        result = converter.convert(DocumentStream(name=filename, stream=io.BytesIO(shard)))
+    else:
+        # docling reads the spooled file itself
+        result = converter.convert(Path(path))
+    document = result.document
+
+    # Serialize to Markdown, recording headings, paragraphs, lists and tables
+    extracted_text, elements = docling_elements(document)
+
+    # Extract tables if requested
+    tables = []
+    if options.get('extract_tables', True) and hasattr(document, 'tables'):
+        for table in document.tables:
+            tables.append({
+                'table_data': table.export_to_dataframe().to_dict() if hasattr(table, 'export_to_dataframe') else str(table),
+                'caption': table.caption_text(document) if hasattr(table, 'caption_text') else '',
+                'page': _item_page(table, page_offset)
+            })
+
+    # Extract images if requested
+    images = []
+    if options.get('extract_images', False) and hasattr(document, 'pictures'):
+        for img in document.pictures:
+            prov = getattr(img, 'prov', None)
+            images.append({
+                'description': img.caption_text(document) if hasattr(img, 'caption_text') else '',
+                'page': _item_page(img, page_offset),
+                'bbox': prov[0].bbox.as_tuple() if prov else None
+            })
+
+    page_count = document.num_pages() if hasattr(document, 'num_pages') else len(getattr(document, 'pages', {}))
+
+    return {
+        'extracted_text': extracted_text,
+        'elements': elements,
+        'tables': tables,
+        'images': images,
+        'page_count': page_count
+    }
+
+
+def merge_converted_shards(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Stitch per-shard conversion results back into one document.
+
+    Args:
+        shards: Results of convert_pdf, in page order
+
+    Returns:
+        Combined extracted text, element spans, tables, images and page count
+    """
+    if len(shards) == 1:
+        return shards[0]
+
+    separator = '\n\n'
+    elements = {'kind': [], 'level': [], 'start': [], 'end': []}
+    offset = 0
+    for shard in shards:
+        for column, values in shift_elements(shard['elements'], offset).items():
+            elements[column].extend(values)
+        offset += len(shard['extracted_text']) + len(separator)
+
+    return {
+        'extracted_text': separator.join(shard['extracted_text'] for shard in shards),
+        'elements': elements,
+        'tables': [table for shard in shards for table in shard['tables']],
+        'images': [image for shard in shards for image in shard['images']],
+        'page_count': sum(shard['page_count'] for shard in shards)
+    }
+
+
+def extract_pdf_text(path: str, time_budget_seconds: Optional[float] = None) -> Tuple[str, int, int]:
+    """
+    Extract the text layer of a PDF with PyPDF2.
+
+    Extraction stops after the page that exhausts the time budget, so a
+    pathological file cannot hold a worker indefinitely.
+
+    Args:
+        path: Path of the spooled PDF
+        time_budget_seconds: Optional wall-clock budget for the extraction
+
+    Returns:
+        Tuple of (extracted text, page count, number of pages extracted)
+    """
+    import PyPDF2
+
+    deadline = time.monotonic() + time_budget_seconds if time_budget_seconds else None
+    with map_file(path) as content:
+        pdf_reader = PyPDF2.PdfReader(as_stream(content), strict=False)
+        page_texts = []
+        for page in pdf_reader.pages:
+            page_texts.append(page.extract_text() or "")
+            if deadline is not None and time.monotonic() > deadline:
+                break
+        page_count = len(pdf_reader.pages)
+
+    return "\n".join(page_texts) + "\n", page_count, len(page_texts)
+
+
+def inspect_pdf_file(path: str, *args: Any) -> Dict[str, Any]:
+    """Run the PDF pre-flight inspection on a spooled file (see inspect_pdf)."""
+    with map_file(path) as content:
+        return inspect_pdf(content, *args)
+
+
+class ConversionPool:
+    """
+    Process pool that executes document conversions off the event loop.
+
+    Workers are started lazily on first use; each one keeps the docling
+    converters it has built warm, so model loading is paid once per process,
+    not per file.
+    """
+
+    def __init__(self, max_workers: int, extract_tables: bool = True):
+        """
+        Initialize the conversion pool.
+
+        Args:
+            max_workers: Number of worker processes
+            extract_tables: Whether table structure recognition is enabled
+        """
+        self.max_workers = max(1, max_workers)
+        self.extract_tables = extract_tables
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the worker processes on first use."""
+        with self._lock:
+            if self._executor is None:
+                threads_per_worker = max(1, (os.cpu_count() or 1) // self.max_workers)
+                # Spawn rather than fork: the parent runs Streamlit and
+                # loguru threads that must not be duplicated mid-flight
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.extract_tables, threads_per_worker)
+                )
+                logger.info(f"Started conversion pool with {self.max_workers} workers")
+            return self._executor
+
+    def _discard_broken(self, executor: ProcessPoolExecutor) -> None:
+        """Drop an executor whose workers died so the next call starts fresh ones."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                logger.warning("Conversion pool broken (a worker died), restarting on next use")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self, ocr_settings: Tuple[bool, ...] = (True, False)) -> None:
+        """
+        Start every worker process and load its converters.
+
+        Blocks the calling thread; call it from a background thread at startup.
+
+        Args:
+            ocr_settings: do_ocr values whose converters to load (only those the OCR mode can use)
+        """
+        executor = self._get_executor()
+        started = time.monotonic()
+        # The executor starts a new worker for each task that finds no idle one
+        try:
+            pids = {
+                future.result()
+                for future in [executor.submit(_load_converters, ocr_settings) for _ in range(self.max_workers)]
+            }
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            raise
+        logger.info(f"Conversion pool warm: {len(pids)} workers ready in {time.monotonic() - started:.1f}s")
+
+    async def run(self, func: Any, *args: Any) -> Any:
+        """
+        Run a module-level function in a worker process.
+
+        Args:
+            func: Picklable function to execute
+            *args: Picklable arguments
+
+        Returns:
+            The function's return value
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self._discard_broken(executor)
+            raise
+
+    async def convert_pdf(
+        self,
+        path: str,
+        filename: str,
+        options: Dict[str, Any],
+        do_ocr: bool = True,
+        page_range: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, Any]:
+        """Convert a PDF, or one page-range shard of it, with docling in a worker process."""
+        return await self.run(convert_pdf, path, filename, options, do_ocr, page_range)
+
+    async def extract_pdf_text(
+        self,
+        path: str,
+        time_budget_seconds: Optional[float] = None
+    ) -> Tuple[str, int, int]:
+        """Extract a PDF text layer with PyPDF2 in a worker process."""
+        return await self.run(extract_pdf_text, path, time_budget_seconds)
+
+    async def inspect_pdf(self, path: str, *args: Any) -> Dict[str, Any]:
+        """Run the PDF pre-flight inspection in a worker process."""
+        return await self.run(inspect_pdf_file, path, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop all worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+                logger.info("Conversion pool shut down")
+
+
+# Pools are expensive to start, so share one per configuration per process
+_pools: Dict[Tuple[int, bool], ConversionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_conversion_pool(max_workers: int, extract_tables: bool = True) -> ConversionPool:
+    """
+    Get the process-wide conversion pool for a configuration.
+
+    Args:
+        max_workers: Number of worker processes
+        extract_tables: Whether table structure recognition is enabled
+
+    Returns:
+        Shared ConversionPool instance
+    """
+    key = (max(1, max_workers), extract_tables)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConversionPool(*key)
+        return _pools[key]
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    """Stop all shared pools when the interpreter exits."""
+    for pool in list(_pools.values()):
+        pool.shutdown(wait=False)
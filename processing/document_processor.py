@@ -6,28 +6,13 @@ for LLM-ready context extraction with async processing and progress tracking.
 """
 
 import asyncio
-import io
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
-import polars as pl
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
-import streamlit as st
 
-# Document processing libraries
-from docling import DocumentConverter
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from docling.document_converter import PdfFormatOption
-import PyPDF2
-from docx import Document as DocxDocument
-from bs4 import BeautifulSoup
-import markdown
-
-# Async and progress
-import anyio
-from tqdm.asyncio import tqdm
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+# Document processing libraries (python-docx, BeautifulSoup, Markdown), Rich
+# progress output and the export writers are imported where they are used, so
+# importing this module stays cheap
 
 # Logging
 from loguru import logger
@@ -35,8 +20,16 @@ from loguru import logger
 # Local imports
 from config.settings import AppConfig
 from utils.validators import validate_file_type, validate_file_size
+from .conversion_pool import ConverterUnavailable, get_conversion_pool, merge_converted_shards
+from .conversion_cache import get_conversion_cache
+from .pdf_preflight import PDF_CORRUPT, PDF_DAMAGED, PDF_ENCRYPTED
+from .spool import SpooledDocument, decode_text
+from .chunking import TextChunks, chunk_document
+from .tokenization import get_tokenizer
+from .structure import HEADING, LIST_ITEM, PARAGRAPH, StructureBuilder, html_elements, markdown_elements
 
-console = Console()
+# Sentinel passed through the processing queues to signal completion
+_END_OF_STREAM = object()
 
 class DocumentProcessor:
     """
@@ -56,22 +49,23 @@ class DocumentProcessor:
         self.config = config
         self.doc_config = config.document_processing
         
-        # Initialize docling converter with optimized settings
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=PdfPipelineOptions(
-                        do_ocr=True,
-                        do_table_structure=self.doc_config.extract_tables,
-                        table_structure_options={
-                            "do_cell_matching": True,
-                        }
-                    )
-                )
-            }
-        )
+        # Docling conversions run in worker processes, each with a warm converter
+        max_workers = self.doc_config.max_workers if self.doc_config.parallel_processing else 1
+        self.conversion_pool = get_conversion_pool(max_workers, self.doc_config.extract_tables)
         
-        logger.info("DocumentProcessor initialized with docling converter")
+        # Content-addressed cache of extraction results
+        self.cache = None
+        if self.doc_config.cache_enabled:
+            self.cache = get_conversion_cache(
+                self.doc_config.cache_dir,
+                self.doc_config.cache_max_size_mb,
+                self.doc_config.cache_max_age_days
+            )
+        
+        # Tokenizer that measures chunk sizes
+        self.tokenizer = get_tokenizer(self.doc_config.tokenizer, self.doc_config.tokenizer_path)
+        
+        logger.info(f"DocumentProcessor initialized with {max_workers}-worker conversion pool")
     
     async def process_files_async(
         self, 
@@ -82,73 +76,134 @@ class DocumentProcessor:
         """
         Process multiple files asynchronously with progress tracking.
         
+        Collects everything yielded by iter_process_files_async; prefer the
+        generator for large batches.
+        
         Args:
             files: List of uploaded files from Streamlit
             options: Processing options (chunk_size, extract_tables, etc.)
-            progress_placeholder: Streamlit placeholder for progress updates
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
             
         Returns:
             List of processing results with extracted content and metadata
         """
-        logger.info(f"Starting async processing of {len(files)} files")
+        return [
+            result async for result in self.iter_process_files_async(files, options, progress_placeholder)
+        ]
+    
+    async def iter_process_files_async(
+        self,
+        files: Iterable[Any],
+        options: Dict[str, Any],
+        progress_placeholder: Optional[Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process files through a bounded producer/consumer pipeline.
         
-        results = []
+        Results are yielded in completion order as soon as each file is done.
+        Both queues are bounded, so a slow consumer applies back-pressure and
+        only a handful of files and results are held in memory at once.
+        
+        Args:
+            files: Iterable of uploaded files (may be lazy)
+            options: Processing options (chunk_size, extract_tables, etc.)
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
+            
+        Yields:
+            Processing result for each file
+        """
+        total = len(files) if hasattr(files, '__len__') else None
+        # As many consumers as the conversion pool has workers
+        workers = self.conversion_pool.max_workers
+        logger.info(f"Starting streaming processing of {total if total is not None else 'an unknown number of'} files")
+        
+        # Record defaults so they are part of the cache key and the result metadata
+        options = {
+            'ocr_mode': self.doc_config.ocr_mode,
+            'ocr_triage_sample_pages': self.doc_config.ocr_triage_sample_pages,
+            'ocr_min_chars_per_page': self.doc_config.ocr_min_chars_per_page,
+            'ocr_text_coverage_threshold': self.doc_config.ocr_text_coverage_threshold,
+            'shard_threshold_pages': self.doc_config.shard_threshold_pages,
+            'shard_size_pages': self.doc_config.shard_size_pages,
+            'chunking_strategy': self.doc_config.chunking_strategy,
+            **options
+        }
+        
+        input_queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        output_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.doc_config.result_queue_size))
+        
+        async def produce() -> None:
+            try:
+                for file_obj in files:
+                    await input_queue.put(file_obj)
+            finally:
+                # Always release the consumers, even if the file iterable fails
+                for _ in range(workers):
+                    await input_queue.put(_END_OF_STREAM)
+        
+        async def consume() -> None:
+            while True:
+                file_obj = await input_queue.get()
+                if file_obj is _END_OF_STREAM:
+                    await output_queue.put(_END_OF_STREAM)
+                    return
+                await output_queue.put(await self._process_file_safely_async(file_obj, options))
+        
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
         
-        # Create progress tracking
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
-            TaskProgressColumn(),
-            console=console
+            TaskProgressColumn()
         ) as progress:
             
-            task = progress.add_task("Processing documents...", total=len(files))
-            
-            # Process files with controlled concurrency
-            semaphore = asyncio.Semaphore(self.doc_config.max_workers)
-            
-            async def process_single_file(file_obj) -> Dict[str, Any]:
-                async with semaphore:
-                    try:
-                        result = await self._process_single_file_async(file_obj, options)
-                        progress.advance(task)
-                        
-                        # Update Streamlit progress if available
-                        if progress_placeholder:
-                            current_progress = len(results) / len(files)
-                            progress_placeholder.progress(current_progress)
-                            
-                        return result
-                    except Exception as e:
-                        logger.error(f"Error processing file {file_obj.name}: {e}")
-                        progress.advance(task)
-                        return {
-                            'filename': file_obj.name,
-                            'status': 'error',
-                            'error': str(e),
-                            'processed_at': datetime.now().isoformat()
-                        }
-            
-            # Execute all file processing tasks
-            tasks = [process_single_file(file_obj) for file_obj in files]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            task = progress.add_task("Processing documents...", total=total)
+            producer = asyncio.create_task(produce())
+            consumers = [asyncio.create_task(consume()) for _ in range(workers)]
             
-            # Filter out exceptions and convert to proper results
-            processed_results = []
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error(f"Task exception: {result}")
-                    processed_results.append({
-                        'status': 'error',
-                        'error': str(result),
-                        'processed_at': datetime.now().isoformat()
-                    })
-                else:
-                    processed_results.append(result)
-        
-        logger.info(f"Completed processing {len(processed_results)} files")
-        return processed_results
+            completed = 0
+            finished_consumers = 0
+            try:
+                while finished_consumers < workers:
+                    result = await output_queue.get()
+                    if result is _END_OF_STREAM:
+                        finished_consumers += 1
+                        continue
+                    
+                    completed += 1
+                    progress.advance(task)
+                    
+                    # Update Streamlit progress if available
+                    if progress_placeholder and total:
+                        progress_placeholder.progress(completed / total)
+                    
+                    yield result
+                
+                # Surface errors raised while iterating the input
+                await producer
+            finally:
+                for pipeline_task in [producer, *consumers]:
+                    pipeline_task.cancel()
+                await asyncio.gather(producer, *consumers, return_exceptions=True)
+        
+        logger.info(f"Completed processing {completed} files")
+        if self.cache is not None:
+            logger.info(f"Conversion cache stats: {self.cache.stats()}")
+    
+    async def _process_file_safely_async(self, file_obj: Any, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Process a single file, turning any failure into an error result."""
+        try:
+            return await self._process_single_file_async(file_obj, options)
+        except Exception as e:
+            filename = getattr(file_obj, 'name', str(file_obj))
+            logger.error(f"Error processing file {filename}: {e}")
+            return {
+                'filename': filename,
+                'status': 'error',
+                'error': str(e),
+                'processed_at': datetime.now().isoformat()
+            }
     
     async def _process_single_file_async(
         self, 
@@ -177,27 +232,43 @@ class DocumentProcessor:
         if not validate_file_size(file_obj, self.doc_config.max_file_size_mb):
             raise ValueError(f"File too large (max: {self.doc_config.max_file_size_mb}MB)")
         
-        # Read file content
-        file_content = file_obj.read()
-        file_obj.seek(0)  # Reset file pointer
+        # Spool the upload to disk once; every later stage reads the memory map
+        document = await asyncio.to_thread(
+            SpooledDocument.from_upload, file_obj, f".{file_extension}", self.doc_config.spool_dir
+        )
         
-        # Process based on file type
-        if file_extension == 'pdf':
-            result = await self._process_pdf_async(file_content, filename, options)
-        elif file_extension == 'docx':
-            result = await self._process_docx_async(file_content, filename, options)
-        elif file_extension in ['txt', 'md']:
-            result = await self._process_text_async(file_content, filename, options)
-        elif file_extension == 'html':
-            result = await self._process_html_async(file_content, filename, options)
-        else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
+        with document:
+            # Serve repeated uploads from the conversion cache
+            cache_key = None
+            result = None
+            if self.cache is not None:
+                cache_key = await asyncio.to_thread(
+                    self.cache.make_key, document.buffer, file_extension, options
+                )
+                result = await asyncio.to_thread(self.cache.get, cache_key)
+                if result is not None:
+                    logger.debug(f"Conversion cache hit for {filename}")
+            
+            from_cache = result is not None
+            if not from_cache:
+                result = await self._extract_content_async(document, file_extension, filename, options)
+                # Degraded results (docling unavailable, extraction cut short) must not
+                # be served in place of a full conversion once one is possible again
+                if result.get('degraded'):
+                    logger.debug(f"Not caching degraded result for {filename}: {result['degraded']}")
+                elif cache_key is not None:
+                    await asyncio.to_thread(self.cache.put, cache_key, result)
+        
+        # Chunking runs on the parsed artifact so it can be redone without re-parsing;
+        # tokenization is CPU-bound, so keep it off the event loop
+        await asyncio.to_thread(self._apply_chunking, result, options)
         
         # Add common metadata
         result.update({
+            'from_cache': from_cache,
             'filename': filename,
             'file_type': file_extension,
-            'file_size_bytes': len(file_content),
+            'file_size_bytes': document.size,
             'processed_at': datetime.now().isoformat(),
             'processing_options': options,
             'status': 'success'
@@ -205,108 +276,179 @@ class DocumentProcessor:
         
         return result
     
+    async def _extract_content_async(
+        self,
+        document: SpooledDocument,
+        file_extension: str,
+        filename: str,
+        options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Dispatch a file to the handler for its format."""
+        if file_extension == 'pdf':
+            return await self._process_pdf_async(document, filename, options)
+        elif file_extension == 'docx':
+            return await self._process_docx_async(document, filename, options)
+        elif file_extension in ['txt', 'md']:
+            return await self._process_text_async(document, filename, options)
+        elif file_extension == 'html':
+            return await self._process_html_async(document, filename, options)
+        else:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+    
     async def _process_pdf_async(
         self, 
-        content: bytes, 
+        document: SpooledDocument, 
         filename: str, 
         options: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Process PDF file using docling for advanced extraction."""
         logger.debug(f"Processing PDF: {filename}")
         
+        # Classify the file first so exactly one processing path runs
+        inspection, shards = await self._plan_pdf_conversion(document, filename, options)
+        status = inspection['status']
+        
+        if status in (PDF_CORRUPT, PDF_ENCRYPTED):
+            raise ValueError(f"Rejected {status} PDF: {inspection['reason']}")
+        
+        if status == PDF_DAMAGED:
+            logger.warning(f"Damaged PDF {filename} ({inspection['reason']}), extracting text layer only")
+            return await self._process_pdf_fallback_async(document, filename, options)
+        
+        # Convert shards in parallel in the worker pool, then stitch them in page order
         try:
-            # Use docling for advanced PDF processing
-            # Create temporary file-like object
-            pdf_stream = io.BytesIO(content)
-            
-            # Convert using docling
-            result = self.converter.convert(pdf_stream)
-            
-            # Extract structured content
-            extracted_text = result.document.export_to_markdown()
-            
-            # Extract tables if requested
-            tables = []
-            if options.get('extract_tables', True) and hasattr(result.document, 'tables'):
-                for table in result.document.tables:
-                    tables.append({
-                        'table_data': table.export_to_dataframe().to_dict() if hasattr(table, 'export_to_dataframe') else str(table),
-                        'caption': getattr(table, 'caption', ''),
-                        'page': getattr(table, 'page', 0)
-                    })
-            
-            # Extract images if requested
-            images = []
-            if options.get('extract_images', False) and hasattr(result.document, 'pictures'):
-                for img in result.document.pictures:
-                    images.append({
-                        'description': getattr(img, 'description', ''),
-                        'page': getattr(img, 'page', 0),
-                        'bbox': getattr(img, 'bbox', None)
-                    })
-            
-            # Chunk text if requested
-            chunks = self._chunk_text(extracted_text, options.get('chunk_size', 512))
-            
-            return {
-                'extracted_text': extracted_text,
-                'chunks': chunks,
-                'tables': tables,
-                'images': images,
-                'page_count': getattr(result.document, 'page_count', 0),
-                'word_count': len(extracted_text.split()),
-                'char_count': len(extracted_text)
-            }
+            converted_shards = await asyncio.gather(*[
+                self.conversion_pool.convert_pdf(
+                    document.path, filename, options, shard['do_ocr'],
+                    (shard['start_page'], shard['end_page']) if len(shards) > 1 else None
+                )
+                for shard in shards
+            ])
+        except ConverterUnavailable as e:
+            logger.error(f"Docling unavailable for {filename} ({e}), extracting text layer only")
+            result = await self._process_pdf_fallback_async(document, filename, options)
+            result['degraded'] = result.get('degraded') or 'docling unavailable'
+            return result
+        converted = merge_converted_shards(converted_shards)
+        extracted_text = converted['extracted_text']
+        
+        return {
+            'extracted_text': extracted_text,
+            'elements': converted['elements'],
+            'tables': converted['tables'],
+            'images': converted['images'],
+            'page_count': converted['page_count'],
+            'shard_count': len(shards),
+            'ocr_applied': any(shard['do_ocr'] for shard in shards),
+            'ocr_page_count': sum(
+                shard['end_page'] - shard['start_page'] + 1 for shard in shards if shard['do_ocr']
+            ),
+            'text_layer_coverage': inspection['coverage'],
+            'word_count': len(extracted_text.split()),
+            'char_count': len(extracted_text)
+        }
+    
+    async def _plan_pdf_conversion(
+        self,
+        document: SpooledDocument,
+        filename: str,
+        options: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Classify a PDF, split it into page-range shards and decide which ones need OCR.
+        
+        Args:
+            document: Spooled PDF
+            filename: Original filename
+            options: Processing options with ocr_mode and the OCR triage and shard settings
             
-        except Exception as e:
-            logger.error(f"Docling processing failed for {filename}: {e}")
-            # Fallback to PyPDF2
-            return await self._process_pdf_fallback_async(content, filename, options)
+        Returns:
+            Tuple of (pre-flight inspection, shards with start_page, end_page and do_ocr)
+        """
+        # Read from the options, which are also the cache key
+        def option(name: str) -> Any:
+            return options.get(name, getattr(self.doc_config, name))
+        
+        ocr_mode = option('ocr_mode')
+        
+        inspection = await self.conversion_pool.inspect_pdf(
+            document.path,
+            option('ocr_triage_sample_pages') if ocr_mode == 'auto' else 0,
+            option('ocr_min_chars_per_page'),
+            option('shard_threshold_pages'),
+            option('shard_size_pages')
+        )
+        
+        threshold = option('ocr_text_coverage_threshold')
+        shards = []
+        for shard in inspection['shards']:
+            if ocr_mode == 'auto':
+                do_ocr = shard['coverage'] is None or shard['coverage'] < threshold
+            else:
+                do_ocr = ocr_mode == 'always'
+            shards.append({'start_page': shard['start_page'], 'end_page': shard['end_page'], 'do_ocr': do_ocr})
+        
+        coverage = inspection['coverage']
+        logger.debug(
+            f"PDF pre-flight for {filename}: {inspection['status']}, {inspection['page_count']} pages "
+            f"in {len(shards)} shards, text layer coverage {coverage if coverage is not None else 'n/a'}, "
+            f"{sum(shard['do_ocr'] for shard in shards)} shards with OCR"
+        )
+        return inspection, shards
     
     async def _process_pdf_fallback_async(
         self, 
-        content: bytes, 
+        document: SpooledDocument, 
         filename: str, 
         options: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Fallback PDF processing using PyPDF2."""
+        """Text-layer-only PDF processing using PyPDF2, bounded by a time budget."""
         logger.debug(f"Using PyPDF2 fallback for: {filename}")
         
-        pdf_stream = io.BytesIO(content)
-        pdf_reader = PyPDF2.PdfReader(pdf_stream)
-        
-        extracted_text = ""
-        for page in pdf_reader.pages:
-            extracted_text += page.extract_text() + "\n"
-        
-        chunks = self._chunk_text(extracted_text, options.get('chunk_size', 512))
+        budget = self.doc_config.fallback_time_budget_seconds
+        extracted_text, page_count, pages_extracted = await self.conversion_pool.extract_pdf_text(
+            document.path, budget
+        )
+        degraded = None
+        if pages_extracted < page_count:
+            logger.warning(
+                f"Text extraction for {filename} stopped after {pages_extracted}/{page_count} pages "
+                f"({budget}s budget)"
+            )
+            degraded = 'time budget exceeded'
         
         return {
             'extracted_text': extracted_text,
-            'chunks': chunks,
+            'elements': markdown_elements(extracted_text),
             'tables': [],
             'images': [],
-            'page_count': len(pdf_reader.pages),
+            'page_count': page_count,
+            'pages_extracted': pages_extracted,
             'word_count': len(extracted_text.split()),
-            'char_count': len(extracted_text)
+            'char_count': len(extracted_text),
+            'degraded': degraded
         }
     
     async def _process_docx_async(
         self, 
-        content: bytes, 
+        document: SpooledDocument, 
         filename: str, 
         options: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Process DOCX file."""
         logger.debug(f"Processing DOCX: {filename}")
         
-        docx_stream = io.BytesIO(content)
-        doc = DocxDocument(docx_stream)
+        from docx import Document as DocxDocument
         
-        # Extract text from paragraphs
-        extracted_text = ""
+        doc = DocxDocument(document.path)
+        
+        # Extract text from paragraphs, classifying them by their style
+        builder = StructureBuilder()
         for paragraph in doc.paragraphs:
-            extracted_text += paragraph.text + "\n"
+            kind, level = self._docx_paragraph_kind(paragraph)
+            builder.append(paragraph.text, kind, level)
+            builder.append("\n")
+        extracted_text, elements = builder.build()
         
         # Extract tables if requested
         tables = []
@@ -323,11 +465,9 @@ class DocumentProcessor:
                     'cols': len(table_data[0]) if table_data else 0
                 })
         
-        chunks = self._chunk_text(extracted_text, options.get('chunk_size', 512))
-        
         return {
             'extracted_text': extracted_text,
-            'chunks': chunks,
+            'elements': elements,
             'tables': tables,
             'images': [],
             'paragraph_count': len(doc.paragraphs),
@@ -336,9 +476,22 @@ class DocumentProcessor:
             'char_count': len(extracted_text)
         }
     
+    @staticmethod
+    def _docx_paragraph_kind(paragraph: Any) -> Tuple[str, int]:
+        """Classify a DOCX paragraph as heading, list item or paragraph from its style name."""
+        style = paragraph.style.name if paragraph.style is not None else ''
+        if style == 'Title':
+            return HEADING, 1
+        if style.startswith('Heading'):
+            level = style.rsplit(' ', 1)[-1]
+            return HEADING, int(level) + 1 if level.isdigit() else 2
+        if style.startswith('List'):
+            return LIST_ITEM, 0
+        return PARAGRAPH, 0
+    
     async def _process_text_async(
         self, 
-        content: bytes, 
+        document: SpooledDocument, 
         filename: str, 
         options: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -346,22 +499,19 @@ class DocumentProcessor:
         logger.debug(f"Processing text file: {filename}")
         
         # Decode text content
-        try:
-            text_content = content.decode('utf-8')
-        except UnicodeDecodeError:
-            text_content = content.decode('latin-1')
+        text_content = decode_text(document.buffer)
         
         # Convert Markdown to HTML if it's a .md file
         html_content = ""
         if filename.lower().endswith('.md'):
+            import markdown
+            
             html_content = markdown.markdown(text_content, extensions=['tables', 'fenced_code'])
         
-        chunks = self._chunk_text(text_content, options.get('chunk_size', 512))
-        
         return {
             'extracted_text': text_content,
+            'elements': markdown_elements(text_content),
             'html_content': html_content,
-            'chunks': chunks,
             'tables': [],
             'images': [],
             'line_count': len(text_content.split('\n')),
@@ -371,7 +521,7 @@ class DocumentProcessor:
     
     async def _process_html_async(
         self, 
-        content: bytes, 
+        document: SpooledDocument, 
         filename: str, 
         options: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -379,16 +529,15 @@ class DocumentProcessor:
         logger.debug(f"Processing HTML: {filename}")
         
         # Decode HTML content
-        try:
-            html_content = content.decode('utf-8')
-        except UnicodeDecodeError:
-            html_content = content.decode('latin-1')
+        html_content = decode_text(document.buffer)
         
         # Parse with BeautifulSoup
+        from bs4 import BeautifulSoup
+        
         soup = BeautifulSoup(html_content, 'html.parser')
         
-        # Extract text content
-        extracted_text = soup.get_text(separator='\n', strip=True)
+        # Extract text content along with its block structure
+        extracted_text, elements = html_elements(soup)
         
         # Extract tables if requested
         tables = []
@@ -418,12 +567,10 @@ class DocumentProcessor:
                     'title': img.get('title', '')
                 })
         
-        chunks = self._chunk_text(extracted_text, options.get('chunk_size', 512))
-        
         return {
             'extracted_text': extracted_text,
+            'elements': elements,
             'html_content': html_content,
-            'chunks': chunks,
             'tables': tables,
             'images': images,
             'title': soup.find('title').get_text(strip=True) if soup.find('title') else '',
@@ -431,67 +578,132 @@ class DocumentProcessor:
             'char_count': len(extracted_text)
         }
     
-    def _chunk_text(self, text: str, chunk_size: int) -> List[Dict[str, Any]]:
+    def _apply_chunking(
+        self,
+        result: Dict[str, Any],
+        options: Dict[str, Any],
+        token_spans: Optional[Tuple[Any, Any]] = None
+    ) -> None:
         """
-        Split text into chunks for LLM processing.
+        Chunk a parsed result in place according to the chunking options.
         
         Args:
-            text: Text to chunk
-            chunk_size: Target chunk size in tokens (approximated by words)
+            result: Parsed result holding 'extracted_text' and 'elements'
+            options: Processing options with chunk_size, chunk_overlap and chunking_strategy
+            token_spans: Token spans of the extracted text, if already computed
+        """
+        text = result.get('extracted_text', '')
+        if token_spans is None:
+            token_spans = self.tokenizer.spans(text)
+        
+        result['chunks'] = self._chunk_text(
+            text,
+            options.get('chunk_size', self.doc_config.default_chunk_size),
+            options.get('chunk_overlap', self.doc_config.default_chunk_overlap),
+            result.get('elements'),
+            options.get('chunking_strategy', self.doc_config.chunking_strategy),
+            token_spans
+        )
+        result['token_count'] = len(token_spans[0])
+        result['tokenizer'] = self.tokenizer.name
+    
+    def rechunk_results(
+        self,
+        results: List[Dict[str, Any]],
+        chunk_size: int,
+        chunk_overlap: int = 0,
+        chunking_strategy: Optional[str] = None
+    ) -> int:
+        """
+        Re-chunk already processed results without re-parsing the documents.
+        
+        Args:
+            results: Stored processing results (updated in place)
+            chunk_size: New chunk size in tokens
+            chunk_overlap: New overlap between consecutive chunks
+            chunking_strategy: 'structure' or 'window' (configured default if None)
             
         Returns:
-            List of text chunks with metadata
+            Number of results that were re-chunked
+        """
+        options = {
+            'chunk_size': chunk_size,
+            'chunk_overlap': chunk_overlap,
+            'chunking_strategy': chunking_strategy or self.doc_config.chunking_strategy
+        }
+        successful = [result for result in results if result.get('status') == 'success']
+        
+        # Tokenize all documents in one batch
+        batch_spans = self.tokenizer.spans_batch([result.get('extracted_text', '') for result in successful])
+        
+        for result, token_spans in zip(successful, batch_spans):
+            self._apply_chunking(result, options, token_spans)
+            result['processing_options'] = {**result.get('processing_options', {}), **options}
+        
+        logger.info(
+            f"Re-chunked {len(successful)} documents (chunk_size={chunk_size}, overlap={chunk_overlap}, "
+            f"strategy={options['chunking_strategy']}, tokenizer={self.tokenizer.name})"
+        )
+        return len(successful)
+    
+    def _chunk_text(
+        self,
+        text: str,
+        chunk_size: int,
+        chunk_overlap: int = 0,
+        elements: Optional[Dict[str, List[Any]]] = None,
+        strategy: str = 'structure',
+        token_spans: Optional[Tuple[Any, Any]] = None
+    ) -> TextChunks:
         """
-        words = text.split()
-        chunks = []
+        Split text into chunks for LLM processing.
         
-        for i in range(0, len(words), chunk_size):
-            chunk_words = words[i:i + chunk_size]
-            chunk_text = ' '.join(chunk_words)
+        Args:
+            text: Text to chunk
+            chunk_size: Maximum chunk size in tokens
+            chunk_overlap: Tokens shared between consecutive chunks
+            elements: Element spans of the document, used by the 'structure' strategy
+            strategy: 'structure' or 'window'
+            token_spans: Token spans of the text (computed with the configured tokenizer if None)
             
-            chunks.append({
-                'chunk_id': len(chunks),
-                'text': chunk_text,
-                'word_count': len(chunk_words),
-                'char_count': len(chunk_text),
-                'start_word': i,
-                'end_word': min(i + chunk_size, len(words))
-            })
-        
-        return chunks
+        Returns:
+            Offset-based chunks over the text, materialized lazily
+        """
+        if token_spans is None:
+            token_spans = self.tokenizer.spans(text)
+        return chunk_document(text, elements, chunk_size, chunk_overlap, strategy, token_spans)
     
     def export_results(
         self, 
-        results: List[Dict[str, Any]], 
+        results: Iterable[Dict[str, Any]], 
         format: str = 'json',
-        output_path: Optional[str] = None
+        output_path: Optional[str] = None,
+        layout: str = 'results',
+        progress_placeholder: Optional[Any] = None
     ) -> str:
         """
         Export processing results to specified format.
         
+        Results are streamed batch by batch (see storage.exporters), so a
+        ResultSet of any size can be exported with bounded memory.
+        
         Args:
-            results: Processing results to export
-            format: Export format ('json', 'csv', 'parquet')
+            results: Processing results to export (a ResultSet or any iterable)
+            format: Export format ('parquet', 'arrow', 'jsonl', 'csv', 'json', 'sqlite')
             output_path: Output file path
+            layout: 'results' (one row per document) or 'chunks' (one row per chunk)
+            progress_placeholder: Streamlit placeholder or job handle for progress updates
             
         Returns:
             Path to exported file
         """
+        from storage.exporters import default_export_path, export_results
+        from storage.results_store import DOCUMENTS
+        
         if not output_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = f"kontext_processing_results_{timestamp}.{format}"
-        
-        # Convert to Polars DataFrame for consistent export
-        df = pl.DataFrame(results)
-        
-        if format == 'json':
-            df.write_json(output_path)
-        elif format == 'csv':
-            df.write_csv(output_path)
-        elif format == 'parquet':
-            df.write_parquet(output_path)
-        else:
-            raise ValueError(f"Unsupported export format: {format}")
+            output_path = default_export_path('kontext_processing_results', format, layout)
+        
+        export_results(results, output_path, format, layout, DOCUMENTS, progress_placeholder=progress_placeholder)
         
         logger.info(f"Results exported to {output_path}")
         return output_path
\ No newline at end of file
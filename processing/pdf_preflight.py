@@ -0,0 +1,199 @@
+"""
+PDF Pre-flight Checks for Kontext.
+
+Cheap inspections that run before the expensive docling pipeline. A structural
+check classifies each file (healthy, damaged, encrypted or corrupt) so that
+exactly one processing path is chosen up front. Large PDFs are planned as
+page-range shards that convert in parallel, and text-layer triage samples
+pages of each shard with PyPDF2 to decide whether it is born-digital (its
+text can be read directly) or scanned (it needs OCR).
+"""
+
+import io
+from typing import Any, Dict, List, Tuple
+
+from .spool import Buffer
+
+# Share of printable characters below which extracted text is treated as garbage
+MIN_PRINTABLE_RATIO = 0.6
+
+# Bytes searched for the header at the start and for the trailer at the end
+HEADER_WINDOW = 1024
+TRAILER_WINDOW = 2048
+
+# Pre-flight classifications
+PDF_OK = 'ok'
+PDF_DAMAGED = 'damaged'
+PDF_ENCRYPTED = 'encrypted'
+PDF_CORRUPT = 'corrupt'
+
+
+def as_stream(content: Buffer) -> Any:
+    """Wrap a buffer for PyPDF2 without copying it (memory maps are already file-like)."""
+    return content if hasattr(content, 'seek') else io.BytesIO(content)
+
+
+def check_pdf_structure(content: Buffer) -> Dict[str, Any]:
+    """
+    Inspect the raw bytes of a PDF without parsing it.
+
+    Looks for the ``%PDF-`` header, the ``startxref`` pointer and ``%%EOF``
+    marker of the trailer, and an ``/Encrypt`` dictionary.
+
+    Args:
+        content: Raw PDF bytes or a memory map of the file
+
+    Returns:
+        Dictionary of structural flags
+    """
+    tail = content[-TRAILER_WINDOW:]
+    return {
+        'has_header': content.find(b'%PDF-', 0, HEADER_WINDOW) != -1,
+        'has_startxref': b'startxref' in tail,
+        'has_eof': b'%%EOF' in tail,
+        'has_encrypt_dict': content.find(b'/Encrypt') != -1
+    }
+
+
+def plan_page_ranges(page_count: int, shard_threshold_pages: int, shard_size_pages: int) -> List[Tuple[int, int]]:
+    """
+    Split a document into page-range shards.
+
+    Args:
+        page_count: Number of pages in the document
+        shard_threshold_pages: Documents with more pages than this are sharded (0 disables)
+        shard_size_pages: Pages per shard
+
+    Returns:
+        List of 1-based inclusive (start_page, end_page) ranges in document order
+    """
+    if page_count <= 0:
+        return []
+    if shard_threshold_pages <= 0 or shard_size_pages <= 0 or page_count <= shard_threshold_pages:
+        return [(1, page_count)]
+    return [
+        (start, min(start + shard_size_pages - 1, page_count))
+        for start in range(1, page_count + 1, shard_size_pages)
+    ]
+
+
+def _sample_page_indices(start: int, end: int, sample_pages: int) -> List[int]:
+    """Pick up to ``sample_pages`` 0-based page indices spread evenly over [start, end)."""
+    page_count = end - start
+    if page_count <= sample_pages:
+        return list(range(start, end))
+    step = page_count / sample_pages
+    return sorted({start + int(i * step) for i in range(sample_pages)})
+
+
+def _is_usable_text(text: str, min_chars: int) -> bool:
+    """
+    Check whether extracted page text is real text rather than noise.
+
+    Broken font encodings often yield replacement characters or long runs of
+    symbols; those pages still need OCR.
+    """
+    stripped = text.strip()
+    if len(stripped) < min_chars:
+        return False
+    printable = sum(1 for ch in stripped if ch.isalnum() or ch.isspace() or ch in '.,;:!?\'"()-')
+    return printable / len(stripped) >= MIN_PRINTABLE_RATIO and '\ufffd' not in stripped[:min_chars]
+
+
+def inspect_pdf(
+    content: Buffer,
+    sample_pages: int = 8,
+    min_chars_per_page: int = 100,
+    shard_threshold_pages: int = 0,
+    shard_size_pages: int = 0
+) -> Dict[str, Any]:
+    """
+    Classify a PDF, plan its page-range shards and measure text-layer coverage.
+
+    The status is one of:
+
+    - ``ok``: structurally sound, safe to send to docling
+    - ``damaged``: readable only after PyPDF2 repaired a broken trailer or
+      cross-reference table; only the text layer is extracted
+    - ``encrypted``: needs a password, or carries an ``/Encrypt`` dictionary
+      PyPDF2 cannot open
+    - ``corrupt``: not a PDF, unreadable or without pages
+
+    Args:
+        content: Raw PDF bytes or a memory map of the file
+        sample_pages: Maximum number of pages to inspect per shard (0 skips triage)
+        min_chars_per_page: Characters a page needs for its text layer to count
+        shard_threshold_pages: Documents with more pages than this are sharded (0 disables)
+        shard_size_pages: Pages per shard
+
+    Returns:
+        Dictionary with status, reason, structural flags, page_count, the
+        overall coverage ratio and a list of shards, each with its page
+        range, sampled pages and coverage
+    """
+    import PyPDF2
+
+    structure = check_pdf_structure(content)
+    inspection = {
+        'status': PDF_OK,
+        'reason': '',
+        'structure': structure,
+        'page_count': 0,
+        'coverage': None,
+        'shards': []
+    }
+
+    def reject(status: str, reason: str) -> Dict[str, Any]:
+        inspection.update(status=status, reason=reason)
+        return inspection
+
+    if not structure['has_header']:
+        return reject(PDF_CORRUPT, 'missing %PDF- header')
+
+    try:
+        reader = PyPDF2.PdfReader(as_stream(content), strict=False)
+        if reader.is_encrypted:
+            # Files with an empty user password only restrict permissions
+            try:
+                if not reader.decrypt(''):
+                    return reject(PDF_ENCRYPTED, 'password required')
+            except Exception as e:
+                return reject(PDF_ENCRYPTED, f'unsupported encryption: {e}')
+        page_count = len(reader.pages)
+    except Exception as e:
+        # An /Encrypt dictionary PyPDF2 cannot get past means a locked file, not a broken one
+        if structure['has_encrypt_dict']:
+            return reject(PDF_ENCRYPTED, f'unsupported encryption: {e}')
+        return reject(PDF_CORRUPT, f'unreadable: {e}')
+
+    if page_count == 0:
+        return reject(PDF_CORRUPT, 'no pages')
+
+    inspection['page_count'] = page_count
+    if not (structure['has_startxref'] and structure['has_eof']):
+        inspection.update(status=PDF_DAMAGED, reason='truncated or missing trailer')
+
+    shards = []
+    all_usable = []
+    for start_page, end_page in plan_page_ranges(page_count, shard_threshold_pages, shard_size_pages):
+        indices = _sample_page_indices(start_page - 1, end_page, sample_pages) if sample_pages > 0 else []
+
+        usable = []
+        for index in indices:
+            try:
+                text = reader.pages[index].extract_text() or ''
+            except Exception:
+                text = ''
+            usable.append(_is_usable_text(text, min_chars_per_page))
+        all_usable.extend(usable)
+
+        shards.append({
+            'start_page': start_page,
+            'end_page': end_page,
+            'sampled_pages': [index + 1 for index in indices],
+            'coverage': sum(usable) / len(usable) if usable else None
+        })
+
+    inspection['shards'] = shards
+    inspection['coverage'] = sum(all_usable) / len(all_usable) if all_usable else None
+    return inspection
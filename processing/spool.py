@@ -0,0 +1,138 @@
+"""
+Upload Spooling for Kontext.
+
+Uploaded documents are written once to a temporary file and from then on
+accessed through a read-only memory map. Handlers, hashing and pre-flight
+checks read the mapped pages directly, and only the file path crosses the
+process-pool boundary, so no stage makes its own copy of the document bytes.
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Union
+
+# Chunk size for copying uploads that do not expose an in-memory buffer
+COPY_CHUNK_SIZE = 1024 * 1024
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[Buffer]:
+    """
+    Memory-map a file read-only.
+
+    Empty files cannot be mapped, so they yield ``b''`` instead.
+
+    Args:
+        path: File to map
+
+    Yields:
+        Read-only buffer over the file contents
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def decode_text(buffer: Buffer) -> str:
+    """Decode a text document as UTF-8, falling back to Latin-1."""
+    try:
+        return str(buffer, 'utf-8')
+    except UnicodeDecodeError:
+        return str(buffer, 'latin-1')
+
+
+class SpooledDocument:
+    """
+    An uploaded document spooled to a temporary file and memory-mapped.
+
+    Use as a context manager; the mapping is released and the temporary
+    file deleted on exit.
+    """
+
+    def __init__(self, path: str, size: int):
+        """
+        Initialize the spooled document.
+
+        Args:
+            path: Path of the spooled temporary file
+            size: Size of the document in bytes
+        """
+        self.path = path
+        self.size = size
+        self._file = None
+        self._buffer: Optional[Buffer] = None
+
+    @classmethod
+    def from_upload(cls, file_obj: Any, suffix: str = '', spool_dir: Optional[str] = None) -> 'SpooledDocument':
+        """
+        Spool an uploaded file object to disk.
+
+        In-memory uploads (Streamlit's UploadedFile is a BytesIO) are written
+        straight from their internal buffer without an intermediate bytes copy.
+
+        Args:
+            file_obj: Uploaded file object
+            suffix: Suffix for the temporary file, e.g. '.pdf'
+            spool_dir: Directory for temporary files (system default if None)
+
+        Returns:
+            SpooledDocument for the written file
+        """
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='kontext-', suffix=suffix, dir=spool_dir)
+
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(file_obj, 'getbuffer'):
+                    with file_obj.getbuffer() as view:
+                        out.write(view)
+                else:
+                    position = file_obj.tell() if hasattr(file_obj, 'tell') else 0
+                    file_obj.seek(0)
+                    shutil.copyfileobj(file_obj, out, COPY_CHUNK_SIZE)
+                    file_obj.seek(position)
+                size = out.tell()
+        except BaseException:
+            os.unlink(path)
+            raise
+
+        return cls(path, size)
+
+    @property
+    def buffer(self) -> Buffer:
+        """Read-only memory map of the document, opened on first access."""
+        if self._buffer is None:
+            if self.size == 0:
+                self._buffer = b''
+            else:
+                self._file = open(self.path, 'rb')
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._buffer
+
+    def close(self) -> None:
+        """Release the mapping and delete the temporary file."""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        if self._file is not None:
+            self._file.close()
+        self._buffer = None
+        self._file = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'SpooledDocument':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
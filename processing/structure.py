@@ -0,0 +1,277 @@
+"""
+Document Structure Extraction for Kontext.
+
+Records the element layout of a parsed document (headings, paragraphs, list
+items, tables, code) as character spans into its extracted text. The spans
+are stored column-wise alongside the text and drive structure-aware chunking.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Element kinds
+HEADING = 'heading'
+PARAGRAPH = 'paragraph'
+LIST_ITEM = 'list_item'
+TABLE = 'table'
+CODE = 'code'
+
+# Block-level HTML tags and the element kind they map to
+_HTML_BLOCKS = {
+    'h1': HEADING, 'h2': HEADING, 'h3': HEADING, 'h4': HEADING, 'h5': HEADING, 'h6': HEADING,
+    'li': LIST_ITEM, 'table': TABLE, 'pre': CODE,
+    'p': PARAGRAPH, 'blockquote': PARAGRAPH, 'dd': PARAGRAPH, 'dt': PARAGRAPH, 'figcaption': PARAGRAPH
+}
+
+_MD_HEADING = re.compile(r'(#{1,6})\s+\S')
+_MD_LIST_ITEM = re.compile(r'\s*(?:[-*+]|\d+[.)])\s+\S')
+_MD_FENCE = re.compile(r'\s*(```|~~~)')
+
+
+class StructureBuilder:
+    """
+    Builds extracted text piece by piece while recording element spans.
+
+    Elements are stored column-wise (kind, level, start, end) so that the
+    structure stays compact and JSON-serializable.
+    """
+
+    def __init__(self):
+        """Initialize an empty builder."""
+        self._parts: List[str] = []
+        self._length = 0
+        self.elements: Dict[str, List[Any]] = {'kind': [], 'level': [], 'start': [], 'end': []}
+
+    def append(self, text: str, kind: Optional[str] = None, level: int = 0) -> None:
+        """
+        Append text, optionally recording it as a structural element.
+
+        Args:
+            text: Text to append
+            kind: Element kind, or None for separators and unstructured text
+            level: Heading level (1 is the top level)
+        """
+        if not text:
+            return
+
+        if kind is not None:
+            # Record the span without surrounding whitespace
+            leading = len(text) - len(text.lstrip())
+            trailing = len(text) - len(text.rstrip())
+            if leading < len(text):
+                self._add_element(kind, level, self._length + leading, self._length + len(text) - trailing)
+
+        self._parts.append(text)
+        self._length += len(text)
+
+    def _add_element(self, kind: str, level: int, start: int, end: int) -> None:
+        """Record one element span."""
+        self.elements['kind'].append(kind)
+        self.elements['level'].append(level)
+        self.elements['start'].append(start)
+        self.elements['end'].append(end)
+
+    def build(self) -> Tuple[str, Dict[str, List[Any]]]:
+        """
+        Finish building.
+
+        Returns:
+            Tuple of (extracted text, column-wise element spans)
+        """
+        return ''.join(self._parts), self.elements
+
+
+def heading_text(text: str, start: int, end: int) -> str:
+    """Return a heading's text without Markdown markers."""
+    return ' '.join(text[start:end].lstrip('#').split())
+
+
+def docling_elements(document: Any) -> Tuple[str, Dict[str, List[Any]]]:
+    """
+    Serialize a docling document to Markdown while recording its structure.
+
+    Walks the document tree in reading order. Page headers, footers and
+    pictures are skipped, as in docling's own Markdown export.
+
+    Args:
+        document: docling DoclingDocument
+
+    Returns:
+        Tuple of (Markdown text, column-wise element spans)
+    """
+    builder = StructureBuilder()
+
+    for item, _ in document.iterate_items():
+        label = getattr(getattr(item, 'label', None), 'value', '')
+        text = getattr(item, 'text', '') or ''
+
+        if label in ('page_header', 'page_footer', 'picture'):
+            continue
+
+        if label == 'table':
+            try:
+                fragment, kind, level = item.export_to_markdown(document), TABLE, 0
+            except TypeError:
+                fragment, kind, level = item.export_to_markdown(), TABLE, 0
+        elif label == 'title':
+            fragment, kind, level = f"# {text}", HEADING, 1
+        elif label == 'section_header':
+            level = getattr(item, 'level', 1) + 1
+            fragment, kind = f"{'#' * min(level, 6)} {text}", HEADING
+        elif label == 'list_item':
+            fragment, kind, level = f"{getattr(item, 'marker', '') or '-'} {text}", LIST_ITEM, 0
+        elif label == 'code':
+            fragment, kind, level = f"```\n{text}\n```", CODE, 0
+        else:
+            fragment, kind, level = text, PARAGRAPH, 0
+
+        if not fragment.strip():
+            continue
+        if builder.elements['kind']:
+            builder.append('\n\n')
+        builder.append(fragment, kind, level)
+
+    return builder.build()
+
+
+def markdown_elements(text: str) -> Dict[str, List[Any]]:
+    """
+    Find the structural elements of Markdown or plain text.
+
+    ATX headings, list items, pipe tables and fenced code blocks are
+    recognized; other runs of non-blank lines are paragraphs. Plain text
+    without Markdown syntax yields one paragraph per blank-line-separated block.
+
+    Args:
+        text: Markdown or plain text
+
+    Returns:
+        Column-wise element spans into ``text``
+    """
+    builder = StructureBuilder()
+    block_kind: Optional[str] = None
+    block_start = block_end = 0
+    in_fence = False
+
+    def flush() -> None:
+        nonlocal block_kind
+        if block_kind is not None:
+            builder._add_element(block_kind, 0, block_start, block_end)
+            block_kind = None
+
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        stripped = line.strip()
+        line_end = line_start + len(line.rstrip())
+
+        if in_fence:
+            block_end = line_end
+            if _MD_FENCE.match(line):
+                in_fence = False
+                flush()
+            continue
+
+        if _MD_FENCE.match(line):
+            flush()
+            in_fence = True
+            block_kind, block_start, block_end = CODE, line_start + len(line) - len(line.lstrip()), line_end
+            continue
+
+        if not stripped:
+            flush()
+            continue
+
+        heading = _MD_HEADING.match(line)
+        if heading:
+            flush()
+            builder._add_element(HEADING, len(heading.group(1)), line_start, line_end)
+            continue
+
+        if _MD_LIST_ITEM.match(line):
+            flush()
+            kind = LIST_ITEM
+        elif stripped.startswith('|'):
+            kind = TABLE
+        else:
+            kind = PARAGRAPH
+
+        if block_kind == kind and kind != LIST_ITEM:
+            block_end = line_end
+        elif block_kind == LIST_ITEM and kind == PARAGRAPH and line[:1].isspace():
+            # Indented continuation of a list item
+            block_end = line_end
+        else:
+            flush()
+            block_kind, block_start, block_end = kind, line_start + len(line) - len(line.lstrip()), line_end
+
+    flush()
+    return builder.elements
+
+
+def html_elements(soup: Any) -> Tuple[str, Dict[str, List[Any]]]:
+    """
+    Extract the text of parsed HTML while recording its block structure.
+
+    The text is identical to ``soup.get_text(separator='\\n', strip=True)``;
+    consecutive strings inside the same block element form one element.
+
+    Args:
+        soup: BeautifulSoup document
+
+    Returns:
+        Tuple of (extracted text, column-wise element spans)
+    """
+    builder = StructureBuilder()
+    current = None
+    block_start = block_end = 0
+    position = 0
+
+    # Same strings, in the same order, that get_text(strip=True) joins; kept
+    # as tree nodes so their enclosing block can be looked up
+    for node in soup.strings:
+        string = node.strip()
+        if not string:
+            continue
+        if position:
+            builder.append('\n')
+            position += 1
+
+        block = _html_block_of(node)
+        builder.append(string)
+        start, position = position, position + len(string)
+
+        if current is not None and block[0] is not None and block[0] is current[0]:
+            block_end = position
+            continue
+
+        if current is not None:
+            builder._add_element(current[1], current[2], block_start, block_end)
+        current, block_start, block_end = block, start, position
+
+    if current is not None:
+        builder._add_element(current[1], current[2], block_start, block_end)
+
+    return builder.build()
+
+
+def _html_block_of(node: Any) -> Tuple[Any, str, int]:
+    """Find the nearest block-level ancestor of a string node and its element kind."""
+    parent = node.parent
+    while parent is not None and getattr(parent, 'name', None) not in (None, '[document]'):
+        kind = _HTML_BLOCKS.get(parent.name)
+        if kind is not None:
+            level = int(parent.name[1]) if kind == HEADING else 0
+            return parent, kind, level
+        parent = parent.parent
+    return None, PARAGRAPH, 0
+
+
+def shift_elements(elements: Dict[str, List[Any]], offset: int) -> Dict[str, List[Any]]:
+    """Return element spans shifted by ``offset`` characters."""
+    return {
+        'kind': list(elements['kind']),
+        'level': list(elements['level']),
+        'start': [start + offset for start in elements['start']],
+        'end': [end + offset for end in elements['end']]
+    }
@@ -0,0 +1,271 @@
+"""
+Tokenization for Kontext.
+
+Chunk sizes are measured in tokens of a pluggable tokenizer. Every tokenizer
+reports the character span of each token, so chunk boundaries can be placed
+on token boundaries and chunk offsets still refer to the source text.
+
+Available tokenizers:
+
+- ``words``: whitespace-separated words (the historical behaviour)
+- ``regex``: a dependency-free approximation of BPE tokenizers that splits
+  long words, numbers, punctuation and CJK characters like byte-pair
+  vocabularies do
+- ``huggingface``: a ``tokenizer.json`` file loaded with the optional
+  ``tokenizers`` package
+- ``tiktoken``: a ``.tiktoken`` BPE rank file loaded with the optional
+  ``tiktoken`` package
+
+Model vocabularies are only ever read from local disk. Additional tokenizers
+can be added with ``register_tokenizer``.
+"""
+
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .chunking import word_boundaries
+
+Spans = Tuple[np.ndarray, np.ndarray]
+
+# Approximates byte-pair tokenization: letter runs of up to 6 characters,
+# numbers in groups of up to 3 digits, and single CJK characters and symbols
+_REGEX_TOKEN = re.compile(
+    r'[^\W\d_\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]{1,6}'
+    r'|\d{1,3}'
+    r'|\w'
+    r'|[^\w\s]'
+)
+
+# Pre-tokenization patterns of the public tiktoken encodings, keyed by the
+# stem of their rank file
+_TIKTOKEN_PATTERNS = {
+    'cl100k_base': (
+        r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+        r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+    ),
+    'o200k_base': '|'.join([
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""\p{N}{1,3}""",
+        r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+        r"""\s*[\r\n]+""",
+        r"""\s+(?!\S)""",
+        r"""\s+""",
+    ])
+}
+
+
+class Tokenizer:
+    """
+    Base tokenizer: whitespace-separated words.
+
+    Subclasses override ``spans`` and, where the backend can process many
+    texts at once, ``spans_batch``.
+    """
+
+    name = 'words'
+
+    def spans(self, text: str) -> Spans:
+        """
+        Find the character span of every token.
+
+        Args:
+            text: Text to tokenize
+
+        Returns:
+            Tuple of (token start offsets, token end offsets) as int64 arrays
+        """
+        return word_boundaries(text)
+
+    def spans_batch(self, texts: Sequence[str]) -> List[Spans]:
+        """
+        Tokenize many texts at once.
+
+        Args:
+            texts: Texts to tokenize
+
+        Returns:
+            Token spans of each text, in order
+        """
+        return [self.spans(text) for text in texts]
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Count the tokens of many texts at once.
+
+        Args:
+            texts: Texts to count
+
+        Returns:
+            Token count of each text
+        """
+        return np.array([len(starts) for starts, _ in self.spans_batch(texts)], dtype=np.int64)
+
+
+class RegexTokenizer(Tokenizer):
+    """Dependency-free approximation of a BPE tokenizer."""
+
+    name = 'regex'
+
+    def spans(self, text: str) -> Spans:
+        offsets = np.fromiter(
+            (offset for match in _REGEX_TOKEN.finditer(text) for offset in match.span()),
+            dtype=np.int64
+        )
+        return offsets[0::2], offsets[1::2]
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """Tokenizer loaded from a local ``tokenizer.json`` with the ``tokenizers`` package."""
+
+    name = 'huggingface'
+
+    def __init__(self, path: str):
+        """
+        Load the tokenizer.
+
+        Args:
+            path: Path of a tokenizer.json file
+        """
+        from tokenizers import Tokenizer as _Tokenizer
+
+        self._tokenizer = _Tokenizer.from_file(path)
+        self.name = f"huggingface:{os.path.basename(path)}"
+
+    def spans(self, text: str) -> Spans:
+        return self.spans_batch([text])[0]
+
+    def spans_batch(self, texts: Sequence[str]) -> List[Spans]:
+        # encode_batch runs on all cores in native code, outside the GIL
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        spans = []
+        for encoding in encodings:
+            offsets = np.asarray(encoding.offsets, dtype=np.int64).reshape(-1, 2)
+            spans.append((offsets[:, 0], offsets[:, 1]))
+        return spans
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return np.array([len(encoding.ids) for encoding in encodings], dtype=np.int64)
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Tokenizer loaded from a local ``.tiktoken`` BPE rank file with the ``tiktoken`` package."""
+
+    name = 'tiktoken'
+
+    def __init__(self, path: str):
+        """
+        Load the BPE ranks.
+
+        The pre-tokenization pattern is chosen by the file name
+        (``o200k_base.tiktoken`` or, by default, ``cl100k_base``).
+
+        Args:
+            path: Path of a .tiktoken rank file
+        """
+        import tiktoken
+        from tiktoken.load import load_tiktoken_bpe
+
+        stem = os.path.splitext(os.path.basename(path))[0]
+        ranks = load_tiktoken_bpe(path)
+        self._encoding = tiktoken.Encoding(
+            name=stem,
+            pat_str=_TIKTOKEN_PATTERNS.get(stem, _TIKTOKEN_PATTERNS['cl100k_base']),
+            mergeable_ranks=ranks,
+            special_tokens={}
+        )
+        # Byte length of every token, to turn token ids into offsets without decoding
+        self._token_lengths = np.zeros(max(ranks.values()) + 1, dtype=np.int64)
+        for token_bytes, rank in ranks.items():
+            self._token_lengths[rank] = len(token_bytes)
+        self.name = f"tiktoken:{stem}"
+
+    def _spans_from_ids(self, text: str, ids: Sequence[int]) -> Spans:
+        """Convert token ids to character spans via their byte lengths."""
+        if not ids:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        byte_ends = np.cumsum(self._token_lengths[np.asarray(ids, dtype=np.int64)])
+        byte_starts = byte_ends - self._token_lengths[np.asarray(ids, dtype=np.int64)]
+
+        # Character index of every byte: count UTF-8 lead bytes
+        encoded = np.frombuffer(text.encode('utf-8', 'surrogatepass'), dtype=np.uint8)
+        char_of_byte = np.cumsum((encoded & 0xC0) != 0x80) - 1
+        starts = char_of_byte[byte_starts]
+        ends = char_of_byte[byte_ends - 1] + 1
+        return starts.astype(np.int64), ends.astype(np.int64)
+
+    def spans(self, text: str) -> Spans:
+        return self._spans_from_ids(text, self._encoding.encode_ordinary(text))
+
+    def spans_batch(self, texts: Sequence[str]) -> List[Spans]:
+        batch = self._encoding.encode_ordinary_batch(list(texts))
+        return [self._spans_from_ids(text, ids) for text, ids in zip(texts, batch)]
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        return np.array([len(ids) for ids in self._encoding.encode_ordinary_batch(list(texts))], dtype=np.int64)
+
+
+# Factories take the configured vocabulary path (None for built-in tokenizers)
+_factories: Dict[str, Callable[[Optional[str]], Tokenizer]] = {
+    'words': lambda path: Tokenizer(),
+    'regex': lambda path: RegexTokenizer(),
+    'huggingface': HuggingFaceTokenizer,
+    'tiktoken': TiktokenTokenizer
+}
+
+_tokenizers: Dict[Tuple[str, Optional[str]], Tokenizer] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def register_tokenizer(name: str, factory: Callable[[Optional[str]], Tokenizer]) -> None:
+    """
+    Register an additional tokenizer.
+
+    Args:
+        name: Name used in the 'tokenizer' setting
+        factory: Callable taking the configured vocabulary path and returning a Tokenizer
+    """
+    _factories[name] = factory
+
+
+def available_tokenizers() -> List[str]:
+    """Return the names of all registered tokenizers."""
+    return list(_factories)
+
+
+def get_tokenizer(name: str, path: Optional[str] = None) -> Tokenizer:
+    """
+    Get the process-wide tokenizer for a configuration.
+
+    Tokenizers that cannot be loaded (unknown name, missing vocabulary file
+    or optional package) fall back to the regex tokenizer with a warning.
+
+    Args:
+        name: Registered tokenizer name
+        path: Local vocabulary file, for tokenizers that need one
+
+    Returns:
+        Shared Tokenizer instance
+    """
+    key = (name, path)
+    with _tokenizers_lock:
+        if key not in _tokenizers:
+            try:
+                if name not in _factories:
+                    raise ValueError(f"unknown tokenizer '{name}'")
+                if name in ('huggingface', 'tiktoken') and not (path and os.path.isfile(path)):
+                    raise FileNotFoundError(f"vocabulary file not found: {path}")
+                _tokenizers[key] = _factories[name](path)
+                logger.info(f"Loaded tokenizer {_tokenizers[key].name}")
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer '{name}' ({e}), using regex approximation")
+                _tokenizers[key] = RegexTokenizer()
+        return _tokenizers[key]
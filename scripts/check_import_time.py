@@ -0,0 +1,112 @@
+"""
+Import-Time Budget Check for Kontext.
+
+Measures the cold-start cost of importing the Streamlit app in fresh
+interpreters and fails when it regresses:
+
+- the total time to import ``streamlit`` and ``app`` must stay within the
+  budget (best of several runs, to filter out scheduler noise)
+- none of the heavy document processing or crawling dependencies may be
+  imported at startup; they are loaded when their subsystem is first used
+
+Usage:
+    python scripts/check_import_time.py [--budget-ms 1000] [--runs 5] [--top 10]
+
+Exits with status 1 if the budget is exceeded or a heavy module is imported.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be loaded before the first page renders
+HEAVY_MODULES = [
+    'docling', 'PyPDF2', 'docx', 'bs4', 'markdown',
+    'crawlee', 'playwright', 'aiohttp',
+    'polars', 'numpy', 'rich', 'tqdm', 'tokenizers', 'tiktoken',
+    'processing.document_processor', 'crawling.crawler'
+]
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import streamlit
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'elapsed_ms': elapsed * 1000,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def run_probe() -> Tuple[Dict, List[Tuple[int, str]]]:
+    """
+    Import the app in a fresh interpreter.
+
+    Returns:
+        Tuple of (probe result, list of (cumulative microseconds, module) from
+        -X importtime, with nested modules indented as in its output)
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | module"
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        timings.append((int(cumulative), module[1:].rstrip()))
+
+    return json.loads(completed.stdout.strip().splitlines()[-1]), timings
+
+
+def main() -> int:
+    """Run the check and report the result."""
+    parser = argparse.ArgumentParser(description="Fail if the app's cold-start import time exceeds a budget.")
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="Maximum import time in milliseconds")
+    parser.add_argument('--runs', type=int, default=5, help="Number of fresh interpreters to measure")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest top-level imports to list")
+    args = parser.parse_args()
+
+    results = [run_probe() for _ in range(max(1, args.runs))]
+    best, timings = min(results, key=lambda result: result[0]['elapsed_ms'])
+    elapsed_ms = best['elapsed_ms']
+
+    print(f"Cold-start import of streamlit + app: {elapsed_ms:.0f} ms (best of {len(results)}, budget {args.budget_ms:.0f} ms)")
+
+    # Top-level modules only: nested ones are included in their parent's cumulative time
+    top_level = sorted(
+        ((cumulative, module) for cumulative, module in timings if not module.startswith(' ')),
+        reverse=True
+    )
+    print("Slowest top-level imports:")
+    for cumulative, module in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    failed = False
+    if best['heavy']:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(best['heavy'])}")
+        failed = True
+    if elapsed_ms > args.budget_ms:
+        print(f"FAIL: import time {elapsed_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
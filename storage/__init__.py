@@ -0,0 +1,37 @@
+"""
+Storage package for Kontext.
+
+This package persists processing and crawling results outside of the
+Streamlit session so that they survive restarts and do not live in memory.
+
+Submodules are imported on first attribute access (PEP 562).
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .results_store import DOCUMENTS, PAGES, ResultSet, ResultsStore
+
+# Public name -> submodule that defines it
+_LAZY_EXPORTS = {
+    'DOCUMENTS': '.results_store',
+    'PAGES': '.results_store',
+    'ResultSet': '.results_store',
+    'ResultsStore': '.results_store'
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining ``name`` on first access."""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
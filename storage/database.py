@@ -0,0 +1,268 @@
+"""
+Embedded Database Exports for Kontext.
+
+Exports results into a single SQLite file with normalized tables instead of
+one flat table, so exports can be queried directly rather than re-loaded
+into scripts:
+
+- ``documents`` or ``pages``: one row per result (scalar fields, everything
+  else as a JSON ``metadata`` column)
+- ``chunks``: one row per chunk with offsets, token counts and heading path
+- ``tables``: one row per extracted table (documents)
+- ``links``: one row per link (crawled pages)
+- ``chunks_fts``: FTS5 index over chunk text and heading paths
+
+Example:
+    SELECT c.source, c.chunk_id, snippet(chunks_fts, 0, '[', ']', '...', 12)
+    FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+    WHERE chunks_fts MATCH 'retrieval AND augmented' ORDER BY rank LIMIT 10;
+
+The FTS index uses the chunks table as external content, so chunk text is
+stored once, and it is built in one pass after all rows are inserted.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from .exporters import check_cancelled
+from .results_store import DOCUMENTS, PAGES
+from .rows import RESULT_COLUMNS, chunk_rows, iter_result_batches, to_json
+
+# Result table per kind
+_RESULT_TABLES = {DOCUMENTS: 'documents', PAGES: 'pages'}
+
+# Fields stored in their own tables, or left out as derivable
+_NORMALIZED_FIELDS = {'chunks', 'tables', 'links', 'elements', 'html_content'}
+
+_SQL_TYPES = {'int64': 'INTEGER', 'string': 'TEXT'}
+
+_SCHEMA = """
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY,
+    result_id INTEGER NOT NULL,
+    source TEXT,
+    chunk_id INTEGER,
+    start_char INTEGER,
+    end_char INTEGER,
+    start_token INTEGER,
+    end_token INTEGER,
+    token_count INTEGER,
+    word_count INTEGER,
+    heading_path TEXT,
+    text TEXT
+);
+CREATE TABLE tables (
+    id INTEGER PRIMARY KEY,
+    result_id INTEGER NOT NULL,
+    table_index INTEGER,
+    caption TEXT,
+    page INTEGER,
+    n_rows INTEGER,
+    n_cols INTEGER,
+    data TEXT
+);
+CREATE TABLE links (
+    id INTEGER PRIMARY KEY,
+    result_id INTEGER NOT NULL,
+    url TEXT,
+    text TEXT,
+    title TEXT
+);
+CREATE VIRTUAL TABLE chunks_fts USING fts5(
+    text, heading_path, content='chunks', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_INDEXES = """
+CREATE INDEX idx_chunks_result ON chunks(result_id, chunk_id);
+CREATE INDEX idx_tables_result ON tables(result_id);
+CREATE INDEX idx_links_result ON links(result_id);
+CREATE INDEX idx_links_url ON links(url);
+"""
+
+
+def _result_columns(kind: str) -> List[str]:
+    scalar_columns, _ = RESULT_COLUMNS[kind]
+    return [name for name, _ in scalar_columns] + ['metadata']
+
+
+def _create_schema(conn: sqlite3.Connection, kind: str) -> None:
+    """Create the result table for a kind and the shared tables."""
+    scalar_columns, _ = RESULT_COLUMNS[kind]
+    columns = ', '.join(
+        f"{name} {'INTEGER PRIMARY KEY' if name == 'result_id' else _SQL_TYPES[column_type]}"
+        for name, column_type in scalar_columns
+    )
+    conn.execute(f"CREATE TABLE {_RESULT_TABLES[kind]} ({columns}, metadata TEXT)")
+    conn.executescript(_SCHEMA)
+
+
+def _result_row(result: Dict[str, Any], kind: str) -> tuple:
+    scalar_columns, _ = RESULT_COLUMNS[kind]
+    row = [result.get(name) for name, _ in scalar_columns]
+    error_index = [name for name, _ in scalar_columns].index('error')
+    if row[error_index] is not None:
+        row[error_index] = str(row[error_index])
+
+    known = {name for name, _ in scalar_columns} | _NORMALIZED_FIELDS
+    row.append(to_json({key: value for key, value in result.items() if key not in known}))
+    return tuple(row)
+
+
+def _table_rows(result: Dict[str, Any]) -> List[tuple]:
+    rows = []
+    for index, table in enumerate(result.get('tables') or []):
+        data = table.get('table_data')
+        rows.append((
+            result['result_id'], index, table.get('caption') or None, table.get('page'),
+            table.get('rows'), table.get('cols'), data if isinstance(data, str) else to_json(data)
+        ))
+    return rows
+
+
+def _link_rows(result: Dict[str, Any]) -> List[tuple]:
+    return [
+        (result['result_id'], link.get('url'), link.get('text'), link.get('title') or None)
+        for link in (result.get('links') or [])
+    ]
+
+
+def export_to_sqlite(
+    results: Iterable[Dict[str, Any]],
+    output_path: str,
+    kind: Optional[str] = None,
+    batch_size: int = 64,
+    progress_placeholder: Optional[Any] = None
+) -> int:
+    """
+    Stream results into a new SQLite database with a full-text index.
+
+    The database is built under a temporary name and moved into place when
+    complete, replacing any existing file.
+
+    Args:
+        results: ResultSet or any iterable of results
+        output_path: Output database path
+        kind: DOCUMENTS or PAGES (taken from a ResultSet if None)
+        batch_size: Number of results read and written at a time
+        progress_placeholder: Streamlit placeholder or job handle for progress updates
+
+    Returns:
+        Number of chunk rows written
+
+    Raises:
+        ExportCancelled: If the job passed as progress_placeholder is cancelled
+    """
+    kind = kind or getattr(results, 'kind', DOCUMENTS)
+    result_table = _RESULT_TABLES[kind]
+    result_columns = _result_columns(kind)
+    insert_result = (
+        f"INSERT INTO {result_table} ({', '.join(result_columns)}) "
+        f"VALUES ({', '.join('?' * len(result_columns))})"
+    )
+
+    total = len(results) if hasattr(results, '__len__') else None
+    results_done = 0
+    chunks_written = 0
+    next_result_id = 1
+    started = datetime.now()
+
+    tmp_path = f"{output_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # The file is only published once complete, so durability is not needed while building
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        _create_schema(conn, kind)
+
+        for batch in iter_result_batches(results, batch_size):
+            check_cancelled(progress_placeholder)
+            result_values, chunk_values, table_values, link_values = [], [], [], []
+            for result in batch:
+                # Plain iterables have no store ids; number them in order
+                if result.get('result_id') is None:
+                    result = {**result, 'result_id': next_result_id}
+                next_result_id = max(next_result_id, result['result_id']) + 1
+
+                result_values.append(_result_row(result, kind))
+                chunk_values.extend(
+                    (row['result_id'], row['source'], row['chunk_id'], row['start_char'], row['end_char'],
+                     row['start_token'], row['end_token'], row['token_count'], row['word_count'],
+                     ' > '.join(row['heading_path']) or None, row['text'])
+                    for row in chunk_rows(result, kind, True)
+                )
+                table_values.extend(_table_rows(result))
+                link_values.extend(_link_rows(result))
+
+            with conn:
+                conn.executemany(insert_result, result_values)
+                conn.executemany(
+                    'INSERT INTO chunks (result_id, source, chunk_id, start_char, end_char, start_token, '
+                    'end_token, token_count, word_count, heading_path, text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    chunk_values
+                )
+                conn.executemany(
+                    'INSERT INTO tables (result_id, table_index, caption, page, n_rows, n_cols, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    table_values
+                )
+                conn.executemany('INSERT INTO links (result_id, url, text, title) VALUES (?, ?, ?, ?)', link_values)
+
+            chunks_written += len(chunk_values)
+            results_done += len(batch)
+            if progress_placeholder and total:
+                # Leave room for building the indexes
+                progress_placeholder.progress(min(0.9, 0.9 * results_done / total))
+
+        with conn:
+            conn.executescript(_INDEXES)
+            conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize')")
+        conn.execute('ANALYZE')
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, output_path)
+
+    elapsed = (datetime.now() - started).total_seconds()
+    logger.info(
+        f"Exported {results_done} results with {chunks_written} chunks to {output_path} "
+        f"(sqlite, {elapsed:.1f}s)"
+    )
+    return chunks_written
+
+
+def search_database(db_path: str, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Run a full-text query against an exported database.
+
+    Args:
+        db_path: Database written by export_to_sqlite
+        query: FTS5 query, e.g. 'vector AND index' or '"exact phrase"'
+        limit: Maximum number of chunks returned
+
+    Returns:
+        Matching chunks, best first, with a highlighted snippet
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT c.result_id, c.source, c.chunk_id, c.heading_path, c.start_char, c.end_char, "
+            "snippet(chunks_fts, 0, '[', ']', '...', 16) AS snippet, bm25(chunks_fts) AS score "
+            "FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid "
+            "WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
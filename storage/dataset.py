@@ -0,0 +1,367 @@
+"""
+Partitioned Parquet Datasets for Kontext.
+
+Instead of one timestamped file per export, results can be appended to a
+hive-partitioned Parquet dataset, one per result kind and layout:
+
+    data/datasets/documents/file_type=pdf/date=2026-10-18/part-....parquet
+    data/datasets/page_chunks/domain=example.com/date=2026-10-18/part-....parquet
+
+Repeated jobs add files to the same dataset, which Polars, DuckDB or pyarrow
+can scan as one table while pruning partitions from the directory names,
+e.g. ``pl.scan_parquet('data/datasets/documents/**/*.parquet', hive_partitioning=True)``.
+
+Every append writes at least one file per partition it touches, so datasets
+fed by many small jobs accumulate small files; ``compact_dataset`` merges
+them into larger files partition by partition.
+
+A dataset records, per results collection, the highest result id it has
+received, so exporting a session's results again only appends the results
+added since. Appends and compactions of one dataset never overlap, within
+this process or across processes.
+"""
+
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from .exporters import check_cancelled
+from .results_store import DOCUMENTS, PAGES
+from .rows import (
+    LAYOUT_CHUNKS, LAYOUT_RESULTS, arrow_schema, chunk_rows, iter_result_batches, layout_columns, result_rows
+)
+
+# Partition keys: 'job' (job id), 'source' (file type of documents, domain
+# of pages) and 'date' (day the result was produced)
+PARTITION_KEYS = ('job', 'source', 'date')
+
+MB = 1024 * 1024
+
+# Lock file guarding appends and compaction across processes, and the file
+# recording the last exported result id per collection (hidden, so dataset
+# readers skip them)
+LOCK_FILE = '.dataset.lock'
+WATERMARKS_FILE = '.exported.json'
+
+# Per-dataset locks of this process, keyed by resolved dataset directory
+_dataset_locks: Dict[str, threading.Lock] = {}
+_dataset_locks_guard = threading.Lock()
+
+
+def dataset_path(root: str, kind: str, layout: str = LAYOUT_RESULTS) -> Path:
+    """
+    Directory of the dataset for a result kind and layout.
+
+    Args:
+        root: Root directory of all datasets
+        kind: DOCUMENTS or PAGES
+        layout: LAYOUT_RESULTS or LAYOUT_CHUNKS
+
+    Returns:
+        Dataset directory
+    """
+    name = f"{kind}_chunks" if layout == LAYOUT_CHUNKS else f"{kind}s"
+    return Path(root) / name
+
+
+def _partition_columns(kind: str, partition_by: Sequence[str]) -> List[str]:
+    """Map partition keys to the column names used in the directory layout."""
+    unknown = [key for key in partition_by if key not in PARTITION_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown partition keys: {unknown} (choose from {PARTITION_KEYS})")
+    names = {'job': 'job_id', 'source': 'file_type' if kind == DOCUMENTS else 'domain', 'date': 'date'}
+    return [names[key] for key in partition_by]
+
+
+def _partition_values(result: Dict[str, Any], kind: str) -> Dict[str, str]:
+    """Partition values of a result; missing values map to a placeholder."""
+    produced_at = result.get('processed_at') or result.get('crawled_at') or ''
+    if kind == DOCUMENTS:
+        source = result.get('file_type') or Path(result.get('filename') or '').suffix.lstrip('.')
+        source_column = 'file_type'
+    else:
+        source = urlparse(result.get('url') or '').hostname
+        source_column = 'domain'
+    return {
+        'job_id': result.get('job_id') or 'none',
+        source_column: (source or 'unknown').lower(),
+        'date': produced_at[:10] or datetime.now().strftime('%Y-%m-%d')
+    }
+
+
+def append_to_dataset(
+    results: Iterable[Dict[str, Any]],
+    root: str,
+    layout: str = LAYOUT_RESULTS,
+    kind: Optional[str] = None,
+    partition_by: Sequence[str] = ('source', 'date'),
+    batch_size: int = 64,
+    progress_placeholder: Optional[Any] = None
+) -> int:
+    """
+    Append results to the partitioned dataset of their kind and layout.
+
+    Results are streamed into pyarrow's dataset writer batch by batch; each
+    call adds new part files and never rewrites existing ones. For a
+    ResultSet, only results added since its last append to this dataset are
+    written.
+
+    Args:
+        results: ResultSet or any iterable of results
+        root: Root directory of all datasets
+        layout: LAYOUT_RESULTS or LAYOUT_CHUNKS
+        kind: DOCUMENTS or PAGES (taken from a ResultSet if None)
+        partition_by: Partition keys, outermost first (see PARTITION_KEYS)
+        batch_size: Number of results read and written at a time
+        progress_placeholder: Streamlit placeholder or job handle for progress updates
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        ExportCancelled: If the job passed as progress_placeholder is cancelled;
+            the files already written by this append are removed
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    kind = kind or getattr(results, 'kind', DOCUMENTS)
+    partition_columns = _partition_columns(kind, partition_by)
+    build_rows = chunk_rows if layout == LAYOUT_CHUNKS else result_rows
+
+    # Partition columns come from the directory names, so drop them from the data
+    columns = [
+        (name, column_type) for name, column_type in layout_columns(layout, kind)
+        if name not in partition_columns
+    ]
+    schema = arrow_schema(columns + [(name, 'string') for name in partition_columns])
+
+    total = len(results) if hasattr(results, '__len__') else None
+    counts = {'results': 0, 'rows': 0, 'last_id': 0}
+    # Results of a ResultSet are appended once; plain iterables are always appended
+    collection = getattr(results, 'collection', None)
+
+    def record_batches(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[Any]:
+        for batch in batches:
+            check_cancelled(progress_placeholder)
+            rows = []
+            for result in batch:
+                values = _partition_values(result, kind)
+                for row in build_rows(result, kind, False):
+                    row.update({name: values[name] for name in partition_columns})
+                    rows.append(row)
+                counts['last_id'] = max(counts['last_id'], result.get('result_id') or 0)
+            counts['results'] += len(batch)
+            counts['rows'] += len(rows)
+            if progress_placeholder and total:
+                progress_placeholder.progress(min(1.0, counts['results'] / total))
+            if rows:
+                yield pa.RecordBatch.from_pylist(rows, schema=schema)
+
+    target = dataset_path(root, kind, layout)
+    target.mkdir(parents=True, exist_ok=True)
+    basename = f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    with _dataset_lock(target):
+        watermarks = _read_watermarks(target)
+        if collection is not None:
+            batches = results.iter_batches(batch_size=batch_size, after_id=watermarks.get(collection, 0))
+        else:
+            batches = iter_result_batches(results, batch_size)
+        try:
+            ds.write_dataset(
+                record_batches(batches),
+                target,
+                schema=schema,
+                format='parquet',
+                partitioning=partition_columns,
+                partitioning_flavor='hive',
+                basename_template=f"{basename}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                file_options=ds.ParquetFileFormat().make_write_options(compression='zstd')
+            )
+        except BaseException:
+            # Leave the dataset as it was before this append
+            for path in target.rglob(f"{basename}-*.parquet"):
+                path.unlink(missing_ok=True)
+            raise
+
+        if collection is not None and counts['last_id'] > watermarks.get(collection, 0):
+            watermarks[collection] = counts['last_id']
+            _write_watermarks(target, watermarks)
+
+    logger.info(f"Appended {counts['results']} results as {counts['rows']} rows to dataset {target}")
+    return counts['rows']
+
+
+def _partition_files(root: Path) -> Dict[Path, List[Path]]:
+    """Group the Parquet files of a dataset by partition directory."""
+    partitions: Dict[Path, List[Path]] = {}
+    for directory, _, filenames in os.walk(root):
+        files = sorted(Path(directory) / name for name in filenames if name.endswith('.parquet'))
+        if files:
+            partitions[Path(directory)] = files
+    return partitions
+
+
+def _read_watermarks(root: Path) -> Dict[str, int]:
+    """Highest result id appended to a dataset, per results collection."""
+    path = root / WATERMARKS_FILE
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return {}
+
+
+def _write_watermarks(root: Path, watermarks: Dict[str, int]) -> None:
+    path = root / WATERMARKS_FILE
+    tmp_path = root / f"{WATERMARKS_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _dataset_lock(root: Path) -> Iterator[None]:
+    """
+    Hold the lock of a dataset, waiting for a running append or compaction.
+
+    Two overlapping compactions would merge the same small files and both
+    keep their merged copy, and two overlapping appends of one collection
+    would both start from the same watermark; either duplicates rows.
+    Threads of this process share a lock per dataset; other processes are
+    kept out with ``flock`` on a lock file (not available on Windows, where
+    only threads are serialized).
+    """
+    with _dataset_locks_guard:
+        lock = _dataset_locks.setdefault(str(root.resolve()), threading.Lock())
+
+    with lock, open(root / LOCK_FILE, 'a') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def compact_dataset(root: str, min_files: int = 8, target_file_mb: int = 128) -> Dict[str, int]:
+    """
+    Merge small files in each partition of a dataset.
+
+    Files smaller than ``target_file_mb`` are merged, oldest first, into new
+    files of up to that size, row group by row group, so memory use is
+    bounded by a row group. A partition is only compacted once it holds at
+    least ``min_files`` small files. Merged files are written under a
+    temporary name and renamed before the originals are removed, so a
+    concurrent reader may briefly see rows twice but never loses any.
+    Compactions and appends of the same dataset wait for each other, and
+    the files are listed only once the dataset lock is held.
+
+    Args:
+        root: Dataset directory (see dataset_path)
+        min_files: Minimum number of small files before a partition is compacted
+        target_file_mb: Size of the merged files
+
+    Returns:
+        Dictionary with the number of partitions compacted, files merged and files written
+    """
+    stats = {'partitions': 0, 'files_merged': 0, 'files_written': 0}
+    target_bytes = target_file_mb * MB
+    root_path = Path(root)
+    if not root_path.exists():
+        return stats
+
+    with _dataset_lock(root_path):
+        _compact_partitions(root_path, min_files, target_bytes, stats)
+
+    if stats['files_merged']:
+        logger.info(
+            f"Compacted dataset {root}: merged {stats['files_merged']} files into "
+            f"{stats['files_written']} in {stats['partitions']} partitions"
+        )
+    return stats
+
+
+def _compact_partitions(root_path: Path, min_files: int, target_bytes: int, stats: Dict[str, int]) -> None:
+    """Merge the small files of every partition (caller holds the dataset lock)."""
+    import pyarrow.parquet as pq
+
+    for directory, files in _partition_files(root_path).items():
+        small = [path for path in files if path.stat().st_size < target_bytes]
+        if len(small) < max(2, min_files):
+            continue
+
+        # Group the small files into merged outputs of about target size
+        groups: List[List[Path]] = [[]]
+        group_bytes = 0
+        for path in small:
+            size = path.stat().st_size
+            if groups[-1] and group_bytes + size > target_bytes:
+                groups.append([])
+                group_bytes = 0
+            groups[-1].append(path)
+            group_bytes += size
+
+        for group in groups:
+            if len(group) < 2:
+                continue
+
+            schema = pq.read_schema(group[0])
+            name = f"part-compacted-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp_path = directory / f".{name}.tmp"
+            try:
+                with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+                    for path in group:
+                        parquet_file = pq.ParquetFile(path)
+                        for index in range(parquet_file.num_row_groups):
+                            writer.write_table(parquet_file.read_row_group(index).cast(schema))
+                os.replace(tmp_path, directory / name)
+            except Exception as e:
+                logger.warning(f"Could not compact {directory}: {e}")
+                tmp_path.unlink(missing_ok=True)
+                continue
+
+            for path in group:
+                path.unlink(missing_ok=True)
+            stats['files_merged'] += len(group)
+            stats['files_written'] += 1
+
+        stats['partitions'] += 1
+
+
+def compact_datasets(root: str, min_files: int = 8, target_file_mb: int = 128) -> Dict[str, int]:
+    """
+    Compact every dataset under a root directory.
+
+    Args:
+        root: Root directory of all datasets
+        min_files: Minimum number of small files before a partition is compacted
+        target_file_mb: Size of the merged files
+
+    Returns:
+        Combined compaction statistics
+    """
+    totals = {'partitions': 0, 'files_merged': 0, 'files_written': 0}
+    for kind in (DOCUMENTS, PAGES):
+        for layout in (LAYOUT_RESULTS, LAYOUT_CHUNKS):
+            stats = compact_dataset(str(dataset_path(root, kind, layout)), min_files, target_file_mb)
+            for key in totals:
+                totals[key] += stats[key]
+    return totals
@@ -0,0 +1,220 @@
+"""
+Streaming Exports for Kontext.
+
+Results are exported batch by batch: a batch of results is read (typically
+from the results store), turned into rows and written out before the next
+batch is read, so memory use is bounded by the batch size rather than by the
+size of the export. Columnar formats are written with pyarrow writers that
+append one row group / record batch per batch.
+
+Two layouts are available:
+
+- ``results``: one row per document or crawled page, with its full text.
+  Nested fields (chunks, tables, links, ...) become JSON strings in the
+  columnar and CSV formats and stay nested in JSONL/JSON.
+- ``chunks``: one row per chunk (result id, chunk id, offsets, token counts,
+  heading path, text), ready to embed or feed to an LLM. A crawled page is
+  exported as a single chunk spanning its text.
+
+Rows of both layouts are built by storage.rows.
+
+Formats: Parquet, Arrow IPC, JSONL, CSV and JSON, plus SQLite databases with
+normalized tables and a full-text index (see storage.database), which hold
+both layouts at once.
+
+Exports are written under a temporary name and moved into place when
+complete. When the progress placeholder is a job handle, the export stops
+between batches once the job is cancelled and its partial output is removed.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from .results_store import DOCUMENTS
+from .rows import (
+    EXPORT_LAYOUTS, LAYOUT_CHUNKS, LAYOUT_RESULTS, arrow_schema, chunk_rows, iter_result_batches, layout_columns,
+    result_rows, to_json
+)
+
+# Export formats and their file extensions
+EXPORT_FORMATS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+    'jsonl': 'jsonl',
+    'csv': 'csv',
+    'json': 'json',
+    'sqlite': 'db'
+}
+
+# Formats whose rows keep nested values instead of JSON strings
+_NESTED_FORMATS = ('jsonl', 'json')
+
+class ExportCancelled(Exception):
+    """Raised between batches when the job running an export has been cancelled."""
+
+
+def check_cancelled(progress_placeholder: Optional[Any]) -> None:
+    """
+    Stop an export if the job handle passed as its progress placeholder was cancelled.
+
+    Raises:
+        ExportCancelled: If cancellation has been requested
+    """
+    # Looked up on the type: Streamlit placeholders reject unknown attributes
+    if getattr(type(progress_placeholder), 'cancelled', None) is not None and progress_placeholder.cancelled:
+        raise ExportCancelled("Export cancelled")
+
+
+class _ArrowWriter:
+    """Writes row batches to Parquet, Arrow IPC or CSV through pyarrow."""
+
+    def __init__(self, output_path: str, format: str, columns: List[Tuple[str, str]]):
+        import pyarrow as pa
+
+        self._pa = pa
+        self._list_columns = [name for name, column_type in columns if column_type.startswith('list')]
+        # CSV has no list type: list columns are joined into strings
+        self._join_lists = format == 'csv'
+        self.schema = arrow_schema(columns, list_as_string=self._join_lists)
+
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(output_path, self.schema, compression='zstd')
+        elif format == 'arrow':
+            import pyarrow.ipc as ipc
+            self._writer = ipc.new_file(output_path, self.schema)
+        else:
+            import pyarrow.csv as pa_csv
+            self._writer = pa_csv.CSVWriter(output_path, self.schema)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self._join_lists:
+            for row in rows:
+                for name in self._list_columns:
+                    row[name] = ' > '.join(row[name]) if row[name] else None
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class _JsonWriter:
+    """Writes row batches as JSON Lines, or as one JSON array."""
+
+    def __init__(self, output_path: str, format: str):
+        self._file = open(output_path, 'w', encoding='utf-8')
+        self._array = format == 'json'
+        self._rows_written = 0
+        if self._array:
+            self._file.write('[')
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            line = to_json(row)
+            if self._array:
+                line = (',\n' if self._rows_written else '\n') + line
+            else:
+                line += '\n'
+            self._file.write(line)
+            self._rows_written += 1
+
+    def close(self) -> None:
+        if self._array:
+            self._file.write('\n]\n' if self._rows_written else ']\n')
+        self._file.close()
+
+
+def export_results(
+    results: Iterable[Dict[str, Any]],
+    output_path: str,
+    format: str = 'parquet',
+    layout: str = LAYOUT_RESULTS,
+    kind: Optional[str] = None,
+    batch_size: int = 64,
+    progress_placeholder: Optional[Any] = None
+) -> int:
+    """
+    Stream results into an export file.
+
+    Args:
+        results: ResultSet or any iterable of results
+        output_path: Output file path
+        format: Export format (see EXPORT_FORMATS)
+        layout: LAYOUT_RESULTS or LAYOUT_CHUNKS
+        kind: DOCUMENTS or PAGES (taken from a ResultSet if None)
+        batch_size: Number of results read and written at a time
+        progress_placeholder: Streamlit placeholder or job handle for progress updates
+
+    Returns:
+        Number of rows written (chunk rows for SQLite)
+
+    Raises:
+        ExportCancelled: If the job passed as progress_placeholder is cancelled
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+    if layout not in EXPORT_LAYOUTS:
+        raise ValueError(f"Unsupported export layout: {layout}")
+    kind = kind or getattr(results, 'kind', DOCUMENTS)
+
+    if format == 'sqlite':
+        from .database import export_to_sqlite
+        return export_to_sqlite(results, output_path, kind, batch_size, progress_placeholder)
+
+    nested = format in _NESTED_FORMATS
+    build_rows: Callable[[Dict[str, Any], str, bool], List[Dict[str, Any]]] = (
+        chunk_rows if layout == LAYOUT_CHUNKS else result_rows
+    )
+    tmp_path = f"{output_path}.tmp"
+    writer = (
+        _JsonWriter(tmp_path, format) if nested
+        else _ArrowWriter(tmp_path, format, layout_columns(layout, kind))
+    )
+
+    total = len(results) if hasattr(results, '__len__') else None
+    results_done = 0
+    rows_written = 0
+    started = datetime.now()
+    try:
+        for batch in iter_result_batches(results, batch_size):
+            check_cancelled(progress_placeholder)
+            rows = [row for result in batch for row in build_rows(result, kind, nested)]
+            if rows:
+                writer.write(rows)
+            rows_written += len(rows)
+            results_done += len(batch)
+            if progress_placeholder and total:
+                progress_placeholder.progress(min(1.0, results_done / total))
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, output_path)
+
+    elapsed = (datetime.now() - started).total_seconds()
+    logger.info(
+        f"Exported {results_done} results as {rows_written} {layout} rows to {output_path} "
+        f"({format}, {elapsed:.1f}s)"
+    )
+    return rows_written
+
+
+def default_export_path(prefix: str, format: str, layout: str = LAYOUT_RESULTS) -> str:
+    """
+    Build a timestamped export file name.
+
+    Args:
+        prefix: File name prefix, e.g. 'kontext_processing_results'
+        format: Export format
+        layout: Export layout (chunk exports get a '_chunks' suffix)
+
+    Returns:
+        File name
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = '_chunks' if layout == LAYOUT_CHUNKS and format != 'sqlite' else ''
+    return f"{prefix}{suffix}_{timestamp}.{EXPORT_FORMATS[format]}"
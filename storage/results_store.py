@@ -0,0 +1,623 @@
+"""
+Results Store for Kontext.
+
+Processing and crawling results are written to an embedded SQLite database
+instead of being kept as dictionaries in Streamlit session state. Each result
+is one row: summary columns (name, status, counts, ...) that listings and
+filters read without touching the content, plus the full result as a
+compressed JSON payload that is only decoded when a result is opened or
+exported. Chunks are stored as their offset arrays and rebuilt over the
+extracted text on read.
+
+Results are grouped into collections (one per browser session) and kinds
+(documents or crawled pages). Sessions hold ``ResultSet`` handles; reads are
+paginated or streamed in batches, so memory use does not grow with the
+number of stored results.
+"""
+
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .search_index import SearchIndex
+
+# Result kinds
+DOCUMENTS = 'document'
+PAGES = 'page'
+
+# Bump when the table layout or payload encoding changes
+STORE_SCHEMA_VERSION = 1
+
+# Summary columns, in table order. Listings read only these.
+SUMMARY_COLUMNS = (
+    'result_id', 'kind', 'job_id', 'name', 'title', 'status', 'file_type', 'status_code',
+    'word_count', 'char_count', 'token_count', 'chunk_count', 'tokenizer', 'options',
+    'error', 'created_at'
+)
+
+# Payload key holding a TextChunks' offsets (the text is the result's extracted_text)
+_CHUNK_OFFSETS = '__chunk_offsets__'
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    job_id TEXT,
+    name TEXT,
+    title TEXT,
+    status TEXT,
+    file_type TEXT,
+    status_code INTEGER,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    char_count INTEGER NOT NULL DEFAULT 0,
+    token_count INTEGER,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    tokenizer TEXT,
+    options TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_collection ON results (collection, kind, result_id);
+PRAGMA user_version = {STORE_SCHEMA_VERSION};
+"""
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy arrays and scalars; fall back to str for anything else."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def encode_result(result: Dict[str, Any]) -> bytes:
+    """
+    Encode a result as a compressed JSON payload.
+
+    Args:
+        result: Processing or crawl result
+
+    Returns:
+        zlib-compressed JSON
+    """
+    from processing.chunking import TextChunks
+
+    data = {key: value for key, value in result.items() if key not in ('result_id', 'job_id')}
+    chunks = data.get('chunks')
+    if isinstance(chunks, TextChunks):
+        data['chunks'] = None
+        data[_CHUNK_OFFSETS] = chunks.to_offsets()
+        if chunks.text != data.get('extracted_text'):
+            data[_CHUNK_OFFSETS]['text'] = chunks.text
+    return zlib.compress(json.dumps(data, default=_json_default).encode('utf-8'))
+
+
+def decode_result(payload: bytes, result_id: Optional[int] = None, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decode a payload written by encode_result.
+
+    Args:
+        payload: Compressed JSON
+        result_id: Store id to record in the result
+        job_id: Job that produced the result, recorded if known
+
+    Returns:
+        Result dictionary with chunks rebuilt as TextChunks
+    """
+    result = json.loads(zlib.decompress(payload))
+    offsets = result.pop(_CHUNK_OFFSETS, None)
+    if offsets is not None:
+        from processing.chunking import TextChunks
+
+        text = offsets.pop('text', None)
+        result['chunks'] = TextChunks.from_offsets(
+            text if text is not None else result.get('extracted_text', ''), offsets
+        )
+    if result_id is not None:
+        result['result_id'] = result_id
+    if job_id is not None:
+        result['job_id'] = job_id
+    return result
+
+
+def _summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the summary columns of a result."""
+    chunks = result.get('chunks')
+    options = result.get('processing_options')
+    return {
+        'name': result.get('filename') or result.get('url'),
+        'title': result.get('title'),
+        'status': result.get('status') or ('error' if result.get('error') else 'success'),
+        'file_type': result.get('file_type'),
+        'status_code': result.get('status_code'),
+        'word_count': int(result.get('word_count') or 0),
+        'char_count': int(result.get('char_count') or 0),
+        'token_count': result.get('token_count'),
+        'chunk_count': len(chunks) if chunks is not None else 0,
+        'tokenizer': result.get('tokenizer'),
+        'options': json.dumps(options, default=_json_default) if options is not None else None,
+        'error': result.get('error'),
+        'created_at': result.get('processed_at') or result.get('crawled_at') or datetime.now().isoformat()
+    }
+
+
+class ResultsStore:
+    """
+    SQLite-backed store of processing and crawl results.
+
+    One connection is shared by all threads and guarded by a lock; every
+    write is a single short transaction, so jobs can append while sessions
+    read. The database runs in WAL mode so readers never see partial writes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: Database file path
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.execute('PRAGMA synchronous = NORMAL')
+
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, STORE_SCHEMA_VERSION):
+            logger.warning(f"Results store {self.path} has schema {version}, recreating it")
+            self._conn.execute('DROP TABLE IF EXISTS results')
+        self._conn.executescript(_SCHEMA)
+
+        # Change counter per (collection, kind), for caching derived views
+        self._versions: Dict[Tuple[str, str], int] = {}
+        # Search indexes of the collections searched in this process, kept current on writes
+        self._indexes: Dict[str, 'SearchIndex'] = {}
+
+        logger.info(f"Results store opened at {self.path}")
+
+    def _bump(self, collection: str, kind: str) -> None:
+        key = (collection, kind)
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def version(self, collection: str, kind: str) -> int:
+        """
+        Get the change counter of a result set.
+
+        The counter increases on every write, so it can key caches of views
+        derived from the results.
+
+        Args:
+            collection: Collection name
+            kind: Result kind
+
+        Returns:
+            Change counter (0 until the first write in this process)
+        """
+        with self._lock:
+            return self._versions.get((collection, kind), 0)
+
+    def append(
+        self,
+        collection: str,
+        kind: str,
+        results: Iterable[Dict[str, Any]],
+        job_id: Optional[str] = None
+    ) -> List[int]:
+        """
+        Append results in one transaction.
+
+        Args:
+            collection: Collection name
+            kind: Result kind (DOCUMENTS or PAGES)
+            results: Results to store
+            job_id: Job that produced the results
+
+        Returns:
+            Store ids of the new results
+        """
+        # Encode outside the lock; compression is the expensive part
+        results = list(results)
+        rows = [(_summarize(result), encode_result(result)) for result in results]
+        if not rows:
+            return []
+
+        ids = []
+        with self._lock, self._conn:
+            for summary, payload in rows:
+                cursor = self._conn.execute(
+                    f"INSERT INTO results (collection, kind, job_id, {', '.join(summary)}, payload) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(summary))}, ?)",
+                    (collection, kind, job_id, *summary.values(), payload)
+                )
+                ids.append(cursor.lastrowid)
+            self._bump(collection, kind)
+            index = self._indexes.get(collection)
+
+        if index is not None:
+            index.add(kind, ({**result, 'result_id': result_id} for result, result_id in zip(results, ids)))
+        return ids
+
+    def update(self, collection: str, kind: str, results: Sequence[Dict[str, Any]]) -> None:
+        """
+        Replace stored results in one transaction.
+
+        Args:
+            collection: Collection name
+            kind: Result kind
+            results: Results read from the store (identified by 'result_id')
+        """
+        rows = [(_summarize(result), encode_result(result), result['result_id']) for result in results]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            for summary, payload, result_id in rows:
+                self._conn.execute(
+                    f"UPDATE results SET {', '.join(f'{column} = ?' for column in summary)}, payload = ? "
+                    f"WHERE result_id = ? AND collection = ? AND kind = ?",
+                    (*summary.values(), payload, result_id, collection, kind)
+                )
+            self._bump(collection, kind)
+            index = self._indexes.get(collection)
+
+        if index is not None:
+            index.add(kind, results)
+
+    def count(self, collection: str, kind: str) -> int:
+        """Number of results in a result set."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM results WHERE collection = ? AND kind = ?', (collection, kind)
+            ).fetchone()[0]
+
+    def totals(self, collection: str, kind: str) -> Dict[str, int]:
+        """
+        Aggregate counts of a result set.
+
+        Returns:
+            Dictionary with results, errors, words, chars and chunks
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status != 'success'), 0), COALESCE(SUM(word_count), 0), "
+                "COALESCE(SUM(char_count), 0), COALESCE(SUM(chunk_count), 0) "
+                "FROM results WHERE collection = ? AND kind = ?",
+                (collection, kind)
+            ).fetchone()
+        return dict(zip(('results', 'errors', 'words', 'chars', 'chunks'), row))
+
+    # Successful results whose stored chunk settings differ from the given ones
+    _STALE_CHUNKS_WHERE = (
+        "collection = ? AND kind = ? AND status = 'success' AND ("
+        "json_extract(options, '$.chunk_size') IS NOT ? "
+        "OR COALESCE(json_extract(options, '$.chunk_overlap'), 0) IS NOT ? "
+        "OR COALESCE(json_extract(options, '$.chunking_strategy'), 'window') IS NOT ? "
+        "OR tokenizer IS NOT ?)"
+    )
+
+    def count_stale_chunks(
+        self,
+        collection: str,
+        kind: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunking_strategy: str,
+        tokenizer: str
+    ) -> int:
+        """
+        Count successful results chunked with other settings, without decoding any row.
+
+        Args:
+            collection: Collection name
+            kind: Result kind
+            chunk_size: Current chunk size
+            chunk_overlap: Current chunk overlap
+            chunking_strategy: Current chunking strategy
+            tokenizer: Name of the current tokenizer
+
+        Returns:
+            Number of results that need re-chunking
+        """
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM results WHERE {self._STALE_CHUNKS_WHERE}",
+                (collection, kind, chunk_size, chunk_overlap, chunking_strategy, tokenizer)
+            ).fetchone()[0]
+
+    def stale_chunk_ids(
+        self,
+        collection: str,
+        kind: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunking_strategy: str,
+        tokenizer: str
+    ) -> List[int]:
+        """Ids of the results counted by count_stale_chunks, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT result_id FROM results WHERE {self._STALE_CHUNKS_WHERE} ORDER BY result_id",
+                (collection, kind, chunk_size, chunk_overlap, chunking_strategy, tokenizer)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def page(
+        self,
+        collection: str,
+        kind: str,
+        offset: int = 0,
+        limit: int = 50,
+        columns: Sequence[str] = SUMMARY_COLUMNS
+    ) -> List[Dict[str, Any]]:
+        """
+        Read one page of summary rows, oldest first.
+
+        Args:
+            collection: Collection name
+            kind: Result kind
+            offset: Number of rows to skip
+            limit: Maximum number of rows
+            columns: Summary columns to read
+
+        Returns:
+            List of summary dictionaries
+        """
+        columns = [column for column in columns if column in SUMMARY_COLUMNS]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM results WHERE collection = ? AND kind = ? "
+                f"ORDER BY result_id LIMIT ? OFFSET ?",
+                (collection, kind, limit, offset)
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def get(self, collection: str, kind: str, result_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Read one full result.
+
+        Returns:
+            Decoded result, or None if it does not exist
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload, job_id FROM results WHERE result_id = ? AND collection = ? AND kind = ?',
+                (result_id, collection, kind)
+            ).fetchone()
+        return decode_result(row[0], result_id, row[1]) if row else None
+
+    def iter_results(
+        self,
+        collection: str,
+        kind: str,
+        result_ids: Optional[Sequence[int]] = None,
+        batch_size: int = 64,
+        after_id: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream full results in batches, oldest first.
+
+        Batches are read by result id (keyset pagination), so the lock is only
+        held while a batch is fetched and results appended meanwhile are
+        picked up by later batches.
+
+        Args:
+            collection: Collection name
+            kind: Result kind
+            result_ids: Only read these results (all if None)
+            batch_size: Number of results per batch
+            after_id: Only read results with a larger id (ignored with result_ids)
+
+        Yields:
+            Lists of decoded results
+        """
+        if result_ids is not None:
+            ordered = sorted(result_ids)
+            for start in range(0, len(ordered), batch_size):
+                batch = ordered[start:start + batch_size]
+                with self._lock:
+                    rows = self._conn.execute(
+                        f"SELECT result_id, job_id, payload FROM results WHERE collection = ? AND kind = ? "
+                        f"AND result_id IN ({', '.join('?' * len(batch))}) ORDER BY result_id",
+                        (collection, kind, *batch)
+                    ).fetchall()
+                yield [decode_result(payload, result_id, job_id) for result_id, job_id, payload in rows]
+            return
+
+        last_id = after_id
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT result_id, job_id, payload FROM results WHERE collection = ? AND kind = ? '
+                    'AND result_id > ? ORDER BY result_id LIMIT ?',
+                    (collection, kind, last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [decode_result(payload, result_id, job_id) for result_id, job_id, payload in rows]
+
+    def clear(self, collection: str, kind: Optional[str] = None) -> int:
+        """
+        Delete the results of a collection.
+
+        Args:
+            collection: Collection name
+            kind: Only delete results of this kind (all if None)
+
+        Returns:
+            Number of deleted results
+        """
+        kinds = [kind] if kind else [DOCUMENTS, PAGES]
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                f"DELETE FROM results WHERE collection = ? AND kind IN ({', '.join('?' * len(kinds))})",
+                (collection, *kinds)
+            ).rowcount
+            for current in kinds:
+                self._bump(collection, current)
+            index = self._indexes.get(collection)
+
+        if index is not None:
+            for current in kinds:
+                index.remove(current)
+        logger.info(f"Deleted {deleted} results from collection {collection}")
+        return deleted
+
+    def search_index(self, collection: str) -> 'SearchIndex':
+        """
+        Get the search index of a collection, building it on first use.
+
+        Once built, the index is updated by every append, update and clear,
+        so results streamed in by running jobs become searchable at once.
+
+        Args:
+            collection: Collection name
+
+        Returns:
+            Search index over the chunks of all result kinds
+        """
+        from .search_index import SearchIndex
+
+        with self._lock:
+            index = self._indexes.get(collection)
+            if index is not None:
+                return index
+            # Register before reading, so writes from now on reach the index;
+            # results they add are skipped when the backfill gets to them
+            index = self._indexes[collection] = SearchIndex()
+
+        started = datetime.now()
+        for kind in (DOCUMENTS, PAGES):
+            for batch in self.iter_results(collection, kind):
+                index.add(kind, batch, replace=False)
+        logger.info(
+            f"Built search index for collection {collection}: {len(index)} chunks "
+            f"in {(datetime.now() - started).total_seconds():.1f}s"
+        )
+        return index
+
+    def search(
+        self,
+        collection: str,
+        query: str,
+        limit: int = 20,
+        kinds: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank the chunks of a collection against a query (see SearchIndex.search).
+
+        Args:
+            collection: Collection name
+            query: Free-text query
+            limit: Maximum number of hits
+            kinds: Only return hits of these kinds (all if None)
+
+        Returns:
+            Hits, best first
+        """
+        return self.search_index(collection).search(query, limit, kinds)
+
+    def result_set(self, collection: str, kind: str) -> 'ResultSet':
+        """Get a handle on the results of one kind in a collection."""
+        return ResultSet(self, collection, kind)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResultSet:
+    """
+    Handle on the results of one kind in one collection.
+
+    Cheap to create and to keep in session state: it holds no results, only
+    the store and the set's identity. ``len()`` and truthiness query the store.
+    """
+
+    def __init__(self, store: ResultsStore, collection: str, kind: str):
+        self.store = store
+        self.collection = collection
+        self.kind = kind
+
+    def __len__(self) -> int:
+        return self.store.count(self.collection, self.kind)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream full results, oldest first."""
+        for batch in self.iter_batches():
+            yield from batch
+
+    def __repr__(self) -> str:
+        return f"ResultSet({self.collection!r}, {self.kind!r})"
+
+    @property
+    def version(self) -> int:
+        """Change counter of the set (see ResultsStore.version)."""
+        return self.store.version(self.collection, self.kind)
+
+    def extend(self, results: Iterable[Dict[str, Any]], job_id: Optional[str] = None) -> List[int]:
+        """Append results (see ResultsStore.append)."""
+        return self.store.append(self.collection, self.kind, results, job_id)
+
+    def update(self, results: Sequence[Dict[str, Any]]) -> None:
+        """Replace stored results (see ResultsStore.update)."""
+        self.store.update(self.collection, self.kind, results)
+
+    def totals(self) -> Dict[str, int]:
+        """Aggregate counts (see ResultsStore.totals)."""
+        return self.store.totals(self.collection, self.kind)
+
+    def count_stale_chunks(self, chunk_size: int, chunk_overlap: int, chunking_strategy: str, tokenizer: str) -> int:
+        """Count results chunked with other settings (see ResultsStore.count_stale_chunks)."""
+        return self.store.count_stale_chunks(
+            self.collection, self.kind, chunk_size, chunk_overlap, chunking_strategy, tokenizer
+        )
+
+    def stale_chunk_ids(self, chunk_size: int, chunk_overlap: int, chunking_strategy: str, tokenizer: str) -> List[int]:
+        """Ids of results chunked with other settings (see ResultsStore.stale_chunk_ids)."""
+        return self.store.stale_chunk_ids(
+            self.collection, self.kind, chunk_size, chunk_overlap, chunking_strategy, tokenizer
+        )
+
+    def page(self, offset: int = 0, limit: int = 50, columns: Sequence[str] = SUMMARY_COLUMNS) -> List[Dict[str, Any]]:
+        """Read one page of summary rows (see ResultsStore.page)."""
+        return self.store.page(self.collection, self.kind, offset, limit, columns)
+
+    def summaries(self, columns: Sequence[str] = SUMMARY_COLUMNS, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream the summary rows of the whole set."""
+        offset = 0
+        while True:
+            rows = self.page(offset, batch_size, columns)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            offset += batch_size
+
+    def get(self, result_id: int) -> Optional[Dict[str, Any]]:
+        """Read one full result (see ResultsStore.get)."""
+        return self.store.get(self.collection, self.kind, result_id)
+
+    def iter_batches(
+        self,
+        result_ids: Optional[Sequence[int]] = None,
+        batch_size: int = 64,
+        after_id: int = 0
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream full results in batches (see ResultsStore.iter_results)."""
+        return self.store.iter_results(self.collection, self.kind, result_ids, batch_size, after_id)
+
+    def clear(self) -> int:
+        """Delete every result in the set."""
+        return self.store.clear(self.collection, self.kind)
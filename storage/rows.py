@@ -0,0 +1,138 @@
+"""
+Export Rows for Kontext.
+
+Turns stored results into the rows shared by every export target: the file
+exports (storage.exporters), SQLite databases (storage.database) and
+partitioned datasets (storage.dataset).
+
+Two layouts are available:
+
+- ``results``: one row per document or crawled page, with its full text.
+  Nested fields (chunks, tables, links, ...) are kept nested, or become JSON
+  strings for targets without nested types.
+- ``chunks``: one row per chunk (result id, chunk id, offsets, token counts,
+  heading path, text). A crawled page is a single chunk spanning its text.
+"""
+
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .results_store import DOCUMENTS, PAGES
+
+# Export layouts
+LAYOUT_RESULTS = 'results'
+LAYOUT_CHUNKS = 'chunks'
+EXPORT_LAYOUTS = (LAYOUT_RESULTS, LAYOUT_CHUNKS)
+
+# Scalar columns of the results layout per kind, then the nested fields
+# exported as their own (JSON) columns; everything else goes to 'metadata'
+RESULT_COLUMNS = {
+    DOCUMENTS: (
+        [('result_id', 'int64'), ('job_id', 'string'), ('filename', 'string'), ('file_type', 'string'), ('status', 'string'),
+         ('error', 'string'), ('word_count', 'int64'), ('char_count', 'int64'), ('token_count', 'int64'),
+         ('tokenizer', 'string'), ('processed_at', 'string'), ('extracted_text', 'string')],
+        ['chunks', 'tables', 'images', 'processing_options']
+    ),
+    PAGES: (
+        [('result_id', 'int64'), ('job_id', 'string'), ('url', 'string'), ('title', 'string'), ('meta_description', 'string'),
+         ('status_code', 'int64'), ('error', 'string'), ('depth', 'int64'), ('word_count', 'int64'),
+         ('char_count', 'int64'), ('crawled_at', 'string'), ('text_content', 'string')],
+        ['headings', 'links']
+    )
+}
+
+# Fields left out of the results layout (derivable or internal)
+_OMITTED_FIELDS = {'elements', 'html_content'}
+
+CHUNK_COLUMNS = [
+    ('result_id', 'int64'), ('source', 'string'), ('chunk_id', 'int64'),
+    ('start_char', 'int64'), ('end_char', 'int64'), ('start_token', 'int64'), ('end_token', 'int64'),
+    ('token_count', 'int64'), ('word_count', 'int64'), ('heading_path', 'list<string>'), ('text', 'string')
+]
+
+
+def to_json(value: Any) -> Optional[str]:
+    """Serialize a nested value as a JSON string (None stays None)."""
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, default=lambda v: v.tolist() if hasattr(v, 'tolist') else str(v))
+
+
+def result_rows(result: Dict[str, Any], kind: str, nested: bool) -> List[Dict[str, Any]]:
+    """Build the results-layout row of one result."""
+    scalar_columns, nested_columns = RESULT_COLUMNS[kind]
+    row = {name: result.get(name) for name, _ in scalar_columns}
+    if row['error'] is None and 'error' in result:
+        row['error'] = str(result['error'])
+
+    for name in nested_columns:
+        value = result.get(name)
+        if name == 'chunks' and value is not None:
+            value = [dict(chunk) for chunk in value]
+        row[name] = value if nested else to_json(value)
+
+    known = {name for name, _ in scalar_columns} | set(nested_columns) | _OMITTED_FIELDS
+    metadata = {key: value for key, value in result.items() if key not in known}
+    row['metadata'] = metadata if nested else to_json(metadata)
+    return [row]
+
+
+def chunk_rows(result: Dict[str, Any], kind: str, nested: bool) -> List[Dict[str, Any]]:
+    """Build the chunk-layout rows of one result."""
+    result_id = result.get('result_id')
+    if kind == PAGES:
+        text = result.get('text_content') or ''
+        if not text:
+            return []
+        word_count = result.get('word_count') or len(text.split())
+        return [{
+            'result_id': result_id, 'source': result.get('url'), 'chunk_id': 0,
+            'start_char': 0, 'end_char': len(text), 'start_token': None, 'end_token': None,
+            'token_count': None, 'word_count': word_count, 'heading_path': [], 'text': text
+        }]
+
+    source = result.get('filename')
+    return [
+        {
+            'result_id': result_id, 'source': source, 'chunk_id': chunk['chunk_id'],
+            'start_char': chunk['start_char'], 'end_char': chunk['end_char'],
+            'start_token': chunk.get('start_token'), 'end_token': chunk.get('end_token'),
+            'token_count': chunk.get('token_count'), 'word_count': chunk.get('word_count'),
+            'heading_path': list(chunk.get('heading_path') or []), 'text': chunk['text']
+        }
+        for chunk in (result.get('chunks') or [])
+    ]
+
+
+def arrow_schema(columns: List[Tuple[str, str]], list_as_string: bool = False) -> Any:
+    """Build a pyarrow schema from (name, type) pairs."""
+    import pyarrow as pa
+
+    types = {
+        'int64': pa.int64(),
+        'string': pa.large_string(),
+        'list<string>': pa.large_string() if list_as_string else pa.list_(pa.large_string())
+    }
+    return pa.schema([(name, types[column_type]) for name, column_type in columns])
+
+
+def layout_columns(layout: str, kind: str) -> List[Tuple[str, str]]:
+    """Columns written for a layout and result kind."""
+    if layout == LAYOUT_CHUNKS:
+        return CHUNK_COLUMNS
+    scalar_columns, nested_columns = RESULT_COLUMNS[kind]
+    return scalar_columns + [(name, 'string') for name in nested_columns] + [('metadata', 'string')]
+
+
+def iter_result_batches(results: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group results into batches, reusing the store's own batches when possible."""
+    if hasattr(results, 'iter_batches'):
+        yield from results.iter_batches(batch_size=batch_size)
+        return
+    iterator = iter(results)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
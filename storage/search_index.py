@@ -0,0 +1,468 @@
+"""
+Full-Text Search Index for Kontext.
+
+An in-memory BM25 index over the chunks of processed documents and the text
+of crawled pages, kept up to date while jobs append results to the store.
+
+Every chunk is a search document with an internal id, assigned in the order
+chunks are added. New chunks are collected in flat, append-only arrays of
+(term id, document id, term frequency) triples; once enough have been
+collected they are frozen into an immutable segment. Segments keep the
+postings of each term as document id gaps, variable-byte encoded into one
+shared byte array, plus a parallel array of (capped) term frequencies, so a
+posting costs two to three bytes. Freezing, decoding and merging are
+vectorized with numpy. Segments of similar size are merged as they
+accumulate, up to MAX_SEGMENT_DOCS chunks, so a million chunks end up in
+about ten segments.
+
+Queries are ranked with BM25 over the union of the query terms: each term's
+postings are decoded, scored in one vectorized pass and summed per
+document. Updated results are re-added under new document ids; their old
+chunks are masked out and their postings dropped when segments merge.
+"""
+
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .results_store import DOCUMENTS, PAGES
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Chunks collected before they are frozen into a segment
+FLUSH_DOCS = 8192
+
+# Segments are not merged beyond this many chunks, which bounds merge time and memory
+MAX_SEGMENT_DOCS = 131072
+
+_KINDS = (DOCUMENTS, PAGES)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _vbyte_encode(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Variable-byte encode non-negative integers (7 bits per byte, high bit = more).
+
+    Returns:
+        Encoded bytes and the byte length of each value
+    """
+    values = values.astype(np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28, 35):
+        lengths += values >= (1 << bits)
+
+    positions = np.zeros(len(values), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=positions[1:])
+    data = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(int(lengths.max()) if len(values) else 0):
+        mask = lengths > byte
+        chunk = (values[mask] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = (lengths[mask] > byte + 1).astype(np.uint64) << np.uint64(7)
+        data[positions[mask] + byte] = (chunk | more).astype(np.uint8)
+    return data, lengths
+
+
+def _vbyte_decode(data: np.ndarray) -> np.ndarray:
+    """Decode a run of variable-byte encoded integers."""
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    if data.max() < 0x80:
+        # Every value fits in one byte
+        return data.astype(np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+
+class _Segment:
+    """Immutable postings of a batch of chunks."""
+
+    __slots__ = (
+        'term_ids', 'first_docs', 'posting_starts', 'byte_starts', 'data', 'freqs',
+        'first_doc', 'doc_count', 'live_count'
+    )
+
+    def __init__(self, terms: np.ndarray, docs: np.ndarray, freqs: np.ndarray, first_doc: int, doc_count: int):
+        """
+        Freeze postings given as parallel arrays.
+
+        Args:
+            terms: Term id of each posting
+            docs: Document id of each posting (ascending per term)
+            freqs: Term frequency of each posting
+            first_doc: First document id covered by the segment
+            doc_count: Number of document ids covered by the segment
+        """
+        order = np.argsort(terms.astype(np.int32), kind='stable')
+        terms, docs, freqs = terms[order], docs[order], freqs[order]
+        del order
+        first_postings = np.flatnonzero(np.diff(terms, prepend=-1))
+        self.term_ids = terms[first_postings].astype(np.int32)
+
+        # Each term's first document id is kept apart, so the postings of
+        # frequent terms are runs of one-byte gaps
+        self.first_docs = docs[first_postings]
+        gaps = np.diff(docs, prepend=0)
+        gaps[first_postings] = 0
+        self.data, lengths = _vbyte_encode(gaps)
+
+        self.posting_starts = np.append(first_postings, len(docs)).astype(np.int64)
+        byte_positions = np.concatenate(([0], np.cumsum(lengths)))
+        self.byte_starts = byte_positions[self.posting_starts]
+        self.freqs = np.minimum(freqs, np.iinfo(np.uint8).max).astype(np.uint8)
+        self.first_doc = first_doc
+        self.doc_count = doc_count
+        # Live documents when the segment was written (set by merge)
+        self.live_count = doc_count
+
+    @property
+    def posting_count(self) -> int:
+        return len(self.freqs)
+
+    def postings(self, term_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Document ids and frequencies of a term, or None if absent."""
+        index = np.searchsorted(self.term_ids, term_id)
+        if index == len(self.term_ids) or self.term_ids[index] != term_id:
+            return None
+        docs = np.cumsum(_vbyte_decode(self.data[self.byte_starts[index]:self.byte_starts[index + 1]]))
+        docs += self.first_docs[index]
+        return docs, self.freqs[self.posting_starts[index]:self.posting_starts[index + 1]]
+
+    def explode(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Decode every posting back into (terms, docs, freqs) arrays."""
+        counts = np.diff(self.posting_starts)
+        values = _vbyte_decode(self.data)
+        totals = np.cumsum(values)
+        # Restart the running sum at the first posting of every term
+        offsets = self.first_docs - totals[self.posting_starts[:-1]]
+        docs = totals + np.repeat(offsets, counts)
+        return np.repeat(self.term_ids, counts), docs, self.freqs
+
+    @classmethod
+    def merge(cls, segments: Sequence['_Segment'], live: np.ndarray) -> '_Segment':
+        """
+        Merge segments covering consecutive document id ranges.
+
+        Args:
+            segments: Segments, oldest first (a single segment is rewritten)
+            live: Liveness of every document id; postings of removed documents are dropped
+        """
+        terms, docs, freqs = (np.concatenate(part) for part in zip(*(segment.explode() for segment in segments)))
+        keep = live[docs]
+        first_doc, doc_count = segments[0].first_doc, sum(segment.doc_count for segment in segments)
+        merged = cls(terms[keep], docs[keep], freqs[keep], first_doc, doc_count)
+        merged.live_count = int(live[first_doc:first_doc + doc_count].sum())
+        return merged
+
+
+class SearchIndex:
+    """
+    Incremental BM25 index over the results of one collection.
+
+    Thread-safe: jobs add results from worker threads while sessions query.
+    """
+
+    def __init__(self, flush_docs: int = FLUSH_DOCS):
+        """
+        Initialize an empty index.
+
+        Args:
+            flush_docs: Chunks collected before they are frozen into a segment
+        """
+        self.flush_docs = flush_docs
+        self._lock = threading.RLock()
+
+        self._vocabulary: Dict[str, int] = {}
+        self._segments: List[_Segment] = []
+
+        # Postings not yet frozen, as flat parallel arrays
+        self._pending_terms = array('I')
+        self._pending_docs = array('I')
+        self._pending_freqs = array('I')
+        self._pending_doc_count = 0
+
+        # Per document: length in tokens, liveness and location of the chunk
+        self._doc_lengths = array('I')
+        self._doc_live = bytearray()
+        self._doc_kinds = bytearray()
+        self._doc_results = array('q')
+        self._doc_chunks = array('I')
+        self._doc_starts = array('q')
+        self._doc_ends = array('q')
+
+        # (kind, result_id) -> (first document id, number of chunks)
+        self._result_docs: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._live_docs = 0
+        self._live_length = 0
+
+        # BM25 length normalization per document, reused until documents change
+        self._norms: Optional[np.ndarray] = None
+        self._norms_key: Optional[Tuple[int, int, int]] = None
+
+    def __len__(self) -> int:
+        """Number of searchable chunks."""
+        return self._live_docs
+
+    def _result_chunks(self, result: Dict[str, Any], kind: str) -> List[Tuple[int, int, int, str]]:
+        """(chunk id, start char, end char, text) of the searchable chunks of a result."""
+        if kind == PAGES:
+            text = result.get('text_content') or ''
+            return [(0, 0, len(text), text)] if text else []
+
+        text = result.get('extracted_text') or ''
+        chunks = result.get('chunks')
+        if chunks is None:
+            return [(0, 0, len(text), text)] if text else []
+        if hasattr(chunks, 'start_chars'):
+            # TextChunks: slice the source text without materializing chunk dictionaries
+            return [
+                (index, int(start), int(end), chunks.text[start:end])
+                for index, (start, end) in enumerate(zip(chunks.start_chars, chunks.end_chars))
+            ]
+        return [
+            (chunk.get('chunk_id', index), chunk.get('start_char', 0), chunk.get('end_char', 0), chunk.get('text') or '')
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def add(self, kind: str, results: Iterable[Dict[str, Any]], replace: bool = True) -> int:
+        """
+        Index the chunks of stored results.
+
+        Args:
+            kind: DOCUMENTS or PAGES
+            results: Results with their store 'result_id'
+            replace: Re-index results that are already indexed (otherwise skip them)
+
+        Returns:
+            Number of chunks added
+        """
+        added = 0
+        kind_code = _KINDS.index(kind)
+        for result in results:
+            result_id = result.get('result_id')
+            if result_id is None:
+                continue
+            # Tokenize and count outside the lock; it is the expensive part
+            chunks = []
+            for chunk_id, start, end, text in self._result_chunks(result, kind):
+                tokens = tokenize(text)
+                chunks.append((chunk_id, start, end, len(tokens), Counter(tokens)))
+
+            with self._lock:
+                key = (kind, result_id)
+                if key in self._result_docs:
+                    if not replace:
+                        continue
+                    self._remove_locked(key)
+
+                first_doc = len(self._doc_lengths)
+                vocabulary = self._vocabulary
+                for chunk_id, start, end, length, counts in chunks:
+                    doc = len(self._doc_lengths)
+                    self._pending_terms.extend([vocabulary.setdefault(term, len(vocabulary)) for term in counts])
+                    self._pending_docs.extend([doc] * len(counts))
+                    self._pending_freqs.extend(counts.values())
+                    self._pending_doc_count += 1
+
+                    self._doc_lengths.append(length)
+                    self._doc_live.append(1)
+                    self._doc_kinds.append(kind_code)
+                    self._doc_results.append(result_id)
+                    self._doc_chunks.append(chunk_id)
+                    self._doc_starts.append(start)
+                    self._doc_ends.append(end)
+                    self._live_docs += 1
+                    self._live_length += length
+
+                self._result_docs[key] = (first_doc, len(chunks))
+                added += len(chunks)
+
+                if self._pending_doc_count >= self.flush_docs:
+                    self._flush_locked()
+        return added
+
+    def _remove_locked(self, key: Tuple[str, int]) -> None:
+        first_doc, count = self._result_docs.pop(key)
+        for doc in range(first_doc, first_doc + count):
+            if self._doc_live[doc]:
+                self._doc_live[doc] = 0
+                self._live_docs -= 1
+                self._live_length -= self._doc_lengths[doc]
+
+    def remove(self, kind: str, result_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Drop results from the index.
+
+        Args:
+            kind: DOCUMENTS or PAGES
+            result_ids: Results to drop (all results of the kind if None)
+        """
+        with self._lock:
+            keys = (
+                [key for key in self._result_docs if key[0] == kind] if result_ids is None
+                else [(kind, result_id) for result_id in result_ids if (kind, result_id) in self._result_docs]
+            )
+            for key in keys:
+                self._remove_locked(key)
+
+    def _flush_locked(self) -> None:
+        """Freeze pending postings into a segment and merge similar-sized segments."""
+        if not self._pending_doc_count:
+            return
+        first_doc = len(self._doc_lengths) - self._pending_doc_count
+        self._segments.append(_Segment(
+            np.frombuffer(self._pending_terms, dtype=np.uint32).astype(np.int32),
+            np.frombuffer(self._pending_docs, dtype=np.uint32).astype(np.int64),
+            np.frombuffer(self._pending_freqs, dtype=np.uint32).copy(),
+            first_doc, self._pending_doc_count
+        ))
+        self._pending_terms = array('I')
+        self._pending_docs = array('I')
+        self._pending_freqs = array('I')
+        self._pending_doc_count = 0
+
+        live = np.frombuffer(bytes(self._doc_live), dtype=np.uint8).astype(bool)
+
+        # Merge equal-sized neighbours (like a binary counter), so there are O(log n) segments
+        while (
+            len(self._segments) >= 2
+            and self._segments[-2].doc_count <= self._segments[-1].doc_count
+            and self._segments[-2].doc_count + self._segments[-1].doc_count <= MAX_SEGMENT_DOCS
+        ):
+            self._segments[-2:] = [_Segment.merge(self._segments[-2:], live)]
+
+        # Full segments are not merged again; rewrite those where most chunks were removed since
+        for position, segment in enumerate(self._segments[:-1]):
+            live_docs = int(live[segment.first_doc:segment.first_doc + segment.doc_count].sum())
+            if live_docs < segment.live_count // 2:
+                self._segments[position] = _Segment.merge([segment], live)
+
+        logger.debug(
+            f"Search index: {len(self._segments)} segments, "
+            f"{sum(segment.posting_count for segment in self._segments)} postings"
+        )
+
+    def _term_postings(self, term_id: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Postings of a term in every segment and in the pending arrays."""
+        postings = [found for found in (segment.postings(term_id) for segment in self._segments) if found]
+        if self._pending_doc_count:
+            pending_terms = np.frombuffer(self._pending_terms, dtype=np.uint32)
+            mask = pending_terms == term_id
+            if mask.any():
+                postings.append((
+                    np.frombuffer(self._pending_docs, dtype=np.uint32)[mask].astype(np.int64),
+                    np.frombuffer(self._pending_freqs, dtype=np.uint32)[mask]
+                ))
+        return postings
+
+    def _length_norms_locked(self) -> np.ndarray:
+        """BM25 length normalization k1 * (1 - b + b * length / average length) per document."""
+        key = (len(self._doc_lengths), self._live_docs, self._live_length)
+        if self._norms_key != key:
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+            average_length = self._live_length / self._live_docs
+            self._norms = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / np.float32(average_length))
+            self._norms_key = key
+        return self._norms
+
+    def search(self, query: str, limit: int = 20, kinds: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Free-text query; chunks matching any term are ranked
+            limit: Maximum number of hits
+            kinds: Only return hits of these kinds (all if None)
+
+        Returns:
+            Hits, best first, with kind, result_id, chunk_id, start_char,
+            end_char and score
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            term_ids = [self._vocabulary[term] for term in terms if term in self._vocabulary]
+            if not term_ids or not self._live_docs:
+                return []
+
+            doc_count = len(self._doc_lengths)
+            norms = self._length_norms_locked()
+            # Removed chunks keep their postings until their segment is rewritten
+            live = (
+                np.frombuffer(bytes(self._doc_live), dtype=np.uint8).astype(bool)
+                if self._live_docs < doc_count else None
+            )
+
+            all_docs, all_scores = [], []
+            for term_id in term_ids:
+                postings = self._term_postings(term_id)
+                if not postings:
+                    continue
+                docs = np.concatenate([docs for docs, _ in postings])
+                freqs = np.concatenate([freqs for _, freqs in postings]).astype(np.float32)
+                if live is not None:
+                    current = live[docs]
+                    docs, freqs = docs[current], freqs[current]
+                if not len(docs):
+                    continue
+                idf = math.log(1.0 + (self._live_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                all_docs.append(docs)
+                all_scores.append(np.float32(idf * (BM25_K1 + 1.0)) * freqs / (freqs + norms[docs]))
+
+            if not all_docs:
+                return []
+            scores = np.bincount(np.concatenate(all_docs), np.concatenate(all_scores), minlength=doc_count)
+            if kinds is not None:
+                codes = [_KINDS.index(kind) for kind in kinds]
+                scores[~np.isin(np.frombuffer(bytes(self._doc_kinds), dtype=np.uint8), codes)] = 0.0
+
+            matched = np.flatnonzero(scores > 0)
+            if len(matched) > limit:
+                matched = matched[np.argpartition(scores[matched], -limit)[-limit:]]
+            ranked = matched[np.argsort(-scores[matched], kind='stable')]
+
+            return [
+                {
+                    'kind': _KINDS[self._doc_kinds[doc]],
+                    'result_id': self._doc_results[doc],
+                    'chunk_id': self._doc_chunks[doc],
+                    'start_char': self._doc_starts[doc],
+                    'end_char': self._doc_ends[doc],
+                    'score': float(scores[doc])
+                }
+                for doc in ranked.tolist()
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Index statistics (chunks, terms, segments, postings, memory)."""
+        with self._lock:
+            postings = sum(segment.posting_count for segment in self._segments) + len(self._pending_terms)
+            memory = sum(
+                segment.data.nbytes + segment.freqs.nbytes + segment.term_ids.nbytes
+                + segment.posting_starts.nbytes + segment.byte_starts.nbytes
+                for segment in self._segments
+            )
+            memory += 12 * len(self._pending_terms) + 30 * len(self._doc_lengths)
+            return {
+                'chunks': self._live_docs,
+                'terms': len(self._vocabulary),
+                'segments': len(self._segments),
+                'postings': postings,
+                'postings_mb': round(memory / (1024 * 1024), 1)
+            }
@@ -0,0 +1,94 @@
+"""Tests for caching conversion results in DocumentProcessor."""
+
+import asyncio
+import io
+
+from config.settings import AppConfig
+from processing.conversion_pool import ConverterUnavailable
+from processing.document_processor import DocumentProcessor
+from processing.pdf_preflight import PDF_DAMAGED
+from processing.structure import markdown_elements
+
+
+class _Upload(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+class _Pool:
+    """Conversion pool whose docling converter can be switched on and off."""
+
+    max_workers = 1
+
+    def __init__(self):
+        self.docling_available = False
+        self.conversions = 0
+
+    async def inspect_pdf(self, path, *args):
+        shard = {'start_page': 1, 'end_page': 1, 'sampled_pages': [1], 'coverage': 1.0}
+        return {'status': 'ok', 'reason': '', 'page_count': 1, 'coverage': 1.0, 'shards': [shard]}
+
+    async def convert_pdf(self, path, filename, options, do_ocr=True, page_range=None):
+        if not self.docling_available:
+            raise ConverterUnavailable("ModuleNotFoundError: No module named 'docling'")
+        self.conversions += 1
+        text = "# Report\n\nConverted by docling.\n"
+        return {'extracted_text': text, 'elements': markdown_elements(text), 'tables': [], 'images': [],
+                'page_count': 1}
+
+    async def extract_pdf_text(self, path, time_budget_seconds=None):
+        return "Text layer only.\n", 1, 1
+
+
+def _processor(tmp_path) -> DocumentProcessor:
+    config = AppConfig()
+    config.document_processing.cache_dir = str(tmp_path / 'cache')
+    config.document_processing.spool_dir = str(tmp_path / 'spool')
+    processor = DocumentProcessor(config)
+    processor.conversion_pool = _Pool()
+    return processor
+
+
+def _process(processor: DocumentProcessor) -> dict:
+    upload = _Upload('report.pdf', b'%PDF-1.4 report')
+    return asyncio.run(processor._process_single_file_async(upload, {'ocr_mode': 'auto', 'chunk_size': 100}))
+
+
+def test_fallback_result_is_not_served_after_docling_recovers(tmp_path):
+    processor = _processor(tmp_path)
+
+    fallback = _process(processor)
+    assert fallback['degraded'] == 'docling unavailable'
+    assert fallback['extracted_text'] == "Text layer only.\n"
+
+    processor.conversion_pool.docling_available = True
+    converted = _process(processor)
+    assert not converted['from_cache']
+    assert converted['extracted_text'].startswith("# Report")
+    assert processor.conversion_pool.conversions == 1
+
+    # The full conversion is cached
+    cached = _process(processor)
+    assert cached['from_cache']
+    assert processor.conversion_pool.conversions == 1
+
+
+def test_fallback_cut_short_by_time_budget_is_not_cached(tmp_path):
+    processor = _processor(tmp_path)
+    pool = processor.conversion_pool
+
+    async def damaged(path, *args):
+        return {'status': PDF_DAMAGED, 'reason': 'bad xref', 'page_count': 10, 'coverage': None, 'shards': []}
+
+    async def truncated(path, time_budget_seconds=None):
+        return "First page.\n", 10, 1
+
+    pool.inspect_pdf, pool.extract_pdf_text = damaged, truncated
+    first = _process(processor)
+    assert first['degraded'] == 'time budget exceeded'
+    assert processor.cache.stats()['entries'] == 0
+    assert not _process(processor)['from_cache']
@@ -0,0 +1,49 @@
+"""Tests for appending result sets to partitioned Parquet datasets."""
+
+import pyarrow.dataset as ds
+
+from storage.dataset import append_to_dataset, dataset_path
+from storage.results_store import DOCUMENTS, ResultsStore
+
+
+def _documents(start: int, count: int) -> list:
+    return [
+        {'filename': f'doc{i}.pdf', 'file_type': 'pdf', 'status': 'success',
+         'processed_at': '2026-10-18T12:00:00', 'extracted_text': f'Document {i}'}
+        for i in range(start, start + count)
+    ]
+
+
+def _row_count(root) -> int:
+    return ds.dataset(str(root), format='parquet', partitioning='hive').count_rows()
+
+
+def test_exporting_a_result_set_twice_appends_only_new_results(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.db'))
+    results = store.result_set('session', DOCUMENTS)
+    results.extend(_documents(0, 5))
+    target = dataset_path(str(tmp_path / 'datasets'), DOCUMENTS)
+
+    assert append_to_dataset(results, str(tmp_path / 'datasets')) == 5
+    assert append_to_dataset(results, str(tmp_path / 'datasets')) == 0
+    assert _row_count(target) == 5
+
+    results.extend(_documents(5, 3))
+    assert append_to_dataset(results, str(tmp_path / 'datasets')) == 3
+    assert _row_count(target) == 8
+    store.close()
+
+
+def test_collections_are_tracked_separately(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.db'))
+    first = store.result_set('first', DOCUMENTS)
+    second = store.result_set('second', DOCUMENTS)
+    first.extend(_documents(0, 2))
+    second.extend(_documents(2, 2))
+    # Added after the second collection's results, with higher ids
+    first.extend(_documents(4, 2))
+
+    assert append_to_dataset(first, str(tmp_path / 'datasets')) == 4
+    assert append_to_dataset(second, str(tmp_path / 'datasets')) == 2
+    assert _row_count(dataset_path(str(tmp_path / 'datasets'), DOCUMENTS)) == 6
+    store.close()
@@ -3,47 +3,82 @@ Utilities package for Kontext application.
 
 This package contains helper modules for validation, UI components,
 session management, and other utility functions.
+
+Submodules are imported on first attribute access (PEP 562) so that
+importing one utility does not load all of them.
 """
 
-from .validators import (
-    validate_url,
-    validate_urls,
-    validate_file_type,
-    validate_file_size,
-    validate_crawl_options,
-    validate_processing_options,
-    sanitize_filename
-)
-
-from .ui_helpers import (
-    apply_custom_css,
-    create_sidebar_navigation,
-    create_metric_cards,
-    create_status_indicator,
-    create_progress_card,
-    create_results_table
-)
-
-from .session_manager import SessionManager
-
-__all__ = [
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .validators import (
+        validate_url,
+        validate_urls,
+        validate_file_type,
+        validate_file_size,
+        validate_crawl_options,
+        validate_processing_options,
+        sanitize_filename
+    )
+    from .ui_helpers import (
+        apply_custom_css,
+        create_sidebar_navigation,
+        create_metric_cards,
+        create_status_indicator,
+        create_progress_card,
+        create_results_table
+    )
+    from .session_manager import SessionManager
+    from .resources import (
+        configure_logging,
+        get_app_config,
+        get_document_processor,
+        start_model_preload,
+        create_web_crawler
+    )
+
+# Public name -> submodule that defines it
+_LAZY_EXPORTS = {
     # Validators
-    'validate_url',
-    'validate_urls', 
-    'validate_file_type',
-    'validate_file_size',
-    'validate_crawl_options',
-    'validate_processing_options',
-    'sanitize_filename',
-    
+    'validate_url': '.validators',
+    'validate_urls': '.validators',
+    'validate_file_type': '.validators',
+    'validate_file_size': '.validators',
+    'validate_crawl_options': '.validators',
+    'validate_processing_options': '.validators',
+    'sanitize_filename': '.validators',
+
     # UI Helpers
-    'apply_custom_css',
-    'create_sidebar_navigation',
-    'create_metric_cards',
-    'create_status_indicator',
-    'create_progress_card',
-    'create_results_table',
-    
+    'apply_custom_css': '.ui_helpers',
+    'create_sidebar_navigation': '.ui_helpers',
+    'create_metric_cards': '.ui_helpers',
+    'create_status_indicator': '.ui_helpers',
+    'create_progress_card': '.ui_helpers',
+    'create_results_table': '.ui_helpers',
+
     # Session Management
-    'SessionManager'
-]
\ No newline at end of file
+    'SessionManager': '.session_manager',
+
+    # Shared Resources
+    'configure_logging': '.resources',
+    'get_app_config': '.resources',
+    'get_document_processor': '.resources',
+    'start_model_preload': '.resources',
+    'create_web_crawler': '.resources'
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining ``name`` on first access."""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,372 @@
+"""
+Background Job Runner for Kontext.
+
+Document processing and web crawling can run for minutes. Running them inside
+the Streamlit script blocks the session until they finish, aborts them when
+the user interacts with the page, and leaves no way to redraw progress. Jobs
+are therefore submitted to a process-wide runner that executes them on worker
+threads and keeps their state in a job table; the UI only submits jobs and
+polls snapshots of their state.
+
+A job function receives a ``JobHandle`` as its first argument. The handle
+reports progress (it has the ``progress(fraction)`` method of a Streamlit
+progress placeholder, so it can be passed wherever one is accepted),
+publishes results as they are produced and tells the job whether it has been
+cancelled. Coroutine functions run on their own event loop in the worker
+thread.
+"""
+
+import asyncio
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class Job:
+    """State of one background job (guarded by the runner's lock)."""
+
+    def __init__(self, job_type: str, owner: Optional[str], description: str):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.job_type = job_type
+        self.owner = owner
+        self.description = description
+
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ''
+        self.error: Optional[str] = None
+
+        # Results not yet collected by the owner, and the total produced
+        self.results: List[Any] = []
+        self.result_count = 0
+
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+        # Receives published results instead of the job buffering them
+        self.sink: Optional[Callable[[List[Any], str], Any]] = None
+
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+        # Interrupts a running coroutine job (set while its event loop runs)
+        self.interrupt: Optional[Callable[[], None]] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the job state that is safe to hand to the UI."""
+        end = self.finished_at or datetime.now()
+        return {
+            'job_id': self.job_id,
+            'job_type': self.job_type,
+            'description': self.description,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'result_count': self.result_count,
+            'pending_results': len(self.results),
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration': end - self.started_at if self.started_at else None
+        }
+
+
+class JobHandle:
+    """Interface a running job uses to report back to the runner."""
+
+    def __init__(self, runner: 'JobRunner', job: Job):
+        self._runner = runner
+        self._job = job
+
+    @property
+    def job_id(self) -> str:
+        return self._job.job_id
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested; long jobs should check it."""
+        return self._job.cancel_event.is_set()
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Report progress.
+
+        Args:
+            fraction: Progress between 0.0 and 1.0
+            message: Optional status message
+        """
+        self._runner.update_progress(self._job.job_id, fraction, message)
+
+    def add_result(self, result: Any) -> None:
+        """Publish one result; the owner can collect it while the job runs."""
+        self.add_results([result])
+
+    def add_results(self, results: Iterable[Any]) -> None:
+        """Publish several results at once."""
+        self._runner._add_results(self._job, list(results))
+
+
+class JobRunner:
+    """
+    Executes jobs on a thread pool and keeps a table of their state.
+
+    Several jobs run concurrently, up to ``max_workers``; further jobs wait
+    in the pool's queue. Finished jobs stay in the table until their owner
+    forgets them or ``retention_seconds`` have passed.
+    """
+
+    def __init__(self, max_workers: int = 2, retention_seconds: float = 3600):
+        """
+        Initialize the runner.
+
+        Args:
+            max_workers: Maximum number of jobs running at once
+            retention_seconds: How long finished jobs are kept before pruning
+        """
+        self.max_workers = max(1, max_workers)
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='kontext-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        job_type: str,
+        target: Callable[..., Any],
+        *args: Any,
+        owner: Optional[str] = None,
+        description: str = '',
+        sink: Optional[Callable[[List[Any], str], Any]] = None,
+        **kwargs: Any
+    ) -> str:
+        """
+        Submit a job.
+
+        A list returned by the job function is added to its results. Results
+        are buffered until collect_results is called, or, if a sink is given,
+        handed to the sink (in the job's thread) as soon as they are published.
+
+        Args:
+            job_type: Type of job ('document_processing' or 'web_crawling')
+            target: Job function (or coroutine function) called with a JobHandle
+                followed by ``args`` and ``kwargs``
+            owner: Identifier of the session that owns the job
+            description: Short human-readable description
+            sink: Callable receiving (results, job_id), e.g. ResultSet.extend
+
+        Returns:
+            Job identifier
+        """
+        self._prune()
+
+        job = Job(job_type, owner, description)
+        job.sink = sink
+        with self._lock:
+            self._jobs[job.job_id] = job
+            job.future = self._executor.submit(self._run, job, target, args, kwargs)
+
+        logger.info(f"Submitted {job_type} job {job.job_id}")
+        return job.job_id
+
+    def _run(self, job: Job, target: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        """Run a job in a worker thread and record its outcome."""
+        with self._lock:
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+            job.started_at = datetime.now()
+
+        handle = JobHandle(self, job)
+        try:
+            if asyncio.iscoroutinefunction(target):
+                value = self._run_coroutine(job, target(handle, *args, **kwargs))
+            else:
+                value = target(handle, *args, **kwargs)
+
+            if isinstance(value, list):
+                self._add_results(job, value)
+
+            with self._lock:
+                self._finish(job, CANCELLED if job.cancel_event.is_set() else COMPLETED)
+
+        except asyncio.CancelledError:
+            with self._lock:
+                self._finish(job, CANCELLED)
+
+        except Exception as e:
+            logger.error(f"{job.job_type} job {job.job_id} failed: {e}")
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, FAILED)
+
+    def _run_coroutine(self, job: Job, coroutine: Any) -> Any:
+        """Run a coroutine job on a private event loop, interruptible by cancel()."""
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            task = loop.create_task(coroutine)
+            with self._lock:
+                job.interrupt = lambda: loop.call_soon_threadsafe(task.cancel)
+                if job.cancel_event.is_set():
+                    task.cancel()
+            return loop.run_until_complete(task)
+        finally:
+            with self._lock:
+                job.interrupt = None
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def _finish(self, job: Job, status: str) -> None:
+        """Record the final state of a job (caller holds the lock)."""
+        job.status = status
+        job.finished_at = datetime.now()
+        if status == COMPLETED:
+            job.progress = 1.0
+        logger.info(f"{job.job_type} job {job.job_id} {status}: {job.result_count} results")
+
+    def _add_results(self, job: Job, results: List[Any]) -> None:
+        if job.sink is not None:
+            job.sink(results, job.job_id)
+            with self._lock:
+                job.result_count += len(results)
+            return
+
+        with self._lock:
+            job.results.extend(results)
+            job.result_count += len(results)
+
+    def update_progress(self, job_id: str, progress: float, message: Optional[str] = None) -> None:
+        """
+        Update the progress of a job.
+
+        Args:
+            job_id: Job identifier
+            progress: Progress between 0.0 and 1.0
+            message: Optional status message
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return
+            job.progress = max(0.0, min(1.0, progress))
+            if message is not None:
+                job.message = message
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job.
+
+        Pending jobs are removed from the queue; running coroutine jobs are
+        interrupted, and other running jobs see ``JobHandle.cancelled``.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            True if the job was still pending or running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+
+            job.cancel_event.set()
+            if job.status == PENDING and job.future is not None and job.future.cancel():
+                self._finish(job, CANCELLED)
+            elif job.interrupt is not None:
+                job.interrupt()
+
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a snapshot of a job.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Job snapshot, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def list_jobs(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List job snapshots, oldest first.
+
+        Args:
+            owner: Only list the jobs of this owner (all jobs if None)
+
+        Returns:
+            List of job snapshots
+        """
+        with self._lock:
+            return [
+                job.snapshot() for job in self._jobs.values()
+                if owner is None or job.owner == owner
+            ]
+
+    def collect_results(self, job_id: str) -> List[Any]:
+        """
+        Take the results a job has published since the last call.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            New results (empty if none or the job is unknown)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return []
+            results, job.results = job.results, []
+            return results
+
+    def forget(self, job_id: str) -> None:
+        """Remove a finished job from the table."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in FINISHED_STATES:
+                del self._jobs[job_id]
+
+    def _prune(self) -> None:
+        """Drop finished jobs older than the retention period."""
+        now = datetime.now()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None
+                and (now - job.finished_at).total_seconds() > self.retention_seconds
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            logger.debug(f"Pruned {len(expired)} finished jobs")
+
+    def shutdown(self) -> None:
+        """Cancel all jobs and stop the worker threads."""
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+"""
+Shared Resources for Kontext.
+
+Streamlit re-executes the app script on every interaction, so anything built
+while rendering is rebuilt on every click. Expensive resources (configuration,
+the document processor with its conversion pool, cache and tokenizer, logging
+sinks, the job runner, the results store and crawler infrastructure) are created here once per server process
+with ``st.cache_resource`` and shared by all sessions. Everything handed out
+here is either read-only or guards its own state with locks.
+
+Heavy modules are imported inside the factories so that importing this
+module stays cheap.
+"""
+
+import threading
+from typing import Any, Optional
+
+import streamlit as st
+from loguru import logger
+
+# Rotating file log written by the application
+LOG_FILE_PATTERN = "logs/kontext_{time}.log"
+
+_log_sink_id: Optional[int] = None
+_log_sink_lock = threading.Lock()
+
+
+def configure_logging(level: str = "INFO") -> None:
+    """
+    Install or replace the application's file log sink.
+
+    Only the sink installed here is replaced, so repeated calls (e.g. from
+    the settings page) do not stack file handlers or remove other sinks.
+
+    Args:
+        level: Minimum level written to the log file
+    """
+    global _log_sink_id
+    with _log_sink_lock:
+        if _log_sink_id is not None:
+            logger.remove(_log_sink_id)
+        _log_sink_id = logger.add(LOG_FILE_PATTERN, level=level, rotation="10 MB", retention="7 days")
+
+
+@st.cache_resource(show_spinner=False)
+def init_logging() -> bool:
+    """Install the file log sink once per server process."""
+    configure_logging()
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_app_config() -> Any:
+    """
+    Load the application configuration once per server process.
+
+    Returns:
+        Shared AppConfig (treat as read-only)
+    """
+    from config.settings import load_config
+
+    return load_config()
+
+
+@st.cache_resource(show_spinner=False)
+def get_document_processor() -> Any:
+    """
+    Build the document processor once per server process.
+
+    The processor is stateless between calls; its conversion pool, cache and
+    tokenizer are thread-safe and shared by all sessions.
+
+    Returns:
+        Shared DocumentProcessor
+    """
+    from processing.document_processor import DocumentProcessor
+
+    return DocumentProcessor(get_app_config())
+
+
+@st.cache_resource(show_spinner=False)
+def start_model_preload() -> threading.Thread:
+    """
+    Start the conversion workers and load their docling models in the background.
+
+    Runs once per server process; the first document conversion then finds
+    warm workers instead of paying model initialization. Only the conversion
+    pool is imported here; the document processor is still built on first use
+    and picks up the same shared pool.
+
+    Returns:
+        The background preload thread
+    """
+    doc_config = get_app_config().document_processing
+    max_workers = doc_config.max_workers if doc_config.parallel_processing else 1
+
+    def preload() -> None:
+        try:
+            from processing.conversion_pool import get_conversion_pool
+
+            # Only load the converters the configured OCR mode can use
+            ocr_settings = {'always': (True,), 'never': (False,)}.get(doc_config.ocr_mode, (True, False))
+            get_conversion_pool(max_workers, doc_config.extract_tables).warm_up(ocr_settings)
+        except Exception as e:
+            logger.warning(f"Conversion model preload failed: {e}")
+
+    thread = threading.Thread(target=preload, name="kontext-model-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner() -> Any:
+    """
+    Create the background job runner once per server process.
+
+    Jobs outlive the script run (and the session) that submitted them, so
+    the runner is shared by all sessions; each session only sees its own jobs.
+
+    Returns:
+        Shared JobRunner
+    """
+    from utils.job_runner import JobRunner
+
+    jobs_config = get_app_config().jobs
+    return JobRunner(jobs_config.max_concurrent_jobs, jobs_config.retention_minutes * 60)
+
+
+@st.cache_resource(show_spinner=False)
+def get_results_store() -> Any:
+    """
+    Open the results store once per server process.
+
+    Returns:
+        Shared ResultsStore
+    """
+    from storage.results_store import ResultsStore
+
+    return ResultsStore(get_app_config().storage.results_path)
+
+
+@st.cache_resource(show_spinner=False)
+def get_robots_cache() -> Any:
+    """
+    Process-wide robots.txt cache shared by all crawl jobs, persisted to disk.
+
+    Returns:
+        RobotsCache
+    """
+    from crawling.robots import RobotsCache
+
+    crawl_config = get_app_config().web_crawling
+    return RobotsCache(
+        crawl_config.robots_cache_path,
+        ttl_seconds=crawl_config.robots_cache_ttl_hours * 3600,
+        error_ttl_seconds=crawl_config.robots_error_ttl_minutes * 60
+    )
+
+
+def create_web_crawler() -> Any:
+    """
+    Create a crawler for one crawl job.
+
+    Crawl state (visited URLs, results) belongs to the job, so each job gets
+    its own crawler; configuration and the robots.txt cache are shared.
+
+    Returns:
+        New WebCrawler
+    """
+    from crawling.crawler import WebCrawler
+
+    return WebCrawler(get_app_config(), robots_cache=get_robots_cache())
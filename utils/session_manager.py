@@ -2,16 +2,22 @@
 Session Management Utilities for Kontext.
 
 Handles Streamlit session state management for long-running jobs,
-progress tracking, and result persistence.
+progress tracking, and result persistence. Jobs themselves run on the shared
+background job runner and results live in the results store; the session only
+keeps the ids of the jobs it owns and handles on its result sets.
 """
 
 import streamlit as st
-from typing import Any, Dict, Optional, List
+from typing import Any, Callable, Dict, Optional, List
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
 from loguru import logger
 
+from storage.results_store import DOCUMENTS, PAGES, ResultSet
+from utils.job_runner import CANCELLED, COMPLETED, FINISHED_STATES
+from utils.resources import get_job_runner, get_results_store
+
 class SessionManager:
     """
     Manages Streamlit session state for the Kontext application.
@@ -27,12 +33,7 @@ class SessionManager:
     def _initialize_session_state(self) -> None:
         """Initialize default session state variables."""
         defaults = {
-            'processing_results': [],
-            'crawl_results': [],
-            'current_job': None,
-            'job_progress': 0.0,
-            'job_start_time': None,
-            'job_status': 'idle',
+            'jobs': [],
             'error_messages': [],
             'success_messages': [],
             'user_preferences': {
@@ -41,123 +42,211 @@ class SessionManager:
                 'auto_export': False,
                 'default_chunk_size': 512
             },
-            'session_id': self._generate_session_id(),
             'last_activity': datetime.now().isoformat()
         }
         
         for key, value in defaults.items():
             if key not in st.session_state:
                 st.session_state[key] = value
+        
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = self._generate_session_id()
+        
+        # Handles on this session's results in the results store
+        if 'processing_results' not in st.session_state:
+            store = get_results_store()
+            st.session_state.processing_results = store.result_set(st.session_state.session_id, DOCUMENTS)
+            st.session_state.crawl_results = store.result_set(st.session_state.session_id, PAGES)
     
     def _generate_session_id(self) -> str:
-        """Generate a unique session identifier."""
-        import uuid
-        return str(uuid.uuid4())[:8]
+        """
+        Get the session identifier, which also names the session's result collection.
+        
+        The identifier is kept in the URL, so reloading the page or restarting
+        the server reconnects the browser to its stored results.
+        """
+        session_id = st.query_params.get('session')
+        if not session_id or not session_id.isalnum():
+            import uuid
+            session_id = str(uuid.uuid4())[:8]
+            st.query_params['session'] = session_id
+        return session_id
     
-    def start_job(self, job_type: str, job_data: Optional[Dict[str, Any]] = None) -> None:
+    def start_job(
+        self,
+        job_type: str,
+        target: Callable[..., Any],
+        *args: Any,
+        job_data: Optional[Dict[str, Any]] = None,
+        description: str = '',
+        **kwargs: Any
+    ) -> str:
         """
-        Start a new job and update session state.
+        Submit a background job owned by this session.
+        
+        The job runs on the shared job runner and keeps running across
+        reruns and page changes; the session polls it with ``sync_jobs``.
+        Results the job publishes are appended to the session's result set
+        for the job type as soon as they are produced.
         
         Args:
-            job_type: Type of job ('document_processing' or 'web_crawling')
+            job_type: Type of job ('document_processing', 'web_crawling', 'export' or 'compaction')
+            target: Job function, called with a JobHandle followed by args and kwargs
             job_data: Additional job data
+            description: Short human-readable description
+            
+        Returns:
+            Job identifier
         """
-        st.session_state.current_job = job_type
-        st.session_state.job_progress = 0.0
-        st.session_state.job_start_time = datetime.now().isoformat()
-        st.session_state.job_status = 'running'
+        # Jobs write their results straight into this session's result set
+        result_set = self.get_result_set(job_type)
+        job_id = get_job_runner().submit(
+            job_type, target, *args,
+            owner=st.session_state.session_id,
+            description=description,
+            sink=result_set.extend if result_set is not None else None,
+            **kwargs
+        )
+        st.session_state.jobs.append(job_id)
         
         if job_data:
             st.session_state[f'{job_type}_job_data'] = job_data
         
-        logger.info(f"Started job: {job_type}")
+        logger.info(f"Started job: {job_type} ({job_id})")
+        return job_id
     
-    def update_job_progress(self, progress: float, message: Optional[str] = None) -> None:
+    def update_job_progress(self, job_id: str, progress: float, message: Optional[str] = None) -> None:
         """
         Update job progress.
         
         Args:
+            job_id: Job identifier
             progress: Progress value between 0.0 and 1.0
             message: Optional progress message
         """
-        st.session_state.job_progress = max(0.0, min(1.0, progress))
-        
-        if message:
-            st.session_state.job_status_message = message
+        get_job_runner().update_progress(job_id, progress, message)
         
         # Update last activity
         st.session_state.last_activity = datetime.now().isoformat()
     
-    def complete_job(self, results: List[Dict[str, Any]], success: bool = True) -> None:
+    def sync_jobs(self) -> List[Dict[str, Any]]:
         """
-        Complete the current job and store results.
+        Poll this session's jobs.
         
-        Args:
-            results: Job results
-            success: Whether the job completed successfully
+        Results buffered by jobs without a result set are moved into the
+        store, and finished jobs are completed.
+        
+        Returns:
+            Snapshots of the jobs that are still pending or running
         """
-        if not st.session_state.current_job:
-            return
+        runner = get_job_runner()
+        active = []
+        
+        for job_id in list(st.session_state.jobs):
+            job = runner.get(job_id)
+            if job is None:
+                # Pruned or lost with a server restart
+                st.session_state.jobs.remove(job_id)
+                continue
+            
+            self._store_results(job['job_type'], runner.collect_results(job_id))
+            
+            if job['status'] in FINISHED_STATES:
+                self.complete_job(job_id)
+            else:
+                active.append(job)
         
-        job_type = st.session_state.current_job
+        return active
+    
+    def get_result_set(self, job_type: str) -> Optional[ResultSet]:
+        """Get this session's result set for a job type."""
+        if job_type == 'document_processing':
+            return st.session_state.processing_results
+        elif job_type == 'web_crawling':
+            return st.session_state.crawl_results
+        return None
+    
+    def _store_results(self, job_type: str, results: List[Dict[str, Any]]) -> None:
+        """Store job results based on job type."""
+        result_set = self.get_result_set(job_type)
+        if results and result_set is not None:
+            result_set.extend(results)
+    
+    def complete_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Complete a finished job: store its remaining results and report its outcome.
         
-        if success:
-            # Store results based on job type
-            if job_type == 'document_processing':
-                st.session_state.processing_results.extend(results)
-            elif job_type == 'web_crawling':
-                st.session_state.crawl_results.extend(results)
+        Args:
+            job_id: Job identifier
             
-            st.session_state.job_status = 'completed'
-            self.add_success_message(f"Job completed successfully: {len(results)} items processed")
+        Returns:
+            Final job snapshot, or None if the job is unknown or still running
+        """
+        runner = get_job_runner()
+        job = runner.get(job_id)
+        if job is None or job['status'] not in FINISHED_STATES:
+            return None
+        
+        self._store_results(job['job_type'], runner.collect_results(job_id))
+        
+        if job['status'] == COMPLETED:
+            self.add_success_message(
+                job['message'] or f"Job completed successfully: {job['result_count']} items processed"
+            )
+        elif job['status'] == CANCELLED:
+            self.add_error_message(f"Job cancelled: {job['job_type']} ({job['result_count']} items kept)")
         else:
-            st.session_state.job_status = 'failed'
-            self.add_error_message(f"Job failed: {job_type}")
+            self.add_error_message(f"Job failed: {job['job_type']}: {job['error']}")
         
-        # Calculate job duration
-        if st.session_state.job_start_time:
-            start_time = datetime.fromisoformat(st.session_state.job_start_time)
-            duration = datetime.now() - start_time
-            st.session_state.last_job_duration = str(duration)
+        if job['duration'] is not None:
+            st.session_state.last_job_duration = str(job['duration'])
         
-        # Reset job state
-        st.session_state.current_job = None
-        st.session_state.job_progress = 0.0
+        runner.forget(job_id)
+        if job_id in st.session_state.jobs:
+            st.session_state.jobs.remove(job_id)
         
-        logger.info(f"Completed job: {job_type}, success: {success}")
+        logger.info(f"Completed job: {job['job_type']} ({job_id}), status: {job['status']}")
+        return job
     
-    def cancel_job(self) -> None:
-        """Cancel the current job."""
-        if st.session_state.current_job:
-            job_type = st.session_state.current_job
-            st.session_state.current_job = None
-            st.session_state.job_progress = 0.0
-            st.session_state.job_status = 'cancelled'
-            
-            self.add_error_message(f"Job cancelled: {job_type}")
-            logger.info(f"Cancelled job: {job_type}")
+    def cancel_job(self, job_id: Optional[str] = None) -> None:
+        """
+        Cancel a job.
+        
+        Args:
+            job_id: Job identifier (all jobs of this session if None)
+        """
+        runner = get_job_runner()
+        for current_id in ([job_id] if job_id else list(st.session_state.jobs)):
+            if runner.cancel(current_id):
+                logger.info(f"Cancelling job: {current_id}")
     
-    def is_job_running(self) -> bool:
-        """Check if a job is currently running."""
-        return st.session_state.current_job is not None
+    def is_job_running(self, job_type: Optional[str] = None) -> bool:
+        """Check if a job (of the given type) is pending or running."""
+        return bool(self.get_jobs_info(job_type))
     
-    def get_current_job_info(self) -> Optional[Dict[str, Any]]:
-        """Get information about the current job."""
-        if not self.is_job_running():
-            return None
-        
-        start_time = None
-        if st.session_state.job_start_time:
-            start_time = datetime.fromisoformat(st.session_state.job_start_time)
+    def get_jobs_info(self, job_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get information about this session's unfinished jobs.
         
-        return {
-            'job_type': st.session_state.current_job,
-            'progress': st.session_state.job_progress,
-            'status': st.session_state.job_status,
-            'start_time': start_time,
-            'duration': datetime.now() - start_time if start_time else None,
-            'status_message': st.session_state.get('job_status_message', '')
-        }
+        Args:
+            job_type: Only include jobs of this type (all if None)
+            
+        Returns:
+            List of job snapshots, oldest first
+        """
+        runner = get_job_runner()
+        jobs = [runner.get(job_id) for job_id in st.session_state.jobs]
+        return [
+            job for job in jobs
+            if job is not None
+            and job['status'] not in FINISHED_STATES
+            and (job_type is None or job['job_type'] == job_type)
+        ]
+    
+    def get_current_job_info(self) -> Optional[Dict[str, Any]]:
+        """Get information about the oldest unfinished job."""
+        jobs = self.get_jobs_info()
+        return jobs[0] if jobs else None
     
     def add_success_message(self, message: str) -> None:
         """Add a success message to the session."""
@@ -220,35 +309,39 @@ class SessionManager:
     
     def get_results_summary(self) -> Dict[str, Any]:
         """Get a summary of all results in the session."""
-        processing_count = len(st.session_state.processing_results)
-        crawl_count = len(st.session_state.crawl_results)
-        
-        # Calculate total content metrics
-        total_words = 0
-        total_chars = 0
-        
-        for result in st.session_state.processing_results:
-            total_words += result.get('word_count', 0)
-            total_chars += result.get('char_count', 0)
-        
-        for result in st.session_state.crawl_results:
-            total_words += result.get('word_count', 0)
-            total_chars += result.get('char_count', 0)
+        processing = st.session_state.processing_results.totals()
+        crawl = st.session_state.crawl_results.totals()
         
         return {
-            'processing_results_count': processing_count,
-            'crawl_results_count': crawl_count,
-            'total_results': processing_count + crawl_count,
-            'total_words': total_words,
-            'total_chars': total_chars,
+            'processing_results_count': processing['results'],
+            'crawl_results_count': crawl['results'],
+            'total_results': processing['results'] + crawl['results'],
+            'total_words': processing['words'] + crawl['words'],
+            'total_chars': processing['chars'] + crawl['chars'],
             'session_id': st.session_state.session_id,
             'last_activity': st.session_state.last_activity
         }
     
+    def search_results(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over the session's processed chunks and crawled pages.
+        
+        The session's search index is built on the first search and kept up
+        to date as jobs store new results.
+        
+        Args:
+            query: Free-text query
+            limit: Maximum number of hits
+            
+        Returns:
+            BM25-ranked hits (see SearchIndex.search)
+        """
+        return get_results_store().search(st.session_state.session_id, query, limit)
+    
     def clear_all_results(self) -> None:
         """Clear all results from the session."""
-        st.session_state.processing_results = []
-        st.session_state.crawl_results = []
+        st.session_state.processing_results.clear()
+        st.session_state.crawl_results.clear()
         self.add_success_message("All results cleared")
         logger.info("Cleared all session results")
     
@@ -256,28 +349,38 @@ class SessionManager:
         """
         Export session data to JSON file.
         
+        Results are streamed from the results store one at a time, so the
+        export does not load the session's results into memory.
+        
         Args:
             output_path: Output file path
             
         Returns:
             Path to exported file
         """
+        from processing.chunking import materialize_chunks
+        
         if not output_path:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             session_id = st.session_state.session_id
             output_path = f"kontext_session_{session_id}_{timestamp}.json"
         
-        session_data = {
-            'session_id': st.session_state.session_id,
-            'export_timestamp': datetime.now().isoformat(),
-            'processing_results': st.session_state.processing_results,
-            'crawl_results': st.session_state.crawl_results,
-            'user_preferences': st.session_state.user_preferences,
-            'summary': self.get_results_summary()
-        }
+        def write_results(f: Any, key: str, results: ResultSet) -> None:
+            f.write(f'  {json.dumps(key)}: [')
+            for index, result in enumerate(results):
+                f.write(',\n    ' if index else '\n    ')
+                json.dump(materialize_chunks(result), f, default=str)
+            f.write('\n  ],\n')
         
         with open(output_path, 'w') as f:
-            json.dump(session_data, f, indent=2, default=str)
+            f.write('{\n')
+            f.write(f'  "session_id": {json.dumps(st.session_state.session_id)},\n')
+            f.write(f'  "export_timestamp": {json.dumps(datetime.now().isoformat())},\n')
+            write_results(f, 'processing_results', st.session_state.processing_results)
+            write_results(f, 'crawl_results', st.session_state.crawl_results)
+            f.write(f'  "user_preferences": {json.dumps(st.session_state.user_preferences, default=str)},\n')
+            f.write(f'  "summary": {json.dumps(self.get_results_summary(), default=str)}\n')
+            f.write('}\n')
         
         logger.info(f"Session data exported to {output_path}")
         return output_path
@@ -297,8 +400,10 @@ class SessionManager:
                 session_data = json.load(f)
             
             # Restore session data
-            st.session_state.processing_results = session_data.get('processing_results', [])
-            st.session_state.crawl_results = session_data.get('crawl_results', [])
+            st.session_state.processing_results.clear()
+            st.session_state.processing_results.extend(session_data.get('processing_results', []))
+            st.session_state.crawl_results.clear()
+            st.session_state.crawl_results.extend(session_data.get('crawl_results', []))
             st.session_state.user_preferences.update(
                 session_data.get('user_preferences', {})
             )
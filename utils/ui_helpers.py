@@ -7,8 +7,9 @@ following Streamlit best practices and modern design patterns.
 
 import streamlit as st
 from streamlit_option_menu import option_menu
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 import base64
+import html
 from pathlib import Path
 
 def apply_custom_css() -> None:
@@ -356,15 +357,11 @@ def create_sidebar_navigation() -> str:
             with col2:
                 st.metric("Pages", crawl_count)
         
-        # Current job status
-        if st.session_state.get('current_job'):
-            st.markdown("### 🔄 Current Job")
-            job_info = {
-                'type': st.session_state.current_job,
-                'progress': st.session_state.get('job_progress', 0)
-            }
-            st.write(f"**{job_info['type'].replace('_', ' ').title()}**")
-            st.progress(job_info['progress'])
+        # Background jobs of this session (unfinished ones; finished jobs are
+        # removed when the session collects them)
+        if st.session_state.get('jobs'):
+            st.markdown("### 🔄 Running Jobs")
+            st.write(f"**{len(st.session_state.jobs)}** job(s) in progress")
     
     return selected
 
@@ -518,15 +515,62 @@ def create_file_upload_area(
     
     return uploaded_files
 
-def create_results_table(data: List[Dict[str, Any]], title: str = "Results") -> None:
+# Summary columns the results browser shows by default, per result kind
+_DEFAULT_RESULT_COLUMNS = {
+    'document': ('result_id', 'name', 'file_type', 'status', 'word_count', 'token_count', 'chunk_count', 'created_at', 'error'),
+    'page': ('result_id', 'name', 'title', 'status_code', 'word_count', 'created_at', 'error')
+}
+
+# Longest text shown inline when a result is opened
+_MAX_PREVIEW_CHARS = 100_000
+_MAX_PREVIEW_CHUNKS = 500
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _load_results_page(
+    _results: Any,
+    collection: str,
+    kind: str,
+    version: int,
+    offset: int,
+    limit: int,
+    columns: tuple
+) -> Any:
+    """
+    Build the DataFrame of one page of summary rows.
+    
+    Cached per result set, version, page and projection; any write to the
+    result set bumps its version and invalidates its pages.
+    """
+    import polars as pl
+    
+    rows = _results.page(offset, limit, columns)
+    if not rows:
+        return pl.DataFrame(schema=list(columns))
+    return pl.DataFrame(rows, infer_schema_length=None)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _load_results_totals(_results: Any, collection: str, kind: str, version: int) -> Dict[str, int]:
+    """Aggregate counts of a result set, cached per version."""
+    return _results.totals()
+
+def create_results_table(results: Any, title: str = "Results", page_size: int = 50, key: str = "results") -> None:
     """
-    Create a formatted results table.
+    Create a paginated results browser over a stored result set.
+    
+    Only summary columns of the current page are read from the results store;
+    a result's full text and chunks are loaded when its row is selected.
     
     Args:
-        data: List of result dictionaries
+        results: ResultSet to browse
         title: Table title
+        page_size: Number of rows per page (UIConfig.results_per_page)
+        key: Unique key prefix for the browser's widgets
     """
-    if not data:
+    from storage.results_store import SUMMARY_COLUMNS
+    
+    version = results.version
+    totals = _load_results_totals(results, results.collection, results.kind, version)
+    if not totals['results']:
         st.info("🔍 No results to display")
         return
     
@@ -539,29 +583,167 @@ def create_results_table(data: List[Dict[str, Any]], title: str = "Results") ->
         unsafe_allow_html=True
     )
     
-    # Convert to DataFrame for display
-    import polars as pl
-    df = pl.DataFrame(data)
+    # Summary metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Items", f"{totals['results']:,}")
+    with col2:
+        st.metric("Errors", f"{totals['errors']:,}")
+    with col3:
+        st.metric("Total Words", f"{totals['words']:,}")
+    with col4:
+        st.metric("Total Characters", f"{totals['chars']:,}")
+    
+    # Projection and page selection
+    page_count = max(1, -(-totals['results'] // page_size))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        columns = st.multiselect(
+            "Columns",
+            SUMMARY_COLUMNS,
+            default=_DEFAULT_RESULT_COLUMNS.get(results.kind, SUMMARY_COLUMNS),
+            key=f"{key}_columns"
+        )
+    with col2:
+        page = st.number_input(f"Page (of {page_count})", 1, page_count, 1, key=f"{key}_page")
+    
+    # The id identifies the selected row, so it is always read
+    columns = ('result_id',) + tuple(column for column in columns if column != 'result_id')
+    df = _load_results_page(
+        results, results.collection, results.kind, version, (page - 1) * page_size, page_size, columns
+    )
     
-    # Display table
-    st.dataframe(
+    event = st.dataframe(
         df,
         use_container_width=True,
-        hide_index=True
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{key}_table"
+    )
+    st.caption(
+        f"Rows {(page - 1) * page_size + 1:,}–{(page - 1) * page_size + len(df):,} of {totals['results']:,}"
+        " · select a row to open the full result"
     )
     
-    # Summary metrics
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Items", len(data))
-    with col2:
-        if 'word_count' in data[0]:
-            total_words = sum(item.get('word_count', 0) for item in data)
-            st.metric("Total Words", f"{total_words:,}")
-    with col3:
-        if 'char_count' in data[0]:
-            total_chars = sum(item.get('char_count', 0) for item in data)
-            st.metric("Total Characters", f"{total_chars:,}")
+    selected_rows = event.selection.rows if event is not None else []
+    if selected_rows and selected_rows[0] < len(df):
+        _show_result_details(results, int(df['result_id'][selected_rows[0]]), key)
+
+def _show_result_details(results: Any, result_id: int, key: str) -> None:
+    """Load one result from the store and show its text, chunks and metadata."""
+    import polars as pl
+    
+    result = results.get(result_id)
+    if result is None:
+        return
+    
+    name = result.get('filename') or result.get('url') or f"Result {result_id}"
+    text = result.get('extracted_text') or result.get('text_content') or ''
+    chunks = result.get('chunks') or []
+    
+    with st.expander(f"📄 {name}", expanded=True):
+        st.text_area(
+            "Full text",
+            text[:_MAX_PREVIEW_CHARS],
+            height=300,
+            disabled=True,
+            key=f"{key}_text_{result_id}"
+        )
+        if len(text) > _MAX_PREVIEW_CHARS:
+            st.caption(f"Showing the first {_MAX_PREVIEW_CHARS:,} of {len(text):,} characters")
+        
+        if len(chunks):
+            st.markdown(f"**Chunks ({len(chunks):,})**")
+            st.dataframe(pl.DataFrame(chunks[:_MAX_PREVIEW_CHUNKS]), use_container_width=True, hide_index=True)
+        
+        # Remaining metadata, without the bulky content fields
+        bulky = {'extracted_text', 'text_content', 'html_content', 'chunks', 'elements'}
+        st.json({field: value for field, value in result.items() if field not in bulky}, expanded=False)
+
+def _highlight_snippet(text: str, terms: List[str], width: int = 300) -> str:
+    """Cut a window of text around the first query term and mark the terms (HTML)."""
+    import re
+    
+    if not terms:
+        return html.escape(text[:width])
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\b', re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    window = text[start:start + width]
+    
+    # split() alternates plain text and matched terms; escape both
+    parts = pattern.split(window)
+    snippet = ''.join(
+        f"<mark>{html.escape(part)}</mark>" if index % 2 else html.escape(part)
+        for index, part in enumerate(parts)
+    )
+    return ('…' if start else '') + snippet + ('…' if start + width < len(text) else '')
+
+def create_search_box(
+    search: Callable[[str, int], List[Dict[str, Any]]],
+    result_sets: Dict[str, Any],
+    limit: int = 20,
+    key: str = "search"
+) -> None:
+    """
+    Create a full-text search box over stored results.
+    
+    Hits are ranked by the search index; only the results they point to are
+    loaded from the store to show the matching chunk.
+    
+    Args:
+        search: Function (query, limit) -> hits, e.g. SessionManager.search_results
+        result_sets: ResultSet per result kind, used to load the hits' text
+        limit: Maximum number of hits shown
+        key: Unique key for the search widgets
+    """
+    import time
+    from storage.search_index import tokenize
+    
+    query = st.text_input(
+        "🔎 Search results",
+        placeholder="Search chunk text of processed documents and crawled pages",
+        key=f"{key}_query"
+    )
+    if not query.strip():
+        return
+    
+    started = time.perf_counter()
+    with st.spinner("Searching..."):
+        hits = search(query, limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    st.caption(f"{len(hits)} matching chunks · {elapsed_ms:.0f} ms")
+    if not hits:
+        return
+    
+    # Load each hit's result once, kind by kind
+    loaded: Dict[Any, Dict[str, Any]] = {}
+    for kind, results in result_sets.items():
+        result_ids = list(dict.fromkeys(hit['result_id'] for hit in hits if hit['kind'] == kind))
+        if result_ids:
+            for batch in results.iter_batches(result_ids):
+                for result in batch:
+                    loaded[(kind, result['result_id'])] = result
+    
+    terms = list(dict.fromkeys(tokenize(query)))
+    for rank, hit in enumerate(hits, 1):
+        result = loaded.get((hit['kind'], hit['result_id']))
+        if result is None:
+            continue
+        name = result.get('filename') or result.get('url') or f"Result {hit['result_id']}"
+        text = result.get('extracted_text') or result.get('text_content') or ''
+        chunk_text = text[hit['start_char']:hit['end_char']]
+        st.markdown(
+            f"""
+            <div class="custom-card">
+                <strong>{rank}. {html.escape(name)}</strong> · chunk {hit['chunk_id']} · score {hit['score']:.2f}<br>
+                <small>{_highlight_snippet(chunk_text, terms)}</small>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
 
 def create_export_buttons(data: List[Dict[str, Any]], prefix: str = "") -> None:
     """
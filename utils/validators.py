@@ -146,11 +146,12 @@ def validate_file_size(file_obj: Any, max_size_mb: int) -> bool:
         True if file size is acceptable
     """
     try:
-        # Get file size
+        # Get file size without copying the file contents
         if hasattr(file_obj, 'size'):
             file_size = file_obj.size
-        elif hasattr(file_obj, 'getvalue'):
-            file_size = len(file_obj.getvalue())
+        elif hasattr(file_obj, 'getbuffer'):
+            with file_obj.getbuffer() as view:
+                file_size = view.nbytes
         else:
             # Try to read and get size
             current_pos = file_obj.tell() if hasattr(file_obj, 'tell') else 0
@@ -310,10 +311,22 @@ def validate_processing_options(options: dict) -> dict:
     chunk_size = options.get('chunk_size', 512)
     validated['chunk_size'] = max(50, min(chunk_size, 4000))
     
+    # Overlap must leave room for new content in every chunk
+    chunk_overlap = options.get('chunk_overlap', 0)
+    validated['chunk_overlap'] = max(0, min(chunk_overlap, validated['chunk_size'] // 2))
+    
+    # Chunking strategy validation
+    chunking_strategy = options.get('chunking_strategy', 'structure')
+    validated['chunking_strategy'] = chunking_strategy if chunking_strategy in ['structure', 'window'] else 'structure'
+    
     # Boolean options
     validated['extract_tables'] = bool(options.get('extract_tables', True))
     validated['extract_images'] = bool(options.get('extract_images', False))
     
+    # OCR mode validation
+    ocr_mode = options.get('ocr_mode', 'auto')
+    validated['ocr_mode'] = ocr_mode if ocr_mode in ['auto', 'always', 'never'] else 'auto'
+    
     return validated
 
 def validate_export_format(format_str: str) -> str: